@@ -1,55 +1,186 @@
 import hashlib
 import json
+import logging
 import os
+import threading
 import time
-import zlib
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .codec import decode, encode
+from .segmenter import split_into_chunks
+
+logger = logging.getLogger(__name__)
 
 # ---------------- L1 In-process cache -------------------------------
-# Added simple per-chunk sub-cache so long texts sharing chunks reuse results
-_L1_CACHE: Dict[str, Tuple[float, str]] = {}
-_CHUNK_CACHE: Dict[str, Tuple[float, str]] = {}  # key = sha256(chunk)
+
+
+class _Entry:
+    __slots__ = ("expires_at", "value", "size")
+
+    def __init__(self, expires_at: float, value: str, size: int):
+        self.expires_at = expires_at
+        self.value = value
+        self.size = size
+
+
+class BoundedTTLCache:
+    """Thread-safe in-process LRU cache bounded by entry count and bytes.
+
+    Entries expire after their TTL; expired entries are dropped lazily on
+    read and by a periodic sweep (at most once per ``sweep_interval``
+    seconds, piggy-backed on writes) so keys that are never read again do
+    not pile up in long-lived workers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        default_ttl: int,
+        sweep_interval: float = 60,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sweep_interval = sweep_interval
+        self._data: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._next_sweep = time.monotonic() + sweep_interval
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    @staticmethod
+    def _sizeof(key: str, value: str) -> int:
+        # Approximate footprint: UTF-8-ish payload plus per-entry overhead
+        return len(key) + len(value) + 64
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= now:
+                self._remove(key, entry)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        now = time.monotonic()
+        size = self._sizeof(key, value)
+        if size > self.max_bytes:
+            # Would evict everything else; not worth caching in-process. Drop
+            # any earlier value so reads don't serve it instead.
+            self.delete(key)
+            return
+        entry = _Entry(now + (self.default_ttl if ttl is None else ttl), value, size)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._data[key] = entry
+            self._bytes += size
+            if now >= self._next_sweep:
+                self._sweep(now)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._remove(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def sweep(self) -> int:
+        """Drop all expired entries now; returns how many were removed."""
+        with self._lock:
+            return self._sweep(time.monotonic())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key: str, entry: _Entry) -> None:
+        del self._data[key]
+        self._bytes -= entry.size
+
+    def _sweep(self, now: float) -> int:
+        expired = [k for k, e in self._data.items() if e.expires_at <= now]
+        for key in expired:
+            self._remove(key, self._data[key])
+        self.expirations += len(expired)
+        self._next_sweep = now + self.sweep_interval
+        return len(expired)
+
+
 _L1_DEFAULT_TTL = int(os.getenv("L1_CACHE_TTL", 300))  # seconds
 _CHUNK_TTL = int(os.getenv("CHUNK_CACHE_TTL", 3600))
+_TRANSLATION_TTL = int(os.getenv("CACHE_TTL", 3600))
+_L1_SWEEP_INTERVAL = int(os.getenv("L1_CACHE_SWEEP_INTERVAL", 60))
+
+# Added simple per-chunk sub-cache so long texts sharing chunks reuse results
+_L1_CACHE = BoundedTTLCache(
+    max_entries=int(os.getenv("L1_CACHE_MAX_ENTRIES", 2048)),
+    max_bytes=int(os.getenv("L1_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    default_ttl=_L1_DEFAULT_TTL,
+    sweep_interval=_L1_SWEEP_INTERVAL,
+)
+_CHUNK_CACHE = BoundedTTLCache(  # key = _make_chunk_key(chunk, ...)
+    max_entries=int(os.getenv("CHUNK_CACHE_MAX_ENTRIES", 8192)),
+    max_bytes=int(os.getenv("CHUNK_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    default_ttl=_CHUNK_TTL,
+    sweep_interval=_L1_SWEEP_INTERVAL,
+)
 
 
 def _l1_get(key: str) -> Optional[str]:
-    entry = _L1_CACHE.get(key)
-    if not entry:
-        return None
-    expires_at, value = entry
-    if expires_at is None or expires_at > time.time():
-        return value
-    # expired
-    _L1_CACHE.pop(key, None)
-    return None
+    return _L1_CACHE.get(key)
 
 
 def _l1_set(key: str, value: str, ttl: int = _L1_DEFAULT_TTL) -> None:
-    _L1_CACHE[key] = (time.time() + ttl, value)
+    _L1_CACHE.set(key, value, ttl)
 
 
 def _l1_delete(key: str) -> None:
-    _L1_CACHE.pop(key, None)
-
+    _L1_CACHE.delete(key)
 
-# ---------------- Compression helpers for Redis (L2) ----------------
-def _compress(value: str) -> bytes:
-    return zlib.compress(value.encode("utf-8"))
 
-
-def _decompress(blob: bytes) -> str:
-    try:
-        return zlib.decompress(blob).decode("utf-8")
-    except zlib.error:
-        # Already plain string bytes
-        return blob.decode("utf-8")
+def l1_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss/eviction counters for the in-process caches."""
+    return {"l1": _L1_CACHE.stats(), "chunk": _CHUNK_CACHE.stats()}
 
 
 # ---------------- Per-chunk helpers ---------------------------
 
 
 def _make_chunk_key(chunk: str, src: str, tgt: str, lvl: str) -> str:
+    return f"chunk:{KEY_NAMESPACE}:" + key_digest(chunk, src, tgt, lvl)
+
+
+def _legacy_chunk_key(chunk: str, src: str, tgt: str, lvl: str) -> str:
     payload = {"chunk": chunk, "src": src, "tgt": tgt, "lvl": lvl}
     return (
         "chunk:"
@@ -60,19 +191,18 @@ def _make_chunk_key(chunk: str, src: str, tgt: str, lvl: str) -> str:
 def chunk_get(chunk: str, src: str, tgt: str, lvl: str):
     key = _make_chunk_key(chunk, src, tgt, lvl)
     # Try L1
-    entry = _CHUNK_CACHE.get(key)
-    if entry and entry[0] > time.time():
-        return entry[1]
+    val = _CHUNK_CACHE.get(key)
+    if val:
+        return val
     # Try Redis L2
     from django.core.cache import cache
 
-    blob = cache.get(key)
-    if isinstance(blob, (bytes, bytearray)):
-        val = _decompress(blob)
-    else:
-        val = blob
+    val = decode(cache.get(key))
+    if not val and LEGACY_KEY_READS:
+        legacy = {key: _legacy_chunk_key(chunk, src, tgt, lvl)}
+        val = _legacy_get_many(legacy, _CHUNK_TTL).get(key)
     if val:
-        _CHUNK_CACHE[key] = (time.time() + _CHUNK_TTL, val)
+        _CHUNK_CACHE.set(key, val)
     return val
 
 
@@ -80,15 +210,195 @@ def chunk_set(chunk: str, src: str, tgt: str, lvl: str, translation: str):
     key = _make_chunk_key(chunk, src, tgt, lvl)
     from django.core.cache import cache
 
-    _CHUNK_CACHE[key] = (time.time() + _CHUNK_TTL, translation)
-    cache.add(key, _compress(translation), _CHUNK_TTL)
+    _CHUNK_CACHE.set(key, translation)
+    cache.add(key, encode(translation), _CHUNK_TTL)
+
+
+def chunk_keys(chunks: Iterable[str], src: str, tgt: str, lvl: str) -> List[str]:
+    return [_make_chunk_key(chunk, src, tgt, lvl) for chunk in chunks]
+
+
+def chunk_cache_keys_for(text: str, src: str, tgt: str, lvl: str) -> List[str]:
+    """Every chunk key ``text`` is translated through (for invalidation)."""
+    chunks = split_into_chunks(text)
+    keys = chunk_keys(chunks, src, tgt, lvl)
+    if LEGACY_KEY_READS:
+        keys += [_legacy_chunk_key(chunk, src, tgt, lvl) for chunk in chunks]
+    return keys
+
+
+def chunk_get_many(
+    chunks: List[str], src: str, tgt: str, lvl: str
+) -> List[Optional[str]]:
+    """Cached translations for ``chunks`` in order (None for misses).
+
+    L1 first; all remaining keys are fetched from Redis in one ``get_many``
+    (a single ``MGET``) instead of a round trip per chunk.
+    """
+    keys = chunk_keys(chunks, src, tgt, lvl)
+    found: List[Optional[str]] = [_CHUNK_CACHE.get(key) for key in keys]
+    missing = {k for k, v in zip(keys, found) if not v}
+    if not missing:
+        return found
+    from django.core.cache import cache
+
+    fetched = {}
+    for key, blob in cache.get_many(list(missing)).items():
+        val = decode(blob)
+        if val:
+            fetched[key] = val
+    if LEGACY_KEY_READS:
+        legacy = {
+            key: _legacy_chunk_key(chunk, src, tgt, lvl)
+            for key, chunk in zip(keys, chunks)
+            if key in missing and key not in fetched
+        }
+        fetched.update(_legacy_get_many(legacy, _CHUNK_TTL))
+    for key, val in fetched.items():
+        _CHUNK_CACHE.set(key, val)
+    return [val or fetched.get(key) for key, val in zip(keys, found)]
+
+
+def chunk_set_many(
+    items: Iterable[Tuple[str, str]], src: str, tgt: str, lvl: str
+) -> None:
+    """Cache ``(chunk, translation)`` pairs with one pipelined ``set_many``."""
+    values = {}
+    for chunk, translation in items:
+        key = _make_chunk_key(chunk, src, tgt, lvl)
+        _CHUNK_CACHE.set(key, translation)
+        values[key] = encode(translation)
+    if values:
+        from django.core.cache import cache
+
+        cache.set_many(values, _CHUNK_TTL)
 
 
 # ---------------- Shared cache-key helper ---------------------------
-def make_cache_key(text: str, src: str, tgt: str, lvl: str) -> str:
-    """Stable SHA-256 cache-key for a translation request."""
+def content_hash(text: str, src: str, tgt: str, lvl: str) -> str:
+    """SHA-256 hex digest identifying a translation request.
+
+    Stored on ``Translation.content_hash`` for indexed exact-match reuse.
+    This is also the digest of the pre-v2 cache keys; it must not change
+    without a data migration.
+    """
     payload = {"text": text, "src": src, "tgt": tgt, "lvl": lvl}
-    return (
-        "translation:"
-        + hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
-    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+# Cache keys hash the fields directly: each one is fed to the hash as its
+# UTF-8 length (8 bytes, little-endian) followed by its bytes, so no JSON
+# document is built and field boundaries stay unambiguous. The namespace
+# names the scheme, so changing the hash never reads another scheme's
+# entries. Keys derive from user input: keep the collision-resistant
+# blake2b unless the faster, non-cryptographic xxh3 (optional ``xxhash``
+# package) is an acceptable trade-off.
+_KEY_HASHES = {"blake2b": "v2", "xxh3": "v2x"}
+
+
+def _key_hasher():
+    name = os.getenv("CACHE_KEY_HASH", "blake2b").lower()
+    if name == "xxh3":
+        try:
+            import xxhash
+
+            return "xxh3", xxhash.xxh3_128
+        except ImportError:
+            logger.warning("xxhash is not installed, using blake2b cache keys")
+    return "blake2b", lambda: hashlib.blake2b(digest_size=16)
+
+
+KEY_HASH, _new_hasher = _key_hasher()
+KEY_NAMESPACE = _KEY_HASHES[KEY_HASH]
+
+# Opt-in for a rollout from the pre-v2 (JSON + SHA-256) keys: L2 misses are
+# retried under the legacy key and hits are copied forward. Only values in
+# the current codec format are worth it (older ones read as misses anyway),
+# and every miss pays a second round trip, so leave it off otherwise.
+LEGACY_KEY_READS = os.getenv("CACHE_LEGACY_KEY_READS", "False") == "True"
+
+
+def key_digest(*fields: str) -> str:
+    hasher = _new_hasher()
+    for field in fields:
+        # surrogatepass: the JSON scheme accepted lone surrogates, so must this
+        data = field.encode("utf-8", "surrogatepass")
+        hasher.update(len(data).to_bytes(8, "little"))
+        hasher.update(data)
+    return hasher.hexdigest()
+
+
+def make_cache_key(text: str, src: str, tgt: str, lvl: str) -> str:
+    """Stable cache-key for a translation request."""
+    return f"translation:{KEY_NAMESPACE}:" + key_digest(text, src, tgt, lvl)
+
+
+def legacy_cache_key(text: str, src: str, tgt: str, lvl: str) -> str:
+    """The pre-v2 key of a translation request."""
+    return "translation:" + content_hash(text, src, tgt, lvl)
+
+
+def _legacy_get_many(keys: Dict[str, str], ttl: int) -> Dict[str, str]:
+    """Values for ``{key: legacy_key}`` found under their legacy keys.
+
+    Hits are copied to the new key so the next read needs one round trip.
+    Callers check ``LEGACY_KEY_READS`` before hashing the legacy keys.
+    """
+    if not keys:
+        return {}
+    from django.core.cache import cache
+
+    blobs = cache.get_many(list(keys.values()))
+    found, forward = {}, {}
+    for key, legacy in keys.items():
+        val = decode(blobs.get(legacy))
+        if val:
+            found[key] = val
+            forward[key] = blobs[legacy]
+    if forward:
+        cache.set_many(forward, ttl)
+    return found
+
+
+def translation_get_many(keys: Dict[str, Tuple[str, str, str, str]]) -> Dict[str, str]:
+    """L2 lookup of ``{make_cache_key(*request): request}``.
+
+    One ``get_many`` for the keys, plus one for the legacy keys of the
+    misses while ``LEGACY_KEY_READS`` is on.
+    """
+    if not keys:
+        return {}
+    from django.core.cache import cache
+
+    found = {}
+    for key, blob in cache.get_many(list(keys)).items():
+        val = decode(blob)
+        if val:
+            found[key] = val
+    if LEGACY_KEY_READS:
+        legacy = {k: legacy_cache_key(*r) for k, r in keys.items() if k not in found}
+        found.update(_legacy_get_many(legacy, _TRANSLATION_TTL))
+    return found
+
+
+def translation_get(key: str, text: str, src: str, tgt: str, lvl: str):
+    """L2 lookup of one translation (``key`` is its ``make_cache_key``)."""
+    from django.core.cache import cache
+
+    val = decode(cache.get(key))
+    if val or not LEGACY_KEY_READS:
+        return val
+    legacy = {key: legacy_cache_key(text, src, tgt, lvl)}
+    return _legacy_get_many(legacy, _TRANSLATION_TTL).get(key)
+
+
+def cache_keys_for(text: str, src: str, tgt: str, lvl: str) -> List[str]:
+    """Every L2 key a translation may be stored under (for invalidation).
+
+    Legacy keys are only read, so only invalidated, while
+    ``LEGACY_KEY_READS`` is on.
+    """
+    keys = [make_cache_key(text, src, tgt, lvl)]
+    if LEGACY_KEY_READS:
+        keys.append(legacy_cache_key(text, src, tgt, lvl))
+    return keys
@@ -0,0 +1,38 @@
+"""Per-task chunk checkpoints for resumable Celery translations.
+
+Celery keeps the task id across retries, so translated chunks are stored
+under ``task:checkpoint:<task_id>:<index>`` as they finish. A retry after a
+failure on chunk 17 of 20 restores the other 19 from here, even if the
+shared chunk cache has evicted them in the meantime, and only re-sends the
+chunk that failed. Entries are removed once the translation is persisted.
+"""
+
+import os
+from typing import Dict
+
+from django.core.cache import cache
+
+CHECKPOINT_TTL = int(os.getenv("TASK_CHECKPOINT_TTL", 24 * 3600))  # seconds
+
+
+class ChunkCheckpoint:
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self._count = 0
+
+    def _key(self, index: int) -> str:
+        return f"task:checkpoint:{self.task_id}:{index}"
+
+    def load(self, count: int) -> Dict[int, str]:
+        """Return ``{chunk_index: translation}`` saved by earlier attempts."""
+        self._count = count
+        keys = {self._key(i): i for i in range(count)}
+        return {keys[k]: v for k, v in cache.get_many(list(keys)).items()}
+
+    def save(self, translations: Dict[int, str]) -> None:
+        cache.set_many(
+            {self._key(i): t for i, t in translations.items()}, CHECKPOINT_TTL
+        )
+
+    def clear(self) -> None:
+        cache.delete_many([self._key(i) for i in range(self._count)])
@@ -0,0 +1,257 @@
+"""Versioned binary encoding of translations in the shared (L2) cache.
+
+Every translation, chunk and single-flight result written to the cache is
+``encode(text)``: one header byte followed by the payload. The header is
+``0x80 | version << 4 | codec``:
+
+- bit 7 is always set, so a blob is never mistaken for the (ASCII) JSON
+  that :class:`BinarySerializer` writes for every other cache value;
+- bits 4-6 hold the format version (``VERSION``);
+- bits 0-3 name the codec: ``IDENTITY`` (UTF-8), ``ZLIB``, ``LZ4`` or
+  ``ZSTD``.
+
+Compression is configured per process:
+
+- ``CACHE_CODEC`` (``zlib``/``lz4``/``zstd``, default ``zlib``) and
+  ``CACHE_CODEC_LEVEL`` pick the compressor. ``lz4`` and ``zstd`` need
+  the optional ``lz4``/``zstandard`` packages; without them ``zlib`` is
+  used.
+- Values shorter than ``CACHE_COMPRESS_MIN_BYTES`` (UTF-8) are stored
+  uncompressed, as is anything compression would not shrink.
+- ``CACHE_ZSTD_DICT`` lists dictionary files (``os.pathsep``-separated)
+  built by ``manage.py train_cache_dict``. The first one compresses new
+  ``zstd`` values; all of them decode, so old entries survive a
+  dictionary rotation. zstd frames carry the dictionary id.
+
+Every process can read every codec it has the library for, whatever it
+writes. :func:`decode` returns None for anything it does not understand
+(values written before this format, another version, a codec or
+dictionary this process lacks, a corrupt payload), so such entries simply
+read as misses and are rewritten on the next store.
+
+With Redis, :class:`BinarySerializer` stores blobs as-is instead of
+running them through JSON; progress markers, locks and throttle history
+keep their JSON encoding. The local-memory cache pickles values and
+needs no serializer.
+"""
+
+import logging
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django_redis.serializers.json import JSONSerializer
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+IDENTITY = 0
+ZLIB = 1
+LZ4 = 2
+ZSTD = 3
+
+CODEC_NAMES = {"identity": IDENTITY, "zlib": ZLIB, "lz4": LZ4, "zstd": ZSTD}
+MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 128))
+
+_MARKER = 0x80
+
+
+class CodecUnavailable(Exception):
+    """The library a codec needs is not installed."""
+
+
+class _Zlib:
+    codec = ZLIB
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = -1 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class _Lz4:
+    codec = LZ4
+
+    def __init__(self, level: Optional[int] = None):
+        try:
+            import lz4.frame
+        except ImportError as e:
+            raise CodecUnavailable("lz4 codec requires the lz4 package") from e
+        self._frame = lz4.frame
+        self.level = level or 0
+
+    def compress(self, data: bytes) -> bytes:
+        return self._frame.compress(data, compression_level=self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._frame.decompress(data)
+
+
+class _Zstd:
+    """zstd, optionally with trained dictionaries (the first one writes)."""
+
+    codec = ZSTD
+
+    def __init__(self, level: Optional[int] = None, dictionaries: List[bytes] = ()):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise CodecUnavailable("zstd codec requires the zstandard package") from e
+        self._zstd = zstandard
+        self.level = 3 if level is None else level
+        dicts = [zstandard.ZstdCompressionDict(raw) for raw in dictionaries]
+        self._dicts = {d.dict_id(): d for d in reversed(dicts)}
+        self.dict_id = dicts[0].dict_id() if dicts else 0
+        # (De)compressor objects must not be shared between threads
+        self._local = threading.local()
+
+    def _state(self):
+        state = self._local
+        if not hasattr(state, "compressor"):
+            state.compressor = self._zstd.ZstdCompressor(
+                level=self.level, dict_data=self._dicts.get(self.dict_id)
+            )
+            state.decompressors = {}
+        return state
+
+    def compress(self, data: bytes) -> bytes:
+        return self._state().compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        dict_id = self._zstd.get_frame_parameters(data).dict_id
+        decompressors = self._state().decompressors
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            if dict_id and dict_id not in self._dicts:
+                raise ValueError(f"Unknown zstd dictionary {dict_id}")
+            decompressor = decompressors[dict_id] = self._zstd.ZstdDecompressor(
+                dict_data=self._dicts.get(dict_id)
+            )
+        return decompressor.decompress(data)
+
+
+_FACTORIES = {ZLIB: _Zlib, LZ4: _Lz4, ZSTD: _Zstd}
+
+
+def load_dictionaries(paths: Optional[str] = None) -> List[bytes]:
+    paths = os.getenv("CACHE_ZSTD_DICT", "") if paths is None else paths
+    return [Path(p).read_bytes() for p in paths.split(os.pathsep) if p]
+
+
+def _build(codec: int):
+    level = os.getenv("CACHE_CODEC_LEVEL")
+    level = int(level) if level else None
+    if codec == ZSTD:
+        return _Zstd(level, load_dictionaries())
+    return _FACTORIES[codec](level)
+
+
+class _Registry:
+    """Per-process compressors, built on first use."""
+
+    def __init__(self):
+        self._codecs: Dict[int, object] = {}
+        self._missing = set()
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def get(self, codec: int):
+        """The compressor for ``codec`` or None if it cannot be built."""
+        compressor = self._codecs.get(codec)
+        if compressor is None and codec in _FACTORIES and codec not in self._missing:
+            with self._lock:
+                try:
+                    compressor = self._codecs.setdefault(codec, _build(codec))
+                except CodecUnavailable:
+                    self._missing.add(codec)
+        return compressor
+
+    def writer(self):
+        if self._writer is None:
+            name = os.getenv("CACHE_CODEC", "zlib").lower()
+            writer = self.get(CODEC_NAMES.get(name, ZLIB))
+            if writer is None:
+                logger.warning("Cache codec %s unavailable, using zlib", name)
+                writer = self.get(ZLIB)
+            self._writer = writer
+        return self._writer
+
+    def reset(self) -> None:
+        """Forget built compressors (after changing the configuration)."""
+        with self._lock:
+            self._codecs.clear()
+            self._missing.clear()
+            self._writer = None
+
+
+registry = _Registry()
+
+
+def header(codec: int, version: int = VERSION) -> int:
+    return _MARKER | version << 4 | codec
+
+
+def encode(text: str, codec: Optional[int] = None) -> bytes:
+    """Encode ``text`` with ``codec`` (default: the configured one).
+
+    The default skips compression for short values and whenever it would
+    not save space.
+    """
+    payload = text.encode("utf-8")
+    if codec is None:
+        if len(payload) >= MIN_BYTES:
+            writer = registry.writer()
+            compressed = writer.compress(payload)
+            if len(compressed) < len(payload):
+                return bytes((header(writer.codec),)) + compressed
+        codec = IDENTITY
+    elif codec != IDENTITY:
+        compressor = registry.get(codec)
+        if compressor is None:
+            raise CodecUnavailable(f"Cache codec {codec} is not available")
+        payload = compressor.compress(payload)
+    return bytes((header(codec),)) + payload
+
+
+def decode(blob) -> Optional[str]:
+    """Return the text stored in ``blob``, or None if it is not one of ours."""
+    if not isinstance(blob, (bytes, bytearray)) or not blob:
+        return None
+    head = blob[0]
+    if head & 0xF0 != header(0):
+        return None
+    payload = bytes(blob[1:])
+    codec = head & 0x0F
+    try:
+        if codec != IDENTITY:
+            compressor = registry.get(codec)
+            if compressor is None:
+                return None
+            payload = compressor.decompress(payload)
+        return payload.decode("utf-8")
+    except Exception:  # corrupt payload or unknown dictionary: a miss
+        return None
+
+
+def is_blob(value: bytes) -> bool:
+    return bool(value) and value[0] & _MARKER == _MARKER
+
+
+class BinarySerializer(JSONSerializer):
+    """django-redis serializer: codec blobs raw, everything else JSON."""
+
+    def dumps(self, value) -> bytes:
+        if isinstance(value, (bytes, bytearray)) and is_blob(value):
+            return bytes(value)
+        return super().dumps(value)
+
+    def loads(self, value: bytes):
+        if is_blob(value):
+            return value
+        return super().loads(value)
@@ -0,0 +1,123 @@
+"""File downloads with HTTP Range support (single byte ranges).
+
+Used for background export files so an interrupted download can resume with
+``Range: bytes=<offset>-`` instead of starting over. ``If-Range`` is honoured
+against a size/mtime ETag (export files are written once, atomically), so a
+client never stitches together parts of two different files. Multi-range
+requests are answered with the full file, which RFC 9110 permits.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+
+BLOCK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Return inclusive ``(start, end)`` for a single byte range, else None.
+
+    Malformed or multi-range headers are ignored (None -> full response);
+    a syntactically valid range outside the file raises
+    :class:`RangeNotSatisfiable`.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def iter_file(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            block = fh.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+async def aiter_file(path: Path, start: int, length: int) -> AsyncIterator[bytes]:
+    """Async :func:`iter_file`; blocking reads run in the thread pool."""
+    fh = await sync_to_async(open)(path, "rb")
+    try:
+        await sync_to_async(fh.seek)(start)
+        while length > 0:
+            block = await sync_to_async(fh.read)(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        fh.close()
+
+
+def ranged_file_response(
+    request,
+    path: Path,
+    content_type: str,
+    filename: str,
+    asynchronous: bool = False,
+):
+    """Serve ``path`` honouring ``Range``/``If-Range``.
+
+    ``asynchronous`` selects an async body iterator so the ASGI handler
+    streams the file instead of buffering it.
+    """
+    stat = path.stat()
+    size = stat.st_size
+    etag = _etag(stat)
+    header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if if_range is not None and if_range != etag:
+        header = None  # file changed since the client's partial copy
+
+    try:
+        byte_range = parse_range(header, size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    length = end - start + 1 if size else 0
+    body = (aiter_file if asynchronous else iter_file)(path, start, length)
+    response = StreamingHttpResponse(
+        body, status=206 if byte_range else 200, content_type=content_type
+    )
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
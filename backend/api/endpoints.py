@@ -0,0 +1,263 @@
+"""Upstream LLM endpoints with circuit breakers and latency tracking.
+
+``LLM_ENDPOINTS`` (JSON) configures an ordered list of OpenAI-compatible
+chat-completion endpoints, e.g.::
+
+    [{"name": "gemma", "url": "https://openrouter.ai/api/v1/chat/completions",
+      "model": "google/gemma-3-27b-it:free", "timeout": 20},
+     {"name": "llama", "url": "https://openrouter.ai/api/v1/chat/completions",
+      "model": "meta-llama/llama-3.3-70b-instruct:free",
+      "api_key_env": "OPENROUTER_API_KEY"}]
+
+Without it, the single OpenRouter/Gemma endpoint is used. Every endpoint
+has a circuit breaker (open after ``LLM_BREAKER_FAILURES`` consecutive
+failures, half-open again after ``LLM_BREAKER_RESET`` seconds) and a
+rolling latency window. :meth:`EndpointPool.ranked` orders the healthy
+endpoints fastest first (by p50; endpoints without enough samples keep
+their configured order behind measured ones), and
+:meth:`EndpointPool.hedge_delay` gives the p95 after which the engine fires
+a hedged request at the runner-up. State is per process.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "google/gemma-3-27b-it:free"
+
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", 30))  # seconds
+LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", 200))
+MIN_SAMPLES = 20  # below this, percentiles are too noisy to route or hedge on
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open after reset.
+
+    While half-open, a single probe request is let through (:meth:`allow`);
+    its result closes the breaker again or re-opens it for another
+    ``reset_timeout``. A probe that never reports back (cancelled, crashed)
+    is given up after ``reset_timeout`` so another one can be sent.
+    """
+
+    __slots__ = (
+        "threshold",
+        "reset_timeout",
+        "failures",
+        "opened_at",
+        "probe_started",
+        "_clock",
+    )
+
+    def __init__(
+        self,
+        threshold: int = BREAKER_FAILURES,
+        reset_timeout: float = BREAKER_RESET,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started: Optional[float] = None
+        self._clock = clock
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def _probing(self) -> bool:
+        return (
+            self.probe_started is not None
+            and self._clock() - self.probe_started < self.reset_timeout
+        )
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self._probing())
+
+    def allow(self) -> bool:
+        """Claim a request; while half-open only the first caller gets one."""
+        if not self.available():
+            return False
+        if self.state == "half-open":
+            self.probe_started = self._clock()
+        return True
+
+    def release(self) -> None:
+        """Give up a claimed probe without a verdict."""
+        self.probe_started = None
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker half-opens (0 if not open)."""
+        if self.opened_at is None:
+            return 0.0
+        if self.state == "half-open" and self._probing():
+            return min(1.0, self.reset_timeout)  # the probe decides soon
+        return max(0.0, self.opened_at + self.reset_timeout - self._clock())
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.threshold:
+            self.opened_at = self._clock()
+        self.probe_started = None
+
+
+class LatencyTracker:
+    """Rolling window of successful response times (seconds)."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile ``q`` in [0, 100], None without samples."""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        rank = max(1, math.ceil(q / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    def p95(self) -> Optional[float]:
+        return self.percentile(95)
+
+
+class Endpoint:
+    def __init__(
+        self,
+        name: str,
+        url: str = OPENROUTER_URL,
+        model: str = MODEL,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.api_key = api_key  # None -> the engine's key
+        self.timeout = timeout  # None -> the shared client's timeout
+        self.breaker = CircuitBreaker(clock=clock)
+        self.latency = LatencyTracker()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Claim a request slot (see :meth:`CircuitBreaker.allow`)."""
+        with self._lock:
+            return self.breaker.allow()
+
+    def release(self) -> None:
+        """Return a claimed slot whose request gave no health verdict."""
+        with self._lock:
+            self.breaker.release()
+
+    def record(self, ok: bool, seconds: float) -> None:
+        with self._lock:
+            if ok:
+                self.breaker.record_success()
+                self.latency.record(seconds)
+            else:
+                self.breaker.record_failure()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "state": self.breaker.state,
+            "samples": len(self.latency),
+            "p50": self.latency.p50(),
+            "p95": self.latency.p95(),
+        }
+
+
+class EndpointPool:
+    def __init__(self, endpoints: List[Endpoint]):
+        if not endpoints:
+            raise ValueError("At least one LLM endpoint is required")
+        self.endpoints = endpoints
+
+    def ranked(self) -> List[Endpoint]:
+        """Healthy endpoints, fastest first; empty if every breaker is open."""
+
+        def key(item):
+            index, endpoint = item
+            measured = len(endpoint.latency) >= MIN_SAMPLES
+            return (0, endpoint.latency.p50(), index) if measured else (1, 0, index)
+
+        healthy = [
+            (i, e) for i, e in enumerate(self.endpoints) if e.breaker.available()
+        ]
+        return [e for _, e in sorted(healthy, key=key)]
+
+    def retry_after(self) -> float:
+        """Seconds until the first open breaker half-opens."""
+        return min(e.breaker.retry_after() for e in self.endpoints)
+
+    @staticmethod
+    def hedge_delay(endpoint: Endpoint) -> Optional[float]:
+        """p95 of ``endpoint`` once it has enough samples, else None."""
+        if len(endpoint.latency) < MIN_SAMPLES:
+            return None
+        return endpoint.latency.p95()
+
+    def stats(self) -> List[dict]:
+        return [e.stats() for e in self.endpoints]
+
+
+def load_endpoints(raw: Optional[str] = None) -> List[Endpoint]:
+    """Build endpoints from ``LLM_ENDPOINTS`` JSON (or the default one)."""
+    raw = os.getenv("LLM_ENDPOINTS") if raw is None else raw
+    if not raw:
+        return [Endpoint("openrouter")]
+    endpoints = []
+    for index, conf in enumerate(json.loads(raw)):
+        key_env = conf.get("api_key_env")
+        endpoints.append(
+            Endpoint(
+                name=conf.get("name") or f"endpoint-{index}",
+                url=conf.get("url", OPENROUTER_URL),
+                model=conf.get("model", MODEL),
+                api_key=os.getenv(key_env) if key_env else None,
+                timeout=conf.get("timeout"),
+            )
+        )
+    return endpoints
+
+
+_pool: Optional[EndpointPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> EndpointPool:
+    """Process-wide pool configured from the environment."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = EndpointPool(load_endpoints())
+    return _pool
@@ -0,0 +1,812 @@
+"""Shared LLM translation engine used by TranslateView and the Celery task.
+
+Both entry points go through :class:`TranslationEngine` so prompt building,
+sampling, retry/backoff and chunk caching behave identically whether a
+translation is served inline or from a worker.
+"""
+
+import asyncio
+import json
+import os
+import re
+import secrets
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from .cache_utils import chunk_get_many, chunk_set_many
+from .endpoints import MODEL, OPENROUTER_URL, Endpoint, EndpointPool, get_pool
+from .http_client import get_async_client, get_client
+from .metrics import (
+    TRANSLATION_CHUNKS,
+    UPSTREAM_RETRIES,
+    cache_lookup,
+    observe_upstream,
+)
+from .models import Translation
+from .ratelimit import get_limiter
+from .segmenter import MAX_CHARS_PER_REQUEST
+from .segmenter import split_into_chunks as _split_into_chunks
+
+HEDGE = os.getenv("LLM_HEDGE", "1") == "1"
+
+# --- Prompt helpers (leaner prompts & optional chunking) --------------------
+SYSTEM_PROMPT = (
+    "You are a professional translator. Reply ONLY with the translated text. "
+    "Follow exact style in user prompt (simple/basic vs fluent/natural). "
+    "Do not add explanations, titles, or extra text."
+)
+
+LEVEL_CONFIGS = {
+    "A1": {
+        "temperature": 0.2,
+        "top_p": 0.7,
+        "style": "very simple German (A1): basic words, short sentences.",
+    },
+    "A2": {
+        "temperature": 0.4,
+        "top_p": 0.8,
+        "style": "simple German (A2): basic grammar/common words, everyday phrases.",
+    },
+    "B1": {
+        "temperature": 0.6,
+        "top_p": 0.9,
+        "style": "everyday German (B1): natural conversations/work/travel.",
+    },
+    "B2": {
+        "temperature": 0.8,
+        "top_p": 0.95,
+        "style": "advanced fluent German (B2): native-like, idiomatic.",
+    },
+}
+
+# Sampling used when no CEFR level applies (non-German targets)
+DEFAULT_SAMPLING = {"temperature": 0.5, "top_p": 0.9}
+
+LANG_NAMES = dict(Translation.LANG_CHOICES)
+
+# Batch prompts: each item is preceded by a marker line "<<nonce:index>>".
+# The nonce is chosen per batch so it never occurs inside the items.
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + (
+    " The text consists of separate segments, each preceded by a marker line "
+    "such as <<ab12:0>>. Translate every segment independently and reproduce "
+    "each marker line exactly, followed by its translation."
+)
+
+# Upstream statuses worth retrying; everything else fails immediately
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _build_prompt(text: str, src: str, tgt: str, level: str = "") -> str:
+    """Return a concise translation prompt for the LLM.
+
+    ``src``/``tgt`` are language codes; they are expanded to names here.
+    """
+    src_name = LANG_NAMES.get(src, src)
+    if tgt == "de" and level:
+        config = LEVEL_CONFIGS.get(level, {})
+        style = config.get("style", f"({level})")
+        return f"Translate from {src_name} to German using {style}:\n\n{text}"
+    return f"Translate from {src_name} to {LANG_NAMES.get(tgt, tgt)}:\n\n" + text
+
+
+def _parse_stream_line(line: str) -> Optional[str]:
+    """Return the content delta carried by one SSE line ("" when none).
+
+    Returns None for the terminal ``data: [DONE]`` line.
+    """
+    if not line.startswith("data:"):
+        return ""  # blank separators and ": keep-alive" comments
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return None
+    event = json.loads(data)
+    if "error" in event:
+        raise UpstreamError(str(event["error"].get("message", event["error"])))
+    choices = event.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+def _pack_batches(texts: List[str], budget: int, overhead: int) -> List[List[int]]:
+    """Greedily group item indexes so each packed prompt stays under budget."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    size = 0
+    for index, text in enumerate(texts):
+        cost = len(text) + overhead
+        if current and size + cost > budget:
+            batches.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _offload(func: Callable) -> Callable:
+    """Awaitable ``func`` run in a worker thread, off the event loop.
+
+    For the blocking Redis round trips (chunk cache, checkpoints, the shared
+    limiter) made from coroutines. They touch no database connection, so
+    they need not queue behind sync views on the thread-sensitive executor.
+    """
+    return sync_to_async(func, thread_sensitive=False)
+
+
+def _observe_chunks(translations: List[Optional[str]]) -> None:
+    TRANSLATION_CHUNKS.observe(len(translations))
+    for cached in translations:
+        cache_lookup("chunk", cached)
+
+
+def sampling_for(target_lang: str, level: str) -> Dict[str, float]:
+    """Return temperature/top_p for a request (CEFR levels only apply to German)."""
+    if target_lang == "de" and level in LEVEL_CONFIGS:
+        config = LEVEL_CONFIGS[level]
+        return {"temperature": config["temperature"], "top_p": config["top_p"]}
+    return dict(DEFAULT_SAMPLING)
+
+
+class UpstreamError(Exception):
+    """The LLM provider returned an error we could not recover from.
+
+    ``retry_after`` (seconds) is set when it is known when trying again
+    makes sense; views send it as ``Retry-After``.
+    """
+
+    status_code = 502
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message)
+        if status_code is not None:
+            self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class UpstreamRateLimited(UpstreamError):
+    """Upstream kept answering 429, or the shared token bucket is empty."""
+
+    status_code = 429
+
+
+class UpstreamUnavailable(UpstreamError):
+    """Upstream could not be reached (DNS, connect, timeout...)."""
+
+    status_code = 503
+
+
+class TranslationEngine:
+    """Translate text through the OpenRouter chat-completions API.
+
+    ``client``/``async_client`` are the pluggable transports: pass pre-built
+    ``httpx.Client``/``httpx.AsyncClient`` instances (e.g. with a
+    ``MockTransport`` in tests). When omitted, the process-wide pooled
+    clients from :mod:`.http_client` are used.
+
+    Requests go to the fastest healthy endpoint of an :class:`EndpointPool`
+    (``LLM_ENDPOINTS``; see :mod:`.endpoints`), falling over to the next one
+    when it fails or its circuit breaker is open. Async calls are hedged: if
+    the chosen endpoint has not answered after its p95 latency, the same
+    request is also sent to the runner-up and the first success wins.
+    Passing ``url``/``model`` pins the engine to that single endpoint.
+
+    Every upstream call first takes a token from the shared rate limiter
+    (:mod:`.ratelimit`). ``max_wait`` caps how long a single wait (for a
+    token or a retry backoff) may be: longer waits raise
+    :class:`UpstreamError` with ``retry_after`` instead of sleeping, so web
+    workers fail fast and Celery tasks can re-queue with a countdown.
+    ``None`` waits as long as needed.
+    """
+
+    def __init__(
+        self,
+        client: Optional[httpx.Client] = None,
+        async_client: Optional[httpx.AsyncClient] = None,
+        url: Optional[str] = None,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_retries: int = 3,
+        backoff: float = 2,
+        max_backoff: float = 30,
+        concurrency: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        limiter=None,
+        max_wait: Optional[float] = None,
+        endpoints: Optional[EndpointPool] = None,
+        hedge: bool = HEDGE,
+    ):
+        self.client = client
+        self.async_client = async_client
+        if endpoints is None and (url or model):
+            endpoints = EndpointPool(
+                [Endpoint("default", url or OPENROUTER_URL, model or MODEL)]
+            )
+        self.endpoints = endpoints
+        self.model = model or MODEL
+        self.hedge = hedge
+        self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.concurrency = concurrency or int(os.getenv("PARALLEL_CHUNK_LIMIT", 5))
+        self.sleep = sleep
+        self.limiter = limiter
+        self.max_wait = max_wait
+
+    # ---------------- Request building ----------------
+    def headers(self, endpoint: Optional[Endpoint] = None) -> Dict[str, str]:
+        api_key = (endpoint and endpoint.api_key) or self.api_key
+        return {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def build_payload(
+        self,
+        chunk: str,
+        src: str,
+        tgt: str,
+        level: str,
+        system: str = SYSTEM_PROMPT,
+    ) -> dict:
+        sampling = sampling_for(tgt, level)
+        return {
+            "model": self.model,
+            "max_tokens": max(60, int(len(chunk.split()) * 4)),
+            "temperature": sampling["temperature"],
+            "top_p": sampling["top_p"],
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": _build_prompt(chunk, src, tgt, level)},
+            ],
+        }
+
+    # ---------------- Retry policy ----------------
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Seconds to wait before retry ``attempt`` (1-based)."""
+        backoff = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        if response is not None:
+            ra = response.headers.get("Retry-After")
+            try:
+                return min(float(ra), self.max_backoff) if ra else backoff
+            except ValueError:
+                return backoff
+        return backoff
+
+    def _should_retry(self, attempt: int, response: Optional[httpx.Response]):
+        if attempt > self.max_retries:
+            return False
+        return response is None or response.status_code in RETRY_STATUSES
+
+    @staticmethod
+    def _raise_for(
+        response: Optional[httpx.Response],
+        exc: Exception = None,
+        retry_after: Optional[float] = None,
+    ):
+        if response is None:
+            raise UpstreamUnavailable(
+                "Upstream translation service unavailable. Please try later.",
+                retry_after=retry_after,
+            ) from exc
+        if response.status_code == 429:
+            if retry_after is None:
+                try:
+                    retry_after = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    pass
+            raise UpstreamRateLimited(
+                "Upstream rate limit still exceeded. Please try later.",
+                retry_after=retry_after,
+            )
+        raise UpstreamError(
+            f"Upstream returned HTTP {response.status_code}",
+            status_code=response.status_code,
+            retry_after=retry_after,
+        )
+
+    def _backoff_or_raise(
+        self,
+        attempt: int,
+        response: Optional[httpx.Response],
+        exc: Exception,
+        tried: Optional[set] = None,
+    ) -> float:
+        """Return the delay before the next attempt, or raise if giving up.
+
+        Failing over to a healthy endpoint not ``tried`` yet needs no backoff.
+        """
+        if not self._should_retry(attempt, response):
+            self._raise_for(response, exc)
+        reason = "error" if response is None else str(response.status_code)
+        UPSTREAM_RETRIES.labels(reason=reason).inc()
+        if tried and any(e not in tried for e in self._get_pool().ranked()):
+            return 0.0
+        delay = self._retry_delay(attempt, response)
+        if response is not None and response.status_code == 429:
+            # Upstream is the authority: hold every process back, not just us
+            self._get_limiter().pause(delay)
+        if self.max_wait is not None and delay > self.max_wait:
+            self._raise_for(response, exc, retry_after=delay)
+        return delay
+
+    # ---------------- Endpoint selection ----------------
+    def _get_pool(self) -> EndpointPool:
+        return self.endpoints or get_pool()
+
+    def _ranked_endpoints(self, tried: set = frozenset()) -> List[Endpoint]:
+        """Healthy endpoints, not yet ``tried`` ones first, each group best first.
+
+        Raises :class:`UpstreamUnavailable` at once if every breaker is open.
+        """
+        pool = self._get_pool()
+        ranked = pool.ranked()
+        if not ranked:
+            raise UpstreamUnavailable(
+                "Upstream translation service unavailable. Please try later.",
+                retry_after=pool.retry_after(),
+            )
+        return [e for e in ranked if e not in tried] + [
+            e for e in ranked if e in tried
+        ]
+
+    def _claim(self, ranked: List[Endpoint], exclude=()) -> Optional[Endpoint]:
+        """First endpoint of ``ranked`` that grants a request slot.
+
+        A half-open endpoint admits one probe at a time, so an endpoint
+        that was ranked may still turn the request away.
+        """
+        for endpoint in ranked:
+            if endpoint not in exclude and endpoint.acquire():
+                return endpoint
+        return None
+
+    def _next_endpoint(self, tried: set) -> Endpoint:
+        endpoint = self._claim(self._ranked_endpoints(tried))
+        if endpoint is None:
+            raise UpstreamUnavailable(
+                "Upstream translation service unavailable. Please try later.",
+                retry_after=self._get_pool().retry_after(),
+            )
+        return endpoint
+
+    @staticmethod
+    def _record(endpoint: Endpoint, response, exc, started: float) -> None:
+        elapsed = time.monotonic() - started
+        observe_upstream(
+            endpoint.name, None if response is None else response.status_code, elapsed
+        )
+        # Client errors (400, 401...) say nothing about endpoint health
+        if exc is not None or (
+            response is not None and response.status_code in RETRY_STATUSES
+        ):
+            endpoint.record(False, 0.0)
+        elif response is not None and response.is_success:
+            endpoint.record(True, elapsed)
+        else:
+            endpoint.release()
+
+    def _request_kwargs(self, endpoint: Endpoint, payload: dict) -> dict:
+        kwargs = {
+            "json": {**payload, "model": endpoint.model},
+            "headers": self.headers(endpoint),
+        }
+        if endpoint.timeout is not None:
+            kwargs["timeout"] = endpoint.timeout
+        return kwargs
+
+    # ---------------- Rate limiting ----------------
+    def _get_limiter(self):
+        return self.limiter or get_limiter()
+
+    def _token_wait(self) -> float:
+        """Take a token (0) or return the wait; raise if beyond ``max_wait``."""
+        wait = self._get_limiter().acquire()
+        if wait and self.max_wait is not None and wait > self.max_wait:
+            raise UpstreamRateLimited(
+                "Translation rate limit reached. Please try later.",
+                retry_after=wait,
+            )
+        return wait
+
+    def _take_token(self) -> None:
+        while True:
+            wait = self._token_wait()
+            if not wait:
+                return
+            self.sleep(wait)
+
+    async def _atake_token(self) -> None:
+        while True:
+            wait = await _offload(self._token_wait)()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _extract(response: httpx.Response) -> str:
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+    # ---------------- Single chunk ----------------
+    def _complete(self, client: httpx.Client, payload: dict) -> str:
+        """POST one chat completion with retry/backoff; return its content."""
+        attempt = 0
+        tried = set()
+        while True:
+            attempt += 1
+            response, exc = None, None
+            self._take_token()
+            endpoint = self._next_endpoint(tried)
+            started = time.monotonic()
+            try:
+                response = client.post(
+                    endpoint.url, **self._request_kwargs(endpoint, payload)
+                )
+            except httpx.RequestError as e:
+                exc = e
+            self._record(endpoint, response, exc, started)
+            if response is not None and response.is_success:
+                return self._extract(response)
+            tried.add(endpoint)
+            delay = self._backoff_or_raise(attempt, response, exc, tried)
+            if delay:
+                self.sleep(delay)
+
+    def translate_chunk(
+        self, client: httpx.Client, chunk: str, src: str, tgt: str, level: str
+    ) -> str:
+        return self._complete(client, self.build_payload(chunk, src, tgt, level))
+
+    async def _apost(
+        self, client: httpx.AsyncClient, endpoint: Endpoint, payload: dict
+    ) -> Tuple[Endpoint, Optional[httpx.Response], Optional[Exception]]:
+        response, exc = None, None
+        started = time.monotonic()
+        try:
+            response = await client.post(
+                endpoint.url, **self._request_kwargs(endpoint, payload)
+            )
+        except httpx.RequestError as e:
+            exc = e
+        except BaseException:  # cancelled (lost a hedge race): no verdict
+            endpoint.release()
+            raise
+        self._record(endpoint, response, exc, started)
+        return endpoint, response, exc
+
+    async def _ahedged_post(
+        self,
+        client: httpx.AsyncClient,
+        ranked: List[Endpoint],
+        payload: dict,
+        tried: set,
+    ) -> Tuple[Endpoint, Optional[httpx.Response], Optional[Exception]]:
+        """POST to the first endpoint; after its p95, also to the next one.
+
+        Returns the first successful result (cancelling the other request),
+        or the primary's failure if neither succeeds. Every endpoint that
+        failed is added to ``tried``.
+        """
+        first = self._claim(ranked)
+        if first is None:
+            raise UpstreamUnavailable(
+                "Upstream translation service unavailable. Please try later.",
+                retry_after=self._get_pool().retry_after(),
+            )
+        primary = asyncio.ensure_future(self._apost(client, first, payload))
+        delay = (
+            self._get_pool().hedge_delay(first)
+            if self.hedge and len(ranked) > 1
+            else None
+        )
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        # Hedge only with a token to spare; never wait for one
+        if done or await _offload(self._get_limiter().acquire)():
+            return await primary
+        second = self._claim(ranked, exclude=(first,))
+        if second is None:
+            return await primary
+
+        hedge = asyncio.ensure_future(self._apost(client, second, payload))
+        tasks = [primary, hedge]
+        failure = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result[1] is not None and result[1].is_success:
+                    return result
+                tried.add(result[0])
+                if result[0] is first or failure is None:
+                    failure = result
+        finally:
+            for task in tasks:
+                task.cancel()
+        return failure
+
+    async def _acomplete(self, client: httpx.AsyncClient, payload: dict) -> str:
+        attempt = 0
+        tried = set()
+        while True:
+            attempt += 1
+            ranked = self._ranked_endpoints(tried)
+            await self._atake_token()
+            endpoint, response, exc = await self._ahedged_post(
+                client, ranked, payload, tried
+            )
+            if response is not None and response.is_success:
+                return self._extract(response)
+            tried.add(endpoint)
+            # May pause the shared (Redis) limiter
+            delay = await _offload(self._backoff_or_raise)(
+                attempt, response, exc, tried
+            )
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def atranslate_chunk(
+        self, client: httpx.AsyncClient, chunk: str, src: str, tgt: str, level: str
+    ) -> str:
+        return await self._acomplete(
+            client, self.build_payload(chunk, src, tgt, level)
+        )
+
+    async def astream_chunk(
+        self, client: httpx.AsyncClient, chunk: str, src: str, tgt: str, level: str
+    ) -> AsyncIterator[str]:
+        """Yield content deltas for one chunk using OpenRouter ``stream: true``.
+
+        Retries apply only until the first delta has been yielded; a failure
+        mid-stream is raised as :class:`UpstreamUnavailable`.
+        """
+        payload = self.build_payload(chunk, src, tgt, level)
+        payload["stream"] = True
+        attempt = 0
+        tried = set()
+        while True:
+            attempt += 1
+            response, exc, started = None, None, False
+            await self._atake_token()
+            endpoint = self._next_endpoint(tried)
+            t0 = time.monotonic()
+            try:
+                async with client.stream(
+                    "POST", endpoint.url, **self._request_kwargs(endpoint, payload)
+                ) as response:
+                    if response.is_success:
+                        async for line in response.aiter_lines():
+                            delta = _parse_stream_line(line)
+                            if delta is None:
+                                break
+                            if delta:
+                                started = True
+                                yield delta
+                        self._record(endpoint, response, None, t0)
+                        return
+            except httpx.RequestError as e:
+                self._record(endpoint, None, e, t0)
+                if started:
+                    raise UpstreamUnavailable(
+                        "Upstream stream interrupted. Please try later."
+                    ) from e
+                exc, response = e, None
+            except BaseException:  # consumer went away mid-stream: no verdict
+                endpoint.release()
+                raise
+            else:
+                self._record(endpoint, response, None, t0)
+            tried.add(endpoint)
+            # May pause the shared (Redis) limiter
+            delay = await _offload(self._backoff_or_raise)(
+                attempt, response, exc, tried
+            )
+            if delay:
+                await asyncio.sleep(delay)
+
+    # ---------------- Whole text ----------------
+    def translate(self, text: str, src: str, tgt: str, level: str) -> str:
+        """Translate ``text`` chunk by chunk (sync), reusing cached chunks.
+
+        Cached chunks are read in one round trip; translated ones are written
+        back together, even if a later chunk fails.
+        """
+        chunks = _split_into_chunks(text)
+        translations = chunk_get_many(chunks, src, tgt, level)
+        _observe_chunks(translations)
+        pending = [i for i, cached in enumerate(translations) if not cached]
+        client = self.client or get_client()
+        try:
+            for index in pending:
+                translations[index] = self.translate_chunk(
+                    client, chunks[index], src, tgt, level
+                )
+        finally:
+            chunk_set_many(
+                ((chunks[i], translations[i]) for i in pending if translations[i]),
+                src,
+                tgt,
+                level,
+            )
+        return "\n".join(translations)
+
+    async def atranslate(
+        self,
+        text: str,
+        src: str,
+        tgt: str,
+        level: str,
+        on_progress: Optional[Callable[[List[Optional[str]]], None]] = None,
+        checkpoint=None,
+    ) -> str:
+        """Translate ``text`` with all uncached chunks in flight concurrently.
+
+        Cached chunks are read in one round trip. If any chunk fails, the
+        first error is re-raised after the others complete and every chunk
+        that did finish is cached (in one write), so a retry only re-sends
+        the chunks that failed. Output keeps the input chunk order.
+
+        ``on_progress`` receives the per-chunk translations (None while
+        pending) after the cache lookup and whenever a chunk finishes.
+        ``checkpoint`` (a :class:`~.checkpoint.ChunkCheckpoint`) restores
+        chunks finished by an earlier attempt and records new ones. Both
+        may block (Redis, the Celery result backend), so they run in worker
+        threads like the chunk cache round trips.
+        """
+        chunks = _split_into_chunks(text)
+        restored = (
+            await _offload(checkpoint.load)(len(chunks))
+            if checkpoint is not None
+            else {}
+        )
+        translations: List[Optional[str]] = [None] * len(chunks)
+        for index, restored_text in restored.items():
+            translations[index] = restored_text
+        lookup = [i for i, t in enumerate(translations) if not t]
+        cached = await _offload(chunk_get_many)(
+            [chunks[i] for i in lookup], src, tgt, level
+        )
+        for index, translated in zip(lookup, cached):
+            translations[index] = translated
+        _observe_chunks(translations)
+        if checkpoint is not None:
+            hits = {
+                i: t for i, t in enumerate(translations) if t and i not in restored
+            }
+            if hits:
+                await _offload(checkpoint.save)(hits)
+        pending = [i for i, cached in enumerate(translations) if not cached]
+        if not pending:
+            return "\n".join(translations)
+
+        # Reports run one at a time, so a slow one never overwrites a newer one
+        progress_lock = asyncio.Lock()
+
+        async def _report() -> None:
+            if on_progress is not None:
+                async with progress_lock:
+                    await _offload(on_progress)(list(translations))
+
+        await _report()
+
+        # Bound concurrency to avoid too many parallel upstream calls
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _run_chunk(client: httpx.AsyncClient, index: int) -> None:
+            async with sem:
+                translated = await self.atranslate_chunk(
+                    client, chunks[index], src, tgt, level
+                )
+            if checkpoint is not None:
+                await _offload(checkpoint.save)({index: translated})
+            translations[index] = translated
+            await _report()
+
+        client = self.async_client or get_async_client()
+        try:
+            results = await asyncio.gather(
+                *(_run_chunk(client, i) for i in pending), return_exceptions=True
+            )
+        finally:
+            await _offload(chunk_set_many)(
+                [(chunks[i], translations[i]) for i in pending if translations[i]],
+                src,
+                tgt,
+                level,
+            )
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+        return "\n".join(translations)
+
+    # ---------------- Many short texts ----------------
+    def translate_batch(
+        self, texts: List[str], src: str, tgt: str, level: str
+    ) -> List[str]:
+        """Translate many short texts with as few completions as possible.
+
+        Items are packed into marker-delimited prompts under
+        ``MAX_CHARS_PER_REQUEST``. Items too long to pack go through
+        :meth:`translate`. If a response cannot be split back (missing or
+        duplicated markers), the affected items are retried one by one.
+
+        An :class:`UpstreamError` carries the items finished so far as
+        ``partial`` (``None`` for the rest), so callers can keep what was
+        already paid for.
+        """
+        results: List[Optional[str]] = [None] * len(texts)
+        try:
+            self._translate_batch_into(results, texts, src, tgt, level)
+        except UpstreamError as e:
+            e.partial = results
+            raise
+        return results
+
+    def _translate_batch_into(
+        self,
+        results: List[Optional[str]],
+        texts: List[str],
+        src: str,
+        tgt: str,
+        level: str,
+    ) -> None:
+        client = self.client or get_client()
+        nonce = secrets.token_hex(2)
+        while any(nonce in t for t in texts):
+            nonce = secrets.token_hex(4)
+        marker_re = re.compile(rf"^[ \t]*<<{nonce}:(\d+)>>[ \t]*$", re.M)
+
+        packable = []
+        for index, text in enumerate(texts):
+            if len(text) <= MAX_CHARS_PER_REQUEST:
+                packable.append(index)
+            else:
+                results[index] = self.translate(text, src, tgt, level)
+
+        overhead = len(f"<<{nonce}:{len(texts)}>>\n\n")
+        packed_texts = [texts[i] for i in packable]
+        for batch in _pack_batches(packed_texts, MAX_CHARS_PER_REQUEST, overhead):
+            items = [packable[b] for b in batch]
+            if len(items) == 1:
+                index = items[0]
+                results[index] = self.translate_chunk(
+                    client, texts[index], src, tgt, level
+                )
+                continue
+            prompt = "\n\n".join(f"<<{nonce}:{i}>>\n{texts[i]}" for i in items)
+            payload = self.build_payload(
+                prompt, src, tgt, level, system=BATCH_SYSTEM_PROMPT
+            )
+            parsed = self._split_batch(self._complete(client, payload), marker_re)
+            for index in items:
+                translated = parsed.get(index)
+                if not translated:
+                    translated = self.translate_chunk(
+                        client, texts[index], src, tgt, level
+                    )
+                results[index] = translated
+
+    @staticmethod
+    def _split_batch(content: str, marker_re: "re.Pattern") -> Dict[int, str]:
+        """Map item index -> translation; duplicated markers are dropped."""
+        parts = marker_re.split(content)
+        # split() yields [preamble, idx0, text0, idx1, text1, ...]
+        found: Dict[int, str] = {}
+        duplicates = set()
+        for raw_index, text in zip(parts[1::2], parts[2::2]):
+            index = int(raw_index)
+            if index in found:
+                duplicates.add(index)
+            found[index] = text.strip()
+        for index in duplicates:
+            found.pop(index, None)
+        return found
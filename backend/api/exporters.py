@@ -0,0 +1,308 @@
+"""Constant-memory export of a user's translation history.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` (a
+server-side cursor on Postgres) in batches and encoded incrementally, so
+memory use does not depend on the number of rows. Encoders produce bytes
+per batch and can be driven synchronously (WSGI, Celery) or asynchronously
+(ASGI, via ``aiterator``), optionally gzip-compressed on the fly.
+
+Formats: ``csv`` (same columns as the original export), ``ndjson`` and
+``parquet`` (requires the optional ``pyarrow`` package).
+
+Background exports (``tasks.export_history_task``) are written to
+``EXPORT_ROOT/<user_id>/<task_id>.<ext>``; the user id in the path is what
+scopes downloads to their owner.
+"""
+
+import csv
+import json
+import zlib
+from pathlib import Path
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from django.conf import settings
+
+from .models import Translation
+
+EXPORT_FIELDS = (
+    "created_at",
+    "source_lang",
+    "target_lang",
+    "level",
+    "input_text",
+    "output_text",
+)
+CSV_HEADER = (
+    "Date",
+    "Source Language",
+    "Target Language",
+    "Level",
+    "Input Text",
+    "Output Text",
+)
+DEFAULT_BATCH_SIZE = 2000
+
+
+class ExportFormatError(ValueError):
+    """Unknown export format or missing optional dependency."""
+
+
+class _Echo:
+    """Pseudo-buffer: ``csv.writer`` returns each written line unbuffered."""
+
+    def write(self, value):
+        return value
+
+
+class CsvEncoder:
+    content_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self):
+        self._writer = csv.writer(_Echo())
+
+    def begin(self) -> bytes:
+        return self._writer.writerow(CSV_HEADER).encode("utf-8")
+
+    def encode(self, rows: Sequence[tuple]) -> bytes:
+        write = self._writer.writerow
+        return "".join(
+            write(
+                (
+                    created_at.isoformat(sep=" ", timespec="seconds"),
+                    src,
+                    tgt,
+                    level or "-",
+                    input_text.replace("\n", " "),
+                    output_text.replace("\n", " "),
+                )
+            )
+            for created_at, src, tgt, level, input_text, output_text in rows
+        ).encode("utf-8")
+
+    def end(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    content_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def begin(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Sequence[tuple]) -> bytes:
+        return "".join(
+            json.dumps(
+                dict(zip(EXPORT_FIELDS, (row[0].isoformat(), *row[1:]))),
+                ensure_ascii=False,
+            )
+            + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+    def end(self) -> bytes:
+        return b""
+
+
+class _Sink:
+    """Write-only file object that hands written bytes back to the caller."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ParquetEncoder:
+    """One Parquet row group per batch, streamed as it is written."""
+
+    content_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:  # optional dependency
+            raise ExportFormatError("Parquet export requires pyarrow") from e
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("created_at", pa.timestamp("us", tz="UTC")),
+                ("source_lang", pa.string()),
+                ("target_lang", pa.string()),
+                ("level", pa.string()),
+                ("input_text", pa.string()),
+                ("output_text", pa.string()),
+            ]
+        )
+        self._sink = _Sink()
+        self._writer = pq.ParquetWriter(
+            self._sink, self._schema, compression="zstd"
+        )
+
+    def begin(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: Sequence[tuple]) -> bytes:
+        columns = list(zip(*rows)) if rows else [()] * len(EXPORT_FIELDS)
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(col, type=f.type) for col, f in zip(columns, self._schema)],
+            schema=self._schema,
+        )
+        self._writer.write_table(table)
+        return self._sink.drain()
+
+    def end(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+ENCODERS = {
+    "csv": CsvEncoder,
+    "ndjson": NdjsonEncoder,
+    "parquet": ParquetEncoder,
+}
+
+
+def get_encoder(fmt: str):
+    try:
+        return ENCODERS[fmt]()
+    except KeyError:
+        raise ExportFormatError(
+            f"Unknown export format '{fmt}'; use one of {', '.join(ENCODERS)}"
+        ) from None
+
+
+def history_queryset(user):
+    """``user`` may be a User instance or a primary key (Celery tasks)."""
+    return (
+        Translation.objects.filter(user=user)
+        .order_by("-created_at", "-id")
+        .values_list(*EXPORT_FIELDS)
+    )
+
+
+def _batched(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    batch: List[tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Gzip:
+    def __init__(self, enabled: bool):
+        # wbits=31 -> gzip container
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 31) if enabled else None
+
+    def feed(self, data: bytes) -> bytes:
+        return self._z.compress(data) if self._z else data
+
+    def finish(self) -> bytes:
+        return self._z.flush() if self._z else b""
+
+
+def iter_export(
+    queryset,
+    encoder,
+    gzip: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Iterator[bytes]:
+    """Yield the encoded export of ``queryset`` (a ``history_queryset``).
+
+    ``progress`` is called with the number of rows encoded so far after
+    each batch.
+    """
+    gz = _Gzip(gzip)
+    data = gz.feed(encoder.begin())
+    if data:
+        yield data
+    done = 0
+    for batch in _batched(queryset.iterator(chunk_size=batch_size), batch_size):
+        data = gz.feed(encoder.encode(batch))
+        done += len(batch)
+        if progress is not None:
+            progress(done)
+        if data:
+            yield data
+    data = gz.feed(encoder.end()) + gz.finish()
+    if data:
+        yield data
+
+
+async def aiter_export(
+    queryset, encoder, gzip: bool = False, batch_size: int = DEFAULT_BATCH_SIZE
+) -> AsyncIterator[bytes]:
+    """Async twin of :func:`iter_export` for ASGI streaming."""
+    gz = _Gzip(gzip)
+    data = gz.feed(encoder.begin())
+    if data:
+        yield data
+    batch: List[tuple] = []
+    async for row in queryset.aiterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            data = gz.feed(encoder.encode(batch))
+            batch = []
+            if data:
+                yield data
+    if batch:
+        data = gz.feed(encoder.encode(batch))
+        if data:
+            yield data
+    data = gz.feed(encoder.end()) + gz.finish()
+    if data:
+        yield data
+
+
+def export_dir(user_id) -> Path:
+    return Path(settings.EXPORT_ROOT) / str(int(user_id))
+
+
+def export_filename(task_id: str, encoder, gzip: bool = False) -> str:
+    return f"{task_id}.{encoder.extension}" + (".gz" if gzip else "")
+
+
+def find_export(user_id, task_id: str) -> Optional[Path]:
+    """Return the finished export file of ``task_id`` owned by ``user_id``."""
+    directory = export_dir(user_id)
+    for encoder_cls in ENCODERS.values():
+        for suffix in ("", ".gz"):
+            path = directory / f"{task_id}.{encoder_cls.extension}{suffix}"
+            if path.is_file():
+                return path
+    return None
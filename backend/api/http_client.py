@@ -0,0 +1,238 @@
+"""Process-wide pooled HTTP clients for upstream LLM calls.
+
+Creating an ``httpx.Client`` per request means every translation pays a
+fresh TCP + TLS handshake to openrouter.ai. Instead each process (gunicorn
+worker, Celery worker child) lazily builds one HTTP/2 client and keeps it
+for its lifetime:
+
+- ``get_client()`` returns the shared sync client.
+- ``get_async_client()`` returns the async client bound to the running
+  event loop (an ``AsyncClient`` cannot be shared across loops).
+- ``run_async(coro)`` runs a coroutine on a long-lived per-process loop so
+  sync callers such as Celery tasks reuse the same async pool between
+  tasks instead of starting a new loop (and pool) with ``asyncio.run``.
+
+Clients are dropped in forked children (never closed there: the sockets
+still belong to the parent) and closed on interpreter/worker shutdown.
+``pool_stats()`` reports connection reuse and pool wait time.
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+
+import httpx
+
+_lock = threading.Lock()
+_pid = os.getpid()
+_sync_client: Optional[httpx.Client] = None
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+
+
+# ---------------- Connection stats -------------------------------------
+class PoolStats:
+    """Thread-safe counters for requests, new connections and pool waits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+            self.pool_wait_total = 0.0
+            self.pool_wait_max = 0.0
+
+    def record(self, new_connection: bool, pool_wait: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.new_connections += int(new_connection)
+            self.pool_wait_total += pool_wait
+            self.pool_wait_max = max(self.pool_wait_max, pool_wait)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            reused = self.requests - self.new_connections
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "reuse_ratio": reused / self.requests if self.requests else 0.0,
+                "pool_wait_total_s": self.pool_wait_total,
+                "pool_wait_avg_s": (
+                    self.pool_wait_total / self.requests if self.requests else 0.0
+                ),
+                "pool_wait_max_s": self.pool_wait_max,
+            }
+
+
+_stats = PoolStats()
+
+
+def pool_stats() -> Dict[str, float]:
+    """Return connection-reuse and pool-wait statistics for this process."""
+    return _stats.snapshot()
+
+
+class _RequestTrace:
+    """httpcore ``trace`` extension measuring one request.
+
+    Pool wait is the time from handing the request to the pool until a
+    connection was either picked up (reuse) or started connecting (new).
+    """
+
+    __slots__ = ("started", "connect_started", "done")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.connect_started = None
+        self.done = False
+
+    def __call__(self, name: str, info: dict) -> None:
+        if self.done:
+            return
+        if name == "connection.connect_tcp.started":
+            self.connect_started = time.perf_counter()
+        elif name.endswith("send_request_headers.started"):
+            self.done = True
+            acquired = self.connect_started or time.perf_counter()
+            _stats.record(self.connect_started is not None, acquired - self.started)
+
+
+class _AsyncRequestTrace(_RequestTrace):
+    __slots__ = ()
+
+    async def __call__(self, name: str, info: dict) -> None:  # type: ignore
+        _RequestTrace.__call__(self, name, info)
+
+
+def _attach_trace(request: httpx.Request) -> None:
+    request.extensions["trace"] = _RequestTrace()
+
+
+async def _attach_async_trace(request: httpx.Request) -> None:
+    request.extensions["trace"] = _AsyncRequestTrace()
+
+
+# ---------------- Client construction ----------------------------------
+def _client_kwargs() -> dict:
+    return {
+        "http2": os.getenv("HTTPX_HTTP2", "1") == "1",
+        "timeout": float(os.getenv("HTTPX_TIMEOUT", 30)),
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("HTTPX_MAX_CONNECTIONS", 20)),
+            max_keepalive_connections=int(os.getenv("HTTPX_MAX_KEEPALIVE", 10)),
+            keepalive_expiry=float(os.getenv("HTTPX_KEEPALIVE_EXPIRY", 60)),
+        ),
+    }
+
+
+def _check_pid() -> None:
+    """Forget clients inherited from a parent process (fork without hook)."""
+    if _pid != os.getpid():
+        _reset_after_fork()
+
+
+def get_client() -> httpx.Client:
+    """Return this process's shared sync client, creating it on first use."""
+    global _sync_client
+    _check_pid()
+    client = _sync_client
+    if client is None or client.is_closed:
+        with _lock:
+            client = _sync_client
+            if client is None or client.is_closed:
+                client = httpx.Client(
+                    event_hooks={"request": [_attach_trace]}, **_client_kwargs()
+                )
+                _sync_client = client
+    return client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared async client for the currently running event loop."""
+    _check_pid()
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        with _lock:
+            client = _async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    event_hooks={"request": [_attach_async_trace]},
+                    **_client_kwargs(),
+                )
+                _async_clients[loop] = client
+    return client
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_thread
+    _check_pid()
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="http-client-loop", daemon=True
+                )
+                thread.start()
+                _loop, _loop_thread = loop, thread
+    return _loop
+
+
+def run_async(coro):
+    """Run ``coro`` on the per-process background loop and return its result.
+
+    Safe to call from any thread (prefork, threads or solo Celery pools).
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+# ---------------- Lifecycle --------------------------------------------
+def _reset_after_fork() -> None:
+    global _pid, _sync_client, _async_clients, _loop, _loop_thread, _lock, _stats
+    _pid = os.getpid()
+    _lock = threading.Lock()
+    _sync_client = None
+    _async_clients = weakref.WeakKeyDictionary()
+    _loop = None
+    _loop_thread = None
+    _stats = PoolStats()
+
+
+def close_clients(**kwargs) -> None:
+    """Close every client owned by this process (signal-handler friendly)."""
+    global _sync_client, _loop, _loop_thread
+    if _pid != os.getpid():
+        return
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+    loop = _loop
+    if loop is not None and loop.is_running():
+        client = _async_clients.pop(loop, None)
+        if client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(5)
+            except Exception:
+                pass
+        loop.call_soon_threadsafe(loop.stop)
+        if _loop_thread is not None:
+            _loop_thread.join(5)
+        _loop, _loop_thread = None, None
+    # Clients bound to foreign loops (e.g. the ASGI server) are released with
+    # their loop; drop our references so they are not reused.
+    _async_clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(close_clients)
@@ -0,0 +1,183 @@
+"""Cross-process invalidation of the in-process (L1 and chunk) caches.
+
+Every gunicorn and Celery worker keeps its own ``_L1_CACHE`` and
+``_CHUNK_CACHE``. Deleting a key in the process that saved a translation
+leaves every other process serving the stale value until its TTL runs out,
+so :func:`invalidate` deletes the keys from the shared cache and then
+broadcasts them on a bus; each process drops them from both local caches.
+
+- With the Redis cache, :class:`RedisBus` publishes on the
+  ``CACHE_INVALIDATION_CHANNEL`` pub/sub channel. A daemon thread per
+  serving process (:func:`listen`, started by ``dumbo.asgi``/``dumbo.wsgi``
+  and the Celery worker signals; management commands never subscribe)
+  applies incoming messages. Pub/sub delivery is
+  at-most-once, so whenever the listener (re)subscribes it clears both
+  local caches: it may have missed messages while disconnected.
+- Otherwise (development, tests) :class:`LocalBus` delivers synchronously
+  to subscribers in the current process.
+
+Messages are JSON lists of cache keys; translation and chunk keys have
+distinct prefixes, so each key is simply removed from both caches.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, Iterable, List, Optional
+
+from .cache_utils import _CHUNK_CACHE, _L1_CACHE
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "dumbo:cache-invalidate")
+RECONNECT_DELAY = float(os.getenv("CACHE_INVALIDATION_RECONNECT_DELAY", 1))
+MAX_RECONNECT_DELAY = 30.0
+
+
+def drop_local(keys: Iterable[str]) -> None:
+    """Remove ``keys`` from this process's L1 and chunk caches."""
+    for key in keys:
+        _L1_CACHE.delete(key)
+        _CHUNK_CACHE.delete(key)
+
+
+def clear_local() -> None:
+    _L1_CACHE.clear()
+    _CHUNK_CACHE.clear()
+
+
+class LocalBus:
+    """In-process stand-in for :class:`RedisBus`."""
+
+    def __init__(self):
+        self.subscribers: List[Callable[[List[str]], None]] = [drop_local]
+
+    def subscribe(self, callback: Callable[[List[str]], None]) -> None:
+        self.subscribers.append(callback)
+
+    def publish(self, keys: List[str]) -> None:
+        for callback in list(self.subscribers):
+            callback(keys)
+
+    def listen(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RedisBus:
+    """Invalidation over Redis pub/sub; one listener thread per process."""
+
+    def __init__(self, connect: Callable, channel: str = CHANNEL):
+        self._connect = connect  # -> redis.Redis
+        self.channel = channel
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, keys: List[str]) -> None:
+        # Local first: this process must not wait for its own message
+        drop_local(keys)
+        try:
+            self._connect().publish(self.channel, json.dumps(keys))
+        except Exception:
+            logger.warning("Could not publish cache invalidation", exc_info=True)
+
+    def listen(self) -> None:
+        """Start the listener thread unless this process already runs one.
+
+        Threads do not survive ``fork``, so a forked child starts its own.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(self._stop,),
+                name="cache-invalidation",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop.set()
+            self._pid = None
+
+    def _run(self, stop: threading.Event) -> None:
+        delay = RECONNECT_DELAY
+        while not stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self._connect().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                clear_local()
+                delay = RECONNECT_DELAY
+                while not stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._apply(message["data"])
+            except Exception:
+                logger.warning(
+                    "Cache invalidation listener disconnected; retrying in %.0fs",
+                    delay,
+                    exc_info=True,
+                )
+                stop.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    @staticmethod
+    def _apply(data) -> None:
+        try:
+            keys = json.loads(data)
+        except ValueError:
+            logger.warning("Ignoring malformed cache invalidation %r", data[:100])
+            return
+        drop_local(keys)
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def _build_bus():
+    from django.conf import settings
+
+    if settings.CACHES["default"]["BACKEND"].startswith("django_redis."):
+        from django_redis import get_redis_connection
+
+        return RedisBus(lambda: get_redis_connection("default"))
+    return LocalBus()
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = _build_bus()
+    return _bus
+
+
+def listen() -> None:
+    """Apply invalidations broadcast by other processes (idempotent)."""
+    get_bus().listen()
+
+
+def invalidate(keys: List[str]) -> None:
+    """Delete ``keys`` from the shared cache and every process's L1."""
+    from django.core.cache import cache
+
+    cache.delete_many(keys)
+    get_bus().publish(keys)
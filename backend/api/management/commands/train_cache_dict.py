@@ -0,0 +1,81 @@
+"""Train a zstd dictionary for cached translations.
+
+    python backend/manage.py train_cache_dict --output cache-2.zdict
+
+Samples recent ``output_text`` values (what the L2 cache stores), spread
+evenly over language pairs, trains a dictionary and reports how it
+compresses held-out rows compared with zlib and plain zstd. To use it,
+prepend the file to ``CACHE_ZSTD_DICT`` (keeping the previous one so
+existing entries stay readable) and set ``CACHE_CODEC=zstd``; see
+``backend.api.codec``.
+"""
+
+import zlib
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.api.models import Translation
+
+
+class Command(BaseCommand):
+    help = "Train a zstd dictionary for the L2 translation cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", required=True, help="dictionary file")
+        parser.add_argument("--samples", type=int, default=20000)
+        parser.add_argument("--size", type=int, default=112 * 1024, help="bytes")
+        parser.add_argument("--level", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise CommandError("Training requires the zstandard package") from e
+
+        texts = self._sample(options["samples"])
+        held_out, training = texts[::10], [t for i, t in enumerate(texts) if i % 10]
+        if len(training) < 10:
+            raise CommandError(f"Only {len(texts)} translations to sample from")
+        dictionary = zstandard.train_dictionary(
+            options["size"], training, level=options["level"]
+        )
+        Path(options["output"]).write_bytes(dictionary.as_bytes())
+        self.stdout.write(
+            f"Wrote {options['output']}: dictionary {dictionary.dict_id()}, "
+            f"{len(dictionary.as_bytes())} bytes from {len(training)} samples"
+        )
+
+        raw = sum(len(t) for t in held_out)
+        plain = zstandard.ZstdCompressor(level=options["level"])
+        trained = zstandard.ZstdCompressor(
+            level=options["level"], dict_data=dictionary
+        )
+        for name, compress in (
+            ("zlib", zlib.compress),
+            ("zstd", plain.compress),
+            ("zstd+dict", trained.compress),
+        ):
+            size = sum(len(compress(t)) for t in held_out)
+            self.stdout.write(
+                f"{name:<10} {size / raw:6.1%} of {raw} bytes ({len(held_out)} rows)"
+            )
+
+    @staticmethod
+    def _sample(limit: int):
+        pairs = list(
+            Translation.objects.order_by()
+            .values_list("source_lang", "target_lang")
+            .distinct()
+        )
+        per_pair = max(1, limit // max(1, len(pairs)))
+        texts = []
+        for source_lang, target_lang in pairs:
+            texts.extend(
+                Translation.objects.filter(
+                    source_lang=source_lang, target_lang=target_lang
+                )
+                .order_by("-created_at")
+                .values_list("output_text", flat=True)[:per_pair]
+            )
+        return [t.encode("utf-8") for t in texts if t]
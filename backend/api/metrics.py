@@ -0,0 +1,399 @@
+"""Prometheus metrics and per-request stage timing.
+
+The translate pipeline records how long each stage takes (L1 lookup, L2
+``get`` plus decompress, DB reuse query, upstream calls, the history
+insert and the cache write) with :func:`stage`, and counts cache
+hits/misses per layer with :func:`cache_lookup`. The engine adds chunk
+counts, per-endpoint upstream latency, retries and upstream 429s.
+
+Metrics are exported on ``/metrics`` (``backend.dumbo.views.metrics``).
+With ``PROMETHEUS_MULTIPROC_DIR`` set (gunicorn workers plus a Celery
+worker on the same host), every process writes its samples to that
+directory and the endpoint aggregates them; the directory must be emptied
+before the processes start. Each process also publishes its HTTP pool, L1
+and endpoint statistics there (:func:`start_process_stats`). Without it,
+the in-process registry is served together with those statistics, read
+at scrape time. Processes without ``/metrics`` (a Celery worker on another
+host) can expose the same registry on their own port (:func:`serve`).
+
+``prometheus_client`` is optional: without it every metric is a no-op and
+``/metrics`` answers 503, while ``Server-Timing`` still works.
+
+:class:`ServerTimingMiddleware` adds the stages timed during a request as
+a ``Server-Timing`` header (``l1;dur=0.02, l2;dur=1.31, total;dur=1.40``),
+so browser devtools show the breakdown per response.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover - exercised without the package
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Seconds; the upper buckets cover slow free-tier completions
+_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+_CHUNK_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _NoopMetric:
+    """Stands in for a metric when ``prometheus_client`` is not installed."""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, amount: float) -> None:
+        pass
+
+
+def _metric(kind: str, name: str, documentation: str, labelnames=(), **kwargs):
+    if prometheus_client is None:
+        return _NoopMetric()
+    cls = getattr(prometheus_client, kind)
+    return cls(name, documentation, labelnames, **kwargs)
+
+
+STAGE_SECONDS = _metric(
+    "Histogram",
+    "dumbo_translate_stage_seconds",
+    "Time spent in each stage of a translate request.",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = _metric(
+    "Counter",
+    "dumbo_cache_requests_total",
+    "Translation lookups per cache layer (l1, l2, db, chunk) and result.",
+    ["layer", "result"],
+)
+TRANSLATION_CHUNKS = _metric(
+    "Histogram",
+    "dumbo_translation_chunks",
+    "Chunks per text sent through the engine.",
+    buckets=_CHUNK_BUCKETS,
+)
+UPSTREAM_SECONDS = _metric(
+    "Histogram",
+    "dumbo_upstream_request_seconds",
+    "Upstream LLM request latency by endpoint and HTTP status.",
+    ["endpoint", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+UPSTREAM_RETRIES = _metric(
+    "Counter",
+    "dumbo_upstream_retries_total",
+    "Upstream attempts that were retried, by reason (status or 'error').",
+    ["reason"],
+)
+UPSTREAM_RATE_LIMITED = _metric(
+    "Counter",
+    "dumbo_upstream_rate_limited_total",
+    "Upstream 429 responses by endpoint.",
+    ["endpoint"],
+)
+
+
+# ---------------- Recording helpers ----------------
+def cache_lookup(layer: str, hit) -> None:
+    CACHE_REQUESTS.labels(layer=layer, result="hit" if hit else "miss").inc()
+
+
+def observe_upstream(endpoint: str, status: Optional[int], seconds: float) -> None:
+    """Record one upstream request (``status`` None for transport errors)."""
+    UPSTREAM_SECONDS.labels(
+        endpoint=endpoint, status=str(status) if status else "error"
+    ).observe(seconds)
+    if status == 429:
+        UPSTREAM_RATE_LIMITED.labels(endpoint=endpoint).inc()
+
+
+# ---------------- Stage timing ----------------
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "server_timings", default=None
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the block as stage ``name`` (histogram and ``Server-Timing``)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            # Repeated stages (e.g. several cache writes) add up
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """Collect :func:`stage` timings per request into ``Server-Timing``.
+
+    Works under WSGI and ASGI; the timings dict lives in a context variable
+    that sync views run through ``sync_to_async`` share with the caller.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = _timings.set({}), time.perf_counter()
+        try:
+            response = self.get_response(request)
+            return self._annotate(response, started)
+        finally:
+            _timings.reset(token)
+
+    async def __acall__(self, request):
+        token, started = _timings.set({}), time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            return self._annotate(response, started)
+        finally:
+            _timings.reset(token)
+
+    @staticmethod
+    def _annotate(response, started: float):
+        header = server_timing_header(_timings.get(), time.perf_counter() - started)
+        response.headers.setdefault("Server-Timing", header)
+        return response
+
+
+# ---------------- Exposition ----------------
+# Per-process state: the HTTP pool, the L1 caches and the endpoint breakers.
+# name -> (documentation, labels, multiprocess_mode). The mode says how the
+# multiprocess exposition combines the processes that are still alive.
+_PROCESS_GAUGES = {
+    "dumbo_http_pool": ("Upstream HTTP pool statistics.", ["stat"], "livesum"),
+    "dumbo_l1_cache": (
+        "In-process cache statistics.",
+        ["cache", "stat"],
+        "livesum",
+    ),
+    "dumbo_endpoint_available": (
+        "1 while the endpoint's circuit breaker lets requests through.",
+        ["endpoint"],
+        "livemin",
+    ),
+    "dumbo_endpoint_latency_seconds": (
+        "Rolling upstream latency percentiles per endpoint.",
+        ["endpoint", "quantile"],
+        "livemax",
+    ),
+}
+# Ratios and averages do not add up across processes; with several
+# processes the pool exports its totals and the worst wait instead
+_POOL_DERIVED = ("reuse_ratio", "pool_wait_avg_s", "pool_wait_max_s")
+_POOL_WAIT_MAX = (
+    "dumbo_http_pool_wait_max_seconds",
+    "Longest upstream HTTP pool wait of any live process.",
+)
+
+
+def _process_samples(multiprocess: bool = False):
+    """Yield ``(metric, labels, value)`` for this process's state."""
+    from .cache_utils import l1_stats
+    from .endpoints import get_pool
+    from .http_client import pool_stats
+
+    for key, value in pool_stats().items():
+        if multiprocess and key in _POOL_DERIVED:
+            if key == "pool_wait_max_s":
+                yield _POOL_WAIT_MAX[0], (), value
+            continue
+        yield "dumbo_http_pool", (key,), value
+    for cache_name, values in l1_stats().items():
+        for key, value in values.items():
+            yield "dumbo_l1_cache", (cache_name, key), value
+    for stats in get_pool().stats():
+        name = stats["name"]
+        yield "dumbo_endpoint_available", (name,), int(stats["state"] != "open")
+        for quantile in ("p50", "p95"):
+            if stats[quantile] is not None:
+                labels = (name, quantile)
+                yield "dumbo_endpoint_latency_seconds", labels, stats[quantile]
+
+
+def _process_stats_collector():
+    from prometheus_client.core import GaugeMetricFamily
+
+    class ProcessStatsCollector:
+        """This process's pool, L1 and endpoint state, read at scrape time."""
+
+        def collect(self):
+            families = {
+                name: GaugeMetricFamily(name, documentation, labels=labels)
+                for name, (documentation, labels, _) in _PROCESS_GAUGES.items()
+            }
+            for name, labels, value in _process_samples():
+                families[name].add_metric(labels, value)
+            yield from families.values()
+
+    return ProcessStatsCollector()
+
+
+# ---------------- Multiprocess mode ----------------
+# Other processes' state cannot be read at scrape time, so every process
+# copies its own into multiprocess gauges every PROCESS_STATS_INTERVAL
+# seconds (and the scraped process right before answering).
+PROCESS_STATS_INTERVAL = float(os.getenv("METRICS_PROCESS_STATS_INTERVAL", 15))
+
+_gauges = None
+_gauges_lock = threading.Lock()
+_publisher_pid: Optional[int] = None
+
+
+def _build_process_gauges(registry=None) -> Dict[str, object]:
+    kwargs = {} if registry is None else {"registry": registry}
+    gauges = {
+        name: prometheus_client.Gauge(
+            name, documentation, labels, multiprocess_mode=mode, **kwargs
+        )
+        for name, (documentation, labels, mode) in _PROCESS_GAUGES.items()
+    }
+    gauges[_POOL_WAIT_MAX[0]] = prometheus_client.Gauge(
+        *_POOL_WAIT_MAX, multiprocess_mode="livemax", **kwargs
+    )
+    return gauges
+
+
+def publish_process_stats() -> None:
+    """Copy this process's state into the multiprocess gauges."""
+    global _gauges
+    if _gauges is None:
+        with _gauges_lock:
+            if _gauges is None:
+                _gauges = _build_process_gauges()
+    for name, labels, value in _process_samples(multiprocess=True):
+        gauge = _gauges[name]
+        (gauge.labels(*labels) if labels else gauge).set(value)
+
+
+def _publish_forever() -> None:
+    while True:
+        try:
+            publish_process_stats()
+        except Exception:
+            logger.warning("Could not publish process metrics", exc_info=True)
+        time.sleep(PROCESS_STATS_INTERVAL)
+
+
+def start_process_stats() -> None:
+    """Keep publishing this process's state while in multiprocess mode.
+
+    Idempotent per process; a forked child starts its own thread. Called by
+    the same serving processes that :func:`~.invalidation.listen`.
+    """
+    global _publisher_pid
+    if not MULTIPROC_DIR or prometheus_client is None:
+        return
+    with _gauges_lock:
+        if _publisher_pid == os.getpid():
+            return
+        _publisher_pid = os.getpid()
+    from prometheus_client import multiprocess
+
+    # The live* gauges of an exited process must stop counting
+    atexit.register(multiprocess.mark_process_dead, os.getpid())
+    threading.Thread(
+        target=_publish_forever, name="metrics-process-stats", daemon=True
+    ).start()
+
+
+def serve(port: int) -> None:
+    """Expose metrics on ``port`` (processes without the ``/metrics`` view).
+
+    Unauthenticated, unlike ``/metrics``: bind it on a private network.
+    """
+    if prometheus_client is None:
+        logger.warning("prometheus_client is not installed; not serving metrics")
+        return
+    prometheus_client.start_http_server(port, registry=_get_registry())
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def _get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = _build_registry()
+    return _registry
+
+
+def _build_registry():
+    if MULTIPROC_DIR:
+        # Aggregate every process's samples, including the per-process state
+        # each one publishes (publish_process_stats)
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    registry = prometheus_client.REGISTRY
+    registry.register(_process_stats_collector())
+    return registry
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return ``(body, content_type)`` for a scrape.
+
+    Raises ``RuntimeError`` when ``prometheus_client`` is not installed.
+    """
+    if prometheus_client is None:
+        raise RuntimeError("prometheus_client is not installed")
+    if MULTIPROC_DIR:
+        publish_process_stats()
+    body = prometheus_client.generate_latest(_get_registry())
+    return body, prometheus_client.CONTENT_TYPE_LATEST
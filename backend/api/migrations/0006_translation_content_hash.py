@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:42
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 2000
+
+
+def _content_hash(text, src, tgt, lvl):
+    # Frozen copy of cache_utils.content_hash at the time of this migration
+    payload = {"text": text, "src": src, "tgt": tgt, "lvl": lvl}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def backfill_content_hash(apps, schema_editor):
+    """Hash existing rows in primary-key batches, committing each batch."""
+    Translation = apps.get_model("api", "Translation")
+    last_pk = 0
+    while True:
+        batch = list(
+            Translation.objects.filter(pk__gt=last_pk, content_hash="")
+            .order_by("pk")
+            .only("pk", "input_text", "source_lang", "target_lang", "level")[
+                :BATCH_SIZE
+            ]
+        )
+        if not batch:
+            break
+        for row in batch:
+            row.content_hash = _content_hash(
+                row.input_text, row.source_lang, row.target_lang, row.level
+            )
+        with transaction.atomic():
+            Translation.objects.bulk_update(batch, ["content_hash"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Commit the backfill batch by batch instead of in one huge transaction
+    atomic = False
+
+    dependencies = [
+        ("api", "0005_userprofile"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="translation",
+            name="content_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        # Backfill before building the index so rows are indexed once
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="translation",
+            index=models.Index(
+                fields=["content_hash", "-created_at"],
+                name="translation_hash_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_translation_content_hash"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="translation",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="translation_user_history_idx",
+            ),
+        ),
+    ]
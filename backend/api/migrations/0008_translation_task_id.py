@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_translation_user_history_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="translation",
+            name="task_id",
+            field=models.CharField(
+                blank=True, editable=False, max_length=255, null=True, unique=True
+            ),
+        ),
+    ]
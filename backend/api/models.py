@@ -2,9 +2,17 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils import timezone
 
+from .cache_utils import content_hash
+
 User = get_user_model()
 
 
+class TranslationQuerySet(models.QuerySet):
+    def matching(self, text: str, src: str, tgt: str, lvl: str):
+        """Rows with exactly this input/languages/level (uses the hash index)."""
+        return self.filter(content_hash=content_hash(text, src, tgt, lvl))
+
+
 class Translation(models.Model):
     LEVEL_CHOICES = [(lvl, lvl) for lvl in ["A1", "A2", "B1", "B2"]]
     LANG_CHOICES = [
@@ -26,9 +34,42 @@ class Translation(models.Model):
     # CEFR level is still applicable when translating *to German*; optional otherwise
     level = models.CharField(max_length=2, choices=LEVEL_CHOICES, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # SHA-256 of (input_text, source_lang, target_lang, level); see
+    # cache_utils.content_hash. Kept in sync by save(); set it explicitly
+    # when using bulk_create.
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Celery task that produced the row; makes task retries persist once
+    task_id = models.CharField(
+        max_length=255, null=True, blank=True, unique=True, editable=False
+    )
+
+    objects = TranslationQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["content_hash", "-created_at"],
+                name="translation_hash_created_idx",
+            ),
+            # Keyset pagination of a user's history (HistoryCursorPagination)
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="translation_user_history_idx",
+            ),
+        ]
+
+    def compute_content_hash(self) -> str:
+        return content_hash(
+            self.input_text, self.source_lang, self.target_lang, self.level
+        )
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "content_hash" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "content_hash"]
+        super().save(*args, **kwargs)
 
 
 class UserProfile(models.Model):
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class HistoryCursorPagination(CursorPagination):
+    """Keyset pagination over ``(user, -created_at, -id)``.
+
+    Cursor pages cost the same at any depth (no OFFSET scans) and stay
+    stable while new translations are inserted at the top.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
@@ -0,0 +1,139 @@
+"""Progress reporting for long-running Celery tasks.
+
+Tasks call :func:`report`, which records ``PROGRESS`` state in the Celery
+result backend (what ``TaskStatusView`` shows) and also drops a small
+snapshot with a sequence number into the shared cache. Clients that want
+updates pushed use either long-poll (``tasks/<id>/?wait=<s>&since=<seq>``)
+or SSE (``tasks/<id>/events/``); both wait server-side on the cheap cache
+key instead of the SPA hammering the status endpoint and the result
+backend. The result backend is consulted only when the snapshot changes
+and, as a safety net for crashed tasks, every ``BACKEND_CHECK_INTERVAL``.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
+from celery.signals import task_postrun
+from django.core.cache import cache
+from django.utils import timezone
+
+PROGRESS_TTL = int(os.getenv("TASK_PROGRESS_TTL", 3600))  # seconds
+POLL_INTERVAL = float(os.getenv("TASK_EVENTS_POLL_INTERVAL", 0.25))
+BACKEND_CHECK_INTERVAL = 2.0
+MAX_WAIT = 30.0  # long-poll cap, below typical proxy read timeouts
+
+TERMINAL_STATES = frozenset({"SUCCESS", "FAILURE", "REVOKED"})
+
+
+def _key(task_id: str) -> str:
+    return f"task:progress:{task_id}"
+
+
+def report(task, task_id: str, **meta) -> None:
+    """Publish ``meta`` as the ``PROGRESS`` state of ``task``'s run ``task_id``.
+
+    The id is passed in because ``task.request`` is thread-local: callbacks
+    running on the event-loop thread (``run_async``) see an empty request.
+    """
+    task.update_state(task_id=task_id, state="PROGRESS", meta=meta)
+    publish(task_id, "PROGRESS")
+
+
+def publish(task_id: str, state: str) -> None:
+    """Bump the change marker watched by waiting clients."""
+    cache.set(_key(task_id), {"seq": time.time_ns(), "state": state}, PROGRESS_TTL)
+
+
+def current_seq(task_id: str) -> int:
+    marker = cache.get(_key(task_id))
+    return marker["seq"] if marker else 0
+
+
+def _to_iso(value) -> Optional[str]:
+    """Return ISO-8601 string for datetime or epoch seconds, else None."""
+    if value is None:
+        return None
+    # Celery backends may return either datetime or float timestamps
+    # If it's already a datetime, ensure it is aware & ISO-format it
+    if isinstance(value, datetime):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.utc)
+        return value.isoformat()
+    # Fallback: treat as epoch seconds
+    try:
+        return (
+            datetime.utcfromtimestamp(float(value))
+            .replace(tzinfo=timezone.utc)
+            .isoformat()
+        )
+    except Exception:
+        return None
+
+
+def task_status(task_id: str) -> dict:
+    """Status payload shared by the polling, long-poll and SSE endpoints."""
+    seq = current_seq(task_id)
+    res = AsyncResult(task_id)
+    data = {
+        "task_id": task_id,
+        "state": res.state,
+        "started_at": _to_iso(getattr(res, "date_created", None)),
+        "finished_at": _to_iso(getattr(res, "date_done", None)),
+        "seq": seq,
+    }
+    if res.state == "SUCCESS":
+        data["result"] = res.result
+    elif res.state == "FAILURE":
+        data["error"] = str(res.result)
+    elif res.state == "PROGRESS":
+        data["progress"] = res.info
+    return data
+
+
+async def await_change(task_id: str, since: int, timeout: float) -> None:
+    """Wait until the task publishes past ``since`` or finishes, or timeout."""
+    deadline = time.monotonic() + min(timeout, MAX_WAIT)
+    next_backend_check = time.monotonic() + BACKEND_CHECK_INTERVAL
+    while time.monotonic() < deadline:
+        if await sync_to_async(current_seq)(task_id) != since:
+            return
+        if time.monotonic() >= next_backend_check:
+            state = await sync_to_async(lambda: AsyncResult(task_id).state)()
+            if state in TERMINAL_STATES:
+                return
+            next_backend_check = time.monotonic() + BACKEND_CHECK_INTERVAL
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def aevents(task_id: str):
+    """Yield status payloads as they change, ending with a terminal state."""
+    last = None  # (seq, state) of the last payload sent
+    last_backend_check = 0.0
+    while True:
+        seq = await sync_to_async(current_seq)(task_id)
+        now = time.monotonic()
+        if (
+            last is None
+            or seq != last[0]
+            or now - last_backend_check >= BACKEND_CHECK_INTERVAL
+        ):
+            last_backend_check = now
+            status = await sync_to_async(task_status)(task_id)
+            if (status["seq"], status["state"]) != last:
+                last = (status["seq"], status["state"])
+                yield status
+            if status["state"] in TERMINAL_STATES:
+                return
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+@task_postrun.connect
+def _publish_finished(task_id=None, state=None, **kwargs):
+    # Sent after the result is stored, so waiters see the final state at once
+    if task_id and state:
+        publish(task_id, state)
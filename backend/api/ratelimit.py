@@ -0,0 +1,178 @@
+"""Token bucket shared by every process that calls the upstream LLM.
+
+OpenRouter's free models enforce hard per-key limits, so gunicorn/uvicorn
+workers and Celery workers draw from one bucket before each completion:
+
+- With Redis configured (``CACHE_URL`` -> django-redis), the bucket is a
+  hash updated atomically by a Lua script using the Redis clock, so all
+  hosts agree on refill time.
+- Otherwise (dev, tests) an in-process bucket with the same semantics is
+  used.
+
+:meth:`TokenBucket.acquire` never sleeps: it either takes a token and
+returns ``0`` or returns the exact number of seconds until one will be
+available, leaving the caller to wait, queue (Celery countdown) or answer
+``429`` with ``Retry-After``. :meth:`TokenBucket.pause` empties the bucket
+when upstream itself answers 429, so other processes back off too.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", 20))  # 0 = unlimited
+BURST = int(os.getenv("LLM_BURST", 5))
+BUCKET_KEY = "ratelimit:llm"
+
+# KEYS[1]=bucket; ARGV: rate (tokens/s), capacity, tokens requested.
+# Returns the wait in seconds as a string (Lua numbers become integers).
+_ACQUIRE_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local s = redis.call("HMGET", KEYS[1], "tokens", "ts", "blocked")
+local blocked = tonumber(s[3]) or 0
+if blocked > now then
+    return tostring(blocked - now)
+end
+local tokens = tonumber(s[1]) or capacity
+local ts = tonumber(s[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+# KEYS[1]=bucket; ARGV: seconds to block for.
+_PAUSE_LUA = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local until_ = now + tonumber(ARGV[1])
+local blocked = tonumber(redis.call("HGET", KEYS[1], "blocked")) or 0
+if until_ > blocked then
+    redis.call("HSET", KEYS[1], "blocked", tostring(until_), "tokens", "0",
+               "ts", tostring(until_))
+    redis.call("EXPIRE", KEYS[1], math.ceil(tonumber(ARGV[1])) + 60)
+end
+return 1
+"""
+
+
+class TokenBucket:
+    """In-process bucket; also the interface of :class:`RedisTokenBucket`."""
+
+    def __init__(self, rate: float, capacity: int, clock=time.monotonic):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(capacity)
+        self._ts = clock()
+        self._blocked = 0.0
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Take ``tokens`` and return 0, or return seconds until possible."""
+        with self._lock:
+            now = self._clock()
+            if self._blocked > now:
+                return self._blocked - now
+            self._tokens = min(
+                self.capacity, self._tokens + max(0.0, now - self._ts) * self.rate
+            )
+            self._ts = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds`` (upstream said 429)."""
+        with self._lock:
+            until = self._clock() + seconds
+            if until > self._blocked:
+                self._blocked = until
+                self._tokens = 0.0
+                self._ts = until
+
+
+class RedisTokenBucket(TokenBucket):
+    def __init__(self, rate: float, capacity: int, key: str = BUCKET_KEY):
+        super().__init__(rate, capacity)
+        from django_redis import get_redis_connection
+
+        self.key = key
+        redis = get_redis_connection("default")
+        self._acquire = redis.register_script(_ACQUIRE_LUA)
+        self._pause = redis.register_script(_PAUSE_LUA)
+
+    def acquire(self, tokens: int = 1) -> float:
+        try:
+            wait = self._acquire(
+                keys=[self.key], args=[self.rate, self.capacity, tokens]
+            )
+        except Exception:  # Redis down: fall back to this process's bucket
+            logger.warning("Redis rate limiter unavailable", exc_info=True)
+            return super().acquire(tokens)
+        return float(wait)
+
+    def pause(self, seconds: float) -> None:
+        try:
+            self._pause(keys=[self.key], args=[seconds])
+        except Exception:
+            logger.warning("Redis rate limiter unavailable", exc_info=True)
+            super().pause(seconds)
+
+
+class _Unlimited:
+    def acquire(self, tokens: int = 1) -> float:
+        return 0.0
+
+    def pause(self, seconds: float) -> None:
+        pass
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the process-wide upstream limiter (built on first use)."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = _build_limiter()
+    return _limiter
+
+
+def _build_limiter():
+    if RATE_PER_MINUTE <= 0:
+        return _Unlimited()
+    rate = RATE_PER_MINUTE / 60.0
+    capacity = max(1, BURST)
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend.startswith("django_redis."):
+        return RedisTokenBucket(rate, capacity)
+    return TokenBucket(rate, capacity)
+
+
+def retry_after_header(seconds: Optional[float]) -> Optional[str]:
+    """``Retry-After`` value (whole seconds, rounded up) or None."""
+    if seconds is None:
+        return None
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,138 @@
+"""Sentence-aware text segmenter used to chunk long inputs for the LLM.
+
+The segmenter scans the text once with a pre-compiled boundary regex and
+packs whole sentences into chunks of roughly equal size, never exceeding
+``max_chars``. Chunks are slices of the original text, so paragraph breaks
+and newlines inside a chunk are preserved. Sentences longer than
+``max_chars`` are hard-split at the last clause break or whitespace inside
+the budget.
+
+This module has no Django dependency so it can be benchmarked standalone
+(see ``backend/benchmarks/bench_segmenter.py``).
+"""
+
+import re
+from typing import Iterator, List, Tuple
+
+MAX_CHARS_PER_REQUEST = 1500  # safety margin vs LLM context length
+
+# Sentence-final punctuation (plus closing quotes/brackets) followed by
+# whitespace, or any line break (paragraphs and single newlines). The leading
+# lookahead lets the regex engine skip ordinary characters quickly.
+_BOUNDARY_RE = re.compile(
+    r"(?=[.!?…\n])"
+    r"(?:(?P<term>[.!?…]+[\"'”’)\]]*)(?P<space>\s+)|(?P<nl>\n\s*))"
+)
+
+# Tokens ending in "." that do not end a sentence (compared lower-case and
+# without the final dot). English, German, Spanish and French.
+_ABBREVIATIONS = frozenset(
+    """
+    mr mrs ms dr prof sr jr st vs etc e.g i.e cf approx no nos fig vol p pp
+    ca inc ltd co corp dept est jan feb mar apr jun jul aug sep sept oct nov dec
+    z.b u.a d.h usw bzw ggf evtl vgl inkl nr str hr fr dipl
+    sra srta ud uds pág aprox
+    mme mlle mm env av
+    """.split()
+)
+
+# Clause breaks tried before plain whitespace when hard-splitting
+_CLAUSE_BREAKS = ("; ", ": ", ", ", " - ", " – ")
+
+# How far back to look for the token preceding a full stop
+_TOKEN_LOOKBACK = 32
+
+
+def _is_sentence_end(text: str, match: "re.Match") -> bool:
+    """Return False when the full stop belongs to an abbreviation/initial."""
+    term_start = match.start("term")
+    if text[term_start] != ".":
+        return True  # "!", "?" and ellipses always end a sentence
+    token_start = text.rfind(" ", max(0, term_start - _TOKEN_LOOKBACK), term_start)
+    token = text[token_start + 1 : term_start].lstrip("\"'(“‘[").lower()
+    if token in _ABBREVIATIONS or (len(token) == 1 and token.isalpha()):
+        return False
+    # "etc. and so on": a lower-case continuation is not a new sentence
+    following = match.end()
+    return following >= len(text) or not text[following].islower()
+
+
+def _sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` offsets of sentences in a single regex pass."""
+    start = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        if match.group("term") is not None:
+            if not _is_sentence_end(text, match):
+                continue
+            end = match.start("space")
+        else:
+            end = match.start()
+            while end > start and text[end - 1] in " \t":
+                end -= 1
+        if end > start:
+            yield start, end
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def _hard_split(text: str, start: int, end: int, max_chars: int) -> Iterator[str]:
+    """Split one over-long sentence at clause breaks/whitespace within budget."""
+    while end - start > max_chars:
+        limit = start + max_chars
+        floor = start + max_chars // 2  # never emit pieces smaller than half
+        cut = -1
+        for sep in _CLAUSE_BREAKS:
+            idx = text.rfind(sep, floor, limit)
+            if idx != -1:
+                cut = max(cut, idx + len(sep.rstrip()))
+        if cut == -1:
+            idx = text.rfind(" ", floor, limit)
+            cut = idx if idx != -1 else limit
+        piece = text[start:cut].strip()
+        if piece:
+            yield piece
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        yield text[start:end]
+
+
+def split_into_chunks(text: str, max_chars: int = MAX_CHARS_PER_REQUEST) -> List[str]:
+    """Split ``text`` into sentence-aligned chunks of at most ``max_chars``.
+
+    Chunks are balanced: a text of length L is split into ``ceil(L /
+    max_chars)`` chunks of about ``L / n`` characters where sentence
+    boundaries allow, rather than n-1 full chunks and a short tail.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= max_chars:
+        return [text]
+
+    n_chunks = -(-len(text) // max_chars)
+    target = -(-len(text) // n_chunks)
+
+    chunks: List[str] = []
+    chunk_start = chunk_end = -1
+    for start, end in _sentence_spans(text):
+        if end - start > max_chars:
+            if chunk_start != -1:
+                chunks.append(text[chunk_start:chunk_end])
+                chunk_start = -1
+            chunks.extend(_hard_split(text, start, end, max_chars))
+            continue
+        if chunk_start != -1 and end - chunk_start > max_chars:
+            chunks.append(text[chunk_start:chunk_end])
+            chunk_start = -1
+        if chunk_start == -1:
+            chunk_start = start
+        chunk_end = end
+        if chunk_end - chunk_start >= target:
+            chunks.append(text[chunk_start:chunk_end])
+            chunk_start = -1
+    if chunk_start != -1:
+        chunks.append(text[chunk_start:chunk_end])
+    return chunks
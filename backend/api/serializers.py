@@ -19,6 +19,35 @@ class TranslationSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "output_text", "created_at"]
 
 
+class TranslationPreviewSerializer(serializers.ModelSerializer):
+    """Compact history row: truncated texts computed in the database.
+
+    Expects the queryset to be annotated with ``input_preview``,
+    ``output_preview``, ``input_truncated`` and ``output_truncated``; fetch
+    the full texts from the detail endpoint.
+    """
+
+    input_preview = serializers.CharField(read_only=True)
+    output_preview = serializers.CharField(read_only=True)
+    input_truncated = serializers.BooleanField(read_only=True)
+    output_truncated = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Translation
+        fields = [
+            "id",
+            "input_preview",
+            "output_preview",
+            "input_truncated",
+            "output_truncated",
+            "level",
+            "source_lang",
+            "target_lang",
+            "created_at",
+        ]
+        read_only_fields = fields
+
+
 class UserLoginLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserLoginLog
@@ -1,21 +1,27 @@
 from django.contrib.auth import get_user_model, user_logged_in, user_login_failed
-from django.core.cache import cache
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .cache_utils import _l1_delete, make_cache_key
+from .cache_utils import cache_keys_for, chunk_cache_keys_for
+from .invalidation import invalidate
 from .models import Translation  # already imported above
 from .models import UserLoginLog
 
 
 @receiver([post_save, post_delete], sender=Translation)
-def invalidate_translation_cache(sender, instance, **kwargs):
-    key = make_cache_key(
-        instance.input_text, instance.source_lang, instance.target_lang, instance.level
+def invalidate_translation_cache(sender, instance, created=False, **kwargs):
+    if created:
+        return  # nothing can be cached for a row that did not exist yet
+    request = (
+        instance.input_text,
+        instance.source_lang,
+        instance.target_lang,
+        instance.level,
     )
-    cache.delete(key)
-    _l1_delete(key)
+    # The translation keys, plus the chunks: an edited or deleted
+    # translation must not be reassembled from its cached chunks
+    invalidate(cache_keys_for(*request) + chunk_cache_keys_for(*request))
 
 
 def _get_request_meta(request):
@@ -0,0 +1,219 @@
+"""Single-flight coalescing of identical in-flight translations.
+
+When many users request the same ``(text, src, tgt, level)`` at once, only
+one of them should pay for the upstream LLM call:
+
+- Within a process, concurrent callers for the same key share one
+  ``_Call``; followers block on its event and receive the leader's result
+  (or exception).
+- Across gunicorn/Celery processes, the process-local leader takes a short
+  lock in the shared cache (``cache.add`` = Redis ``SET NX``). Other
+  processes poll a short-lived result key until the lock holder publishes
+  the translation, and take over if the lock disappears without a result
+  (leader crashed or failed) or the wait times out.
+
+``acoalesce`` is the asyncio flavour used by the native async view: it
+shares futures per event loop and uses the async cache API.
+
+Followers never wait longer than ``LOCK_TTL`` for a leader, and a lock is
+only ever released by its holder (an atomic compare-and-delete on Redis).
+"""
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+import weakref
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .codec import decode, encode
+
+LOCK_TTL = int(os.getenv("SINGLEFLIGHT_LOCK_TTL", 120))  # seconds
+RESULT_TTL = int(os.getenv("SINGLEFLIGHT_RESULT_TTL", 60))
+WAIT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT", 60))
+POLL_INTERVAL = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL", 0.05))
+MAX_POLL_INTERVAL = 0.5
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+_calls: Dict[str, _Call] = {}
+_calls_lock = threading.Lock()
+# event loop -> {key: Future}
+_async_calls: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _lock_key(key: str) -> str:
+    return f"singleflight:lock:{key}"
+
+
+def _result_key(key: str) -> str:
+    return f"singleflight:result:{key}"
+
+
+# Delete the lock only if it still holds our token: it may have expired
+# and been taken by another worker since we acquired it.
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _release(key: str, token: str) -> None:
+    lock_key = _lock_key(key)
+    client = getattr(cache, "client", None)
+    if hasattr(client, "get_client"):  # django-redis
+        client.get_client(write=True).eval(
+            _RELEASE_SCRIPT, 1, client.make_key(lock_key), client.encode(token)
+        )
+    elif cache.get(lock_key) == token:
+        # Local-memory cache: one process, no other worker can take the lock
+        cache.delete(lock_key)
+
+
+def _load_result(key: str) -> Optional[str]:
+    return decode(cache.get(_result_key(key)))
+
+
+def _run_distributed(key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+    """Run ``fn`` at most once across processes sharing the cache."""
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    interval = POLL_INTERVAL
+    while True:
+        result = _load_result(key)
+        if result is not None:
+            return result, True
+
+        token = uuid.uuid4().hex
+        if cache.add(_lock_key(key), token, LOCK_TTL):
+            try:
+                result = fn()
+                cache.set(_result_key(key), encode(result), RESULT_TTL)
+                return result, False
+            finally:
+                _release(key, token)
+
+        # Another process is translating this key: wait for its result
+        while cache.get(_lock_key(key)) is not None:
+            if time.monotonic() >= deadline:
+                # Fail open rather than hold the request forever
+                return fn(), False
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+            result = _load_result(key)
+            if result is not None:
+                return result, True
+        # Lock released: either the result is there now, or the holder
+        # failed and we retry acquiring it ourselves.
+
+
+def coalesce(key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+    """Return ``(fn(), shared)`` with identical concurrent calls coalesced.
+
+    ``key`` is the request's ``make_cache_key``. ``shared`` is True when the
+    value came from another caller's in-flight computation.
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        if not call.event.wait(LOCK_TTL):
+            # The leader is stuck; don't hang with it
+            return fn(), False
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    try:
+        call.result, shared = _run_distributed(key, fn)
+        return call.result, shared
+    except BaseException as exc:
+        call.error = exc
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.event.set()
+
+
+async def _aload_result(key: str) -> Optional[str]:
+    return decode(await cache.aget(_result_key(key)))
+
+
+async def _arun_distributed(
+    key: str, fn: Callable[[], Awaitable[str]]
+) -> Tuple[str, bool]:
+    """Async twin of :func:`_run_distributed`."""
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    interval = POLL_INTERVAL
+    while True:
+        result = await _aload_result(key)
+        if result is not None:
+            return result, True
+
+        token = uuid.uuid4().hex
+        if await cache.aadd(_lock_key(key), token, LOCK_TTL):
+            try:
+                result = await fn()
+                await cache.aset(_result_key(key), encode(result), RESULT_TTL)
+                return result, False
+            finally:
+                await sync_to_async(_release)(key, token)
+
+        while await cache.aget(_lock_key(key)) is not None:
+            if time.monotonic() >= deadline:
+                return await fn(), False
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+            result = await _aload_result(key)
+            if result is not None:
+                return result, True
+
+
+async def acoalesce(key: str, fn: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+    """Async :func:`coalesce`: ``fn`` is a coroutine function."""
+    loop = asyncio.get_running_loop()
+    calls = _async_calls.setdefault(loop, {})
+    future = calls.get(key)
+    if future is not None:
+        try:
+            # shield: a cancelled follower must not cancel the leader's work
+            return await asyncio.wait_for(asyncio.shield(future), LOCK_TTL), True
+        except asyncio.TimeoutError:
+            return await fn(), False
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise  # this follower was cancelled
+            # The leader was cancelled, not us: start over without it
+            return await acoalesce(key, fn)
+
+    future = calls[key] = loop.create_future()
+    try:
+        result, shared = await _arun_distributed(key, fn)
+        future.set_result(result)
+        return result, shared
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as exc:
+        future.set_exception(exc)
+        future.exception()  # mark retrieved when there are no followers
+        raise
+    finally:
+        calls.pop(key, None)
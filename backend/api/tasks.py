@@ -1,21 +1,31 @@
-import asyncio
+import math
 import os
+import time
+from pathlib import Path
+from typing import Optional
 
-import httpx
 from celery import shared_task
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.urls import reverse
 
-from .cache_utils import _compress, _l1_set, chunk_get, chunk_set
-from .models import Translation
-from .views import (
-    LEVEL_CONFIGS,
-    MODEL,
-    OPENROUTER_URL,
-    SYSTEM_PROMPT,
-    _build_prompt,
-    _split_into_chunks,
+from .cache_utils import _TRANSLATION_TTL, _l1_set
+from .checkpoint import ChunkCheckpoint
+from .codec import encode
+from .engine import TranslationEngine, UpstreamError
+from .exporters import (
+    export_dir,
+    export_filename,
+    get_encoder,
+    history_queryset,
+    iter_export,
 )
+from .http_client import run_async
+from .models import Translation
+from .progress import report
+
+TASK_MAX_WAIT = float(os.getenv("LLM_TASK_MAX_WAIT", 10))
 
 
 @shared_task(
@@ -32,75 +42,145 @@ def translate_text_task(
     target_lang: str,
     level: str,
     cache_key: str,
+    source: str = "web",
 ):
     """
     Heavy-weight translation task executed in Celery worker.
     Returns the final translation string (also cached & persisted).
+    While running, ``PROGRESS`` meta carries ``chunks_done``/``chunks_total``
+    and the partial ``chunks`` translated so far.
+
+    ``source`` (``web`` for the SPA, ``script`` otherwise; set by the
+    views) only feeds queue routing and priority (``dumbo.celery``).
+
+    Safe to retry: each chunk already backs off on its own inside the
+    engine, finished chunks are checkpointed under the task id so a retry
+    only re-sends the ones that failed, and the row is keyed by the task id
+    so it is persisted exactly once.
     """
-    src_name = dict(Translation.LANG_CHOICES).get(source_lang)
-    tgt_name = dict(Translation.LANG_CHOICES).get(target_lang)
-    chunks = _split_into_chunks(text)
-    translations = []
-
-    headers = {
-        "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
-        "Content-Type": "application/json",
-    }
-    limits = httpx.Limits(
-        max_connections=int(os.getenv("HTTPX_MAX_CONNECTIONS", 20)),
-        max_keepalive_connections=int(os.getenv("HTTPX_MAX_KEEPALIVE", 10)),
-    )
-
-    async def _translate_chunk(client: httpx.AsyncClient, chunk: str) -> str:
-        prompt = _build_prompt(chunk, src_name, tgt_name, level)
-        if tgt_name == "de" and level:
-            config = LEVEL_CONFIGS.get(level, {"temperature": 0.5, "top_p": 0.9})
-        else:
-            config = {"temperature": 0.5, "top_p": 0.9}
-        payload = {
-            "model": MODEL,
-            "max_tokens": int(len(chunk.split()) * 2),
-            "temperature": config["temperature"],
-            "top_p": config["top_p"],
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
-        }
-        resp = await client.post(OPENROUTER_URL, json=payload, headers=headers)
-        resp.raise_for_status()
-        return resp.json()["choices"][0]["message"]["content"].strip()
-
-    async def _run_async():
-        async with httpx.AsyncClient(timeout=30, limits=limits) as client:
-            # Bound concurrency to avoid too many parallel upstream calls
-            sem = asyncio.Semaphore(int(os.getenv("PARALLEL_CHUNK_LIMIT", 5)))
-            for chunk in chunks:
-                async with sem:
-                    cached = chunk_get(chunk, source_lang, target_lang, level)
-                    if cached:
-                        translations.append(cached)
-                        continue
-                    translated = await _translate_chunk(client, chunk)
-                    translations.append(translated)
-                    chunk_set(chunk, source_lang, target_lang, level, translated)
-        return "\n".join(translations)
-
-    translation = asyncio.run(_run_async())
-
-    # Persist
-    user = get_user_model().objects.filter(id=user_id).first()
-    Translation.objects.create(
-        user=user,
-        input_text=text,
-        output_text=translation,
-        level=level,
-        source_lang=source_lang,
-        target_lang=target_lang,
-    )
+    task_id = self.request.id
+    existing = Translation.objects.filter(task_id=task_id).first()
+    if existing is not None:
+        # A previous attempt persisted and then failed later (e.g. caching)
+        translation = existing.output_text
+    else:
+        checkpoint = ChunkCheckpoint(task_id)
+
+        def on_progress(chunks):
+            # Partial results: finished chunks in order, None for pending ones
+            report(
+                self,
+                task_id,
+                chunks_done=sum(c is not None for c in chunks),
+                chunks_total=len(chunks),
+                chunks=list(chunks),
+            )
+
+        # Uncached chunks are translated concurrently. The per-process loop
+        # keeps the pooled HTTP/2 connections alive across tasks.
+        # Waits beyond TASK_MAX_WAIT (rate limit, upstream 429) re-queue the
+        # task with a countdown instead of sleeping in the worker slot.
+        engine = TranslationEngine(max_wait=TASK_MAX_WAIT)
+        try:
+            translation = run_async(
+                engine.atranslate(
+                    text,
+                    source_lang,
+                    target_lang,
+                    level,
+                    on_progress=on_progress,
+                    checkpoint=checkpoint,
+                )
+            )
+        except UpstreamError as e:
+            if e.retry_after is None:
+                raise
+            raise self.retry(exc=e, countdown=math.ceil(e.retry_after))
+
+        # Persist once per task, even if this attempt races a redelivery
+        user = get_user_model().objects.filter(id=user_id).first()
+        row, _ = Translation.objects.get_or_create(
+            task_id=task_id,
+            defaults={
+                "user": user,
+                "input_text": text,
+                "output_text": translation,
+                "level": level,
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+            },
+        )
+        translation = row.output_text
+        checkpoint.clear()
 
     # Cache (L2 & L1)
-    compressed = _compress(translation)
-    cache.add(cache_key, compressed, int(os.getenv("CACHE_TTL", 3600)))
+    cache.add(cache_key, encode(translation), _TRANSLATION_TTL)
     _l1_set(cache_key, translation)
     return translation
+
+
+@shared_task(bind=True)
+def export_history_task(self, user_id: int, fmt: str = "csv", gzip: bool = False):
+    """
+    Write a user's history export to ``EXPORT_ROOT/<user_id>/<task_id>.<ext>``.
+    Progress is published as ``PROGRESS`` state (``{"rows", "total"}``) for
+    ``TaskStatusView`` and its push channels; the result points at the
+    ranged download endpoint.
+    """
+    encoder = get_encoder(fmt)
+    queryset = history_queryset(user_id)
+    total = queryset.count()
+    directory = export_dir(user_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    dest = directory / export_filename(self.request.id, encoder, gzip)
+    partial = dest.with_name(dest.name + ".part")
+
+    rows_done = written = 0
+
+    def progress(rows):
+        nonlocal rows_done
+        rows_done = rows
+        report(self, self.request.id, rows=rows, total=total)
+
+    try:
+        with open(partial, "wb") as fh:
+            for data in iter_export(queryset, encoder, gzip=gzip, progress=progress):
+                fh.write(data)
+                written += len(data)
+        # Only complete files are ever visible under the final name
+        os.replace(partial, dest)
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+    return {
+        "rows": rows_done,
+        "bytes": written,
+        "filename": dest.name,
+        "download_url": reverse("export_download", args=[self.request.id]),
+    }
+
+
+@shared_task
+def purge_expired_exports(max_age: Optional[int] = None):
+    """
+    Delete export files (and abandoned ``.part`` files) older than
+    ``EXPORT_TTL`` seconds, then any user directories left empty.
+    """
+    if max_age is None:
+        max_age = int(os.getenv("EXPORT_TTL", 24 * 3600))
+    root = Path(settings.EXPORT_ROOT)
+    if not root.is_dir():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for directory in root.iterdir():
+        if not directory.is_dir():
+            continue
+        for path in directory.iterdir():
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        if not any(directory.iterdir()):
+            directory.rmdir()
+    return removed
@@ -5,14 +5,19 @@ from rest_framework_simplejwt.views import (
 )
 
 from .views import (
+    AsyncTranslateView,
+    BatchTranslateView,
     DeleteAccountView,
+    ExportDownloadView,
     ExportHistoryView,
     GoogleAuthComplete,
+    HistoryDetailView,
     HistoryListView,
     LoginLogListView,
     LogoutView,
     OAuthErrorView,
     RegisterView,
+    TaskEventsView,
     TaskStatusView,
     TranslateView,
     UserProfileView,
@@ -27,13 +32,24 @@ urlpatterns = [
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("translate/", TranslateView.as_view(), name="translate"),
+    path("translate/aio/", AsyncTranslateView.as_view(), name="translate_aio"),
+    path(
+        "translate/batch/", BatchTranslateView.as_view(), name="translate_batch"
+    ),
     path("history/", HistoryListView.as_view(), name="history"),
+    path("history/<int:pk>/", HistoryDetailView.as_view(), name="history_detail"),
     path("register/", RegisterView.as_view(), name="register"),
     path("login-logs/", LoginLogListView.as_view(), name="login_logs"),
     path("profile/", UserProfileView.as_view(), name="profile"),
     path("delete-account/", DeleteAccountView.as_view(), name="delete_account"),
     path("logout/", LogoutView.as_view(), name="logout"),
     path("export-history/", ExportHistoryView.as_view(), name="export_history"),
+    path(
+        "exports/<uuid:task_id>/", ExportDownloadView.as_view(), name="export_download"
+    ),
     path("oauth/error/", OAuthErrorView.as_view(), name="oauth_error"),
     path("tasks/<uuid:task_id>/", TaskStatusView.as_view(), name="task_status"),
+    path(
+        "tasks/<uuid:task_id>/events/", TaskEventsView.as_view(), name="task_events"
+    ),
 ]
@@ -1,36 +1,69 @@
-import csv
+import json
 import os
-import time
+import shutil
 
-import httpx
-from celery.result import AsyncResult
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.http import HttpResponse, HttpResponseRedirect
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models.functions import Length, Substr
+from django.db.models.lookups import GreaterThan
+from django.http import (
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import generics, permissions
 from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
+from rest_framework.throttling import UserRateThrottle
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 
 # Import shared caching helpers
 from .cache_utils import (
-    _compress,
-    _decompress,
+    _TRANSLATION_TTL,
     _l1_get,
     _l1_set,
-    chunk_get,
-    chunk_set,
+    chunk_get_many,
+    chunk_set_many,
+    content_hash,
     make_cache_key,
+    translation_get,
+    translation_get_many,
+)
+from .codec import encode
+from .downloads import ranged_file_response
+from .engine import TranslationEngine, UpstreamError, _split_into_chunks
+from .exporters import (
+    ENCODERS,
+    ExportFormatError,
+    aiter_export,
+    export_dir,
+    find_export,
+    get_encoder,
+    history_queryset,
+    iter_export,
 )
+from .http_client import get_async_client
+from .metrics import TRANSLATION_CHUNKS, cache_lookup, stage
 from .models import Translation, UserLoginLog
+from .pagination import HistoryCursorPagination
+from .progress import aevents, await_change, task_status
+from .ratelimit import retry_after_header
 from .serializers import (
     RegisterSerializer,
+    TranslationPreviewSerializer,
     TranslationSerializer,
     UserLoginLogSerializer,
 )
+from .singleflight import acoalesce, coalesce
 
 # Custom auth class to allow CSRF-exempt session-based requests (e.g., /api/logout/)
 
@@ -40,75 +73,232 @@ class CsrfExemptSessionAuthentication(SessionAuthentication):
         return  # Skip CSRF; view stays @csrf_exempt
 
 
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
-MODEL = "google/gemma-3-27b-it:free"
+def _parse_languages(data):
+    """Return ``(source_lang, target_lang, level, error)`` from request data.
 
-# --- Prompt helpers (leaner prompts & optional chunking) --------------------
-SYSTEM_PROMPT = (
-    "You are a professional translator. Reply ONLY with the translated text. "
-    "Follow exact style in user prompt (simple/basic vs fluent/natural). "
-    "Do not add explanations, titles, or extra text."
-)
+    ``error`` is a message for a 400 response, or None when input is valid.
+    """
+    source_lang = data.get("source_lang", "en")
+    target_lang = data.get("target_lang", "de")
+    level = data.get("level", "")  # optional now
+
+    # Validate languages
+    allowed_langs = [code for code, _ in Translation.LANG_CHOICES]
+    if source_lang not in allowed_langs or target_lang not in allowed_langs:
+        return source_lang, target_lang, level, "Invalid language code"
+
+    # If translating INTO German, level must be provided and valid
+    if target_lang == "de":
+        if level not in ["A1", "A2", "B1", "B2"]:
+            return source_lang, target_lang, level, "Invalid or missing CEFR level"
+    else:
+        # For other target languages, ignore level
+        level = ""
+    return source_lang, target_lang, level, None
+
+
+def _task_source(request) -> str:
+    """Who queued a translation, for Celery routing (``dumbo.celery``).
+
+    The SPA runs in a browser on one of the CORS origins; anything else
+    (scripts, API clients) does not send an allowed ``Origin``.
+    """
+    origin = request.headers.get("Origin")
+    return "web" if origin and origin in settings.CORS_ALLOWED_ORIGINS else "script"
+
+
+# Longest single wait (rate-limit token or retry backoff) a request accepts
+# before answering 429/503 with Retry-After. Sync views hold a worker thread
+# while waiting, so by default they fail fast; async ones only hold a task.
+WEB_MAX_WAIT = float(os.getenv("LLM_WEB_MAX_WAIT", 0))
+ASYNC_MAX_WAIT = float(os.getenv("LLM_ASYNC_MAX_WAIT", 5))
+
+
+def _upstream_error_response(e: UpstreamError, response_class=Response):
+    response = response_class({"error": str(e)}, status=e.status_code)
+    retry_after = retry_after_header(e.retry_after)
+    if retry_after:
+        response["Retry-After"] = retry_after
+    return response
+
+
+def _is_asgi(request) -> bool:
+    """True when served by the ASGI app, where streamed bodies should be async."""
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_response(events) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # disable proxy buffering (nginx)
+    return response
+
+
+def _cached_response(translation: str, stream: bool):
+    """Return a cache hit either as JSON or as a one-event SSE stream."""
+    if not stream:
+        return Response({"translation": translation}, status=200)
+
+    async def events():
+        yield _sse("done", {"translation": translation, "cached": True})
+
+    return _sse_response(events())
+
+
+def _l1_lookup(cache_key: str):
+    with stage("l1"):
+        cached_translation = _l1_get(cache_key)
+    cache_lookup("l1", cached_translation)
+    return cached_translation
+
+
+def _shared_lookup(text, source_lang, target_lang, level, cache_key):
+    """A finished translation from L2 or the DB (backfilling L2/L1), or None."""
+    # ------------- Level-2 (Redis/django-redis) check ------------
+    with stage("l2"):
+        cached_translation = translation_get(
+            cache_key, text, source_lang, target_lang, level
+        )
+    cache_lookup("l2", cached_translation)
+    if cached_translation:
+        # Populate L1 for faster subsequent access within process
+        _l1_set(cache_key, cached_translation)
+        return cached_translation
+
+    # Attempt to reuse recent identical translation in DB before calling LLM
+    with stage("db"):
+        existing = (
+            Translation.objects.matching(text, source_lang, target_lang, level)
+            .order_by("-created_at")
+            .first()
+        )
+    cache_lookup("db", existing)
+    if existing is None:
+        return None
+    # backfill cache for next time
+    with stage("cache_write"):
+        cache.set(cache_key, encode(existing.output_text), _TRANSLATION_TTL)
+    return existing.output_text
+
+
+def _lookup(text, source_lang, target_lang, level, cache_key):
+    """A finished translation from L1, L2 or the DB, or None."""
+    return _l1_lookup(cache_key) or _shared_lookup(
+        text, source_lang, target_lang, level, cache_key
+    )
+
+
+async def _alookup(text, source_lang, target_lang, level, cache_key):
+    """:func:`_lookup` for async views: L2 and DB in one thread hop."""
+    return _l1_lookup(cache_key) or await sync_to_async(_shared_lookup)(
+        text, source_lang, target_lang, level, cache_key
+    )
+
+
+def _persist(user, text, source_lang, target_lang, level, cache_key, translation):
+    """Save a fresh translation to the history and cache it (L2 & L1)."""
+    with stage("insert"):
+        Translation.objects.create(
+            user=user,
+            input_text=text,
+            output_text=translation,
+            level=level,
+            source_lang=source_lang,
+            target_lang=target_lang,
+        )
+    # Cache stampede protection via add() (SETNX) so only first writer stores
+    with stage("cache_write"):
+        cache.add(cache_key, encode(translation), _TRANSLATION_TTL)
+        _l1_set(cache_key, translation)
+
+
+_apersist = sync_to_async(_persist)
 
-MAX_CHARS_PER_REQUEST = 1500  # safety margin vs LLM context length
-
-
-LEVEL_CONFIGS = {
-    "A1": {
-        "temperature": 0.2,
-        "top_p": 0.7,
-        "style": "very simple German (A1): basic words, short sentences.",
-    },
-    "A2": {
-        "temperature": 0.4,
-        "top_p": 0.8,
-        "style": "simple German (A2): basic grammar/common words, everyday phrases.",
-    },
-    "B1": {
-        "temperature": 0.6,
-        "top_p": 0.9,
-        "style": "everyday German (B1): natural conversations/work/travel.",
-    },
-    "B2": {
-        "temperature": 0.8,
-        "top_p": 0.95,
-        "style": "advanced fluent German (B2): native-like, idiomatic.",
-    },
-}
-
-
-def _build_prompt(text: str, src: str, tgt: str, level: str = "") -> str:
-    """Return a concise translation prompt for the LLM."""
-    if tgt == "de" and level:
-        config = LEVEL_CONFIGS.get(level, {})
-        style = config.get("style", f"({level})")
-        return f"Translate from {src} to German using {style}:\n\n{text}"
-    return f"Translate from {src} to {tgt}:\n\n" + text
-
-
-def _split_into_chunks(text: str, max_chars: int = MAX_CHARS_PER_REQUEST):
-    """Split long input on sentence boundaries to keep each chunk within max_chars."""
-    import re
-
-    sentences = re.split(r"(?<=[.!?])\\s+", text)
-    chunks, current = [], ""
-    for s in sentences:
-        # +1 for space/newline between sentences
-        if len(current) + len(s) + 1 > max_chars:
-            if current:
-                chunks.append(current.strip())
-                current = ""
-        current += s + " "
-    if current.strip():
-        chunks.append(current.strip())
-    return chunks
+
+def _stream_translation(user, text, source_lang, target_lang, level, cache_key):
+    """Stream a fresh translation as SSE (requires the ASGI app to stream).
+
+    Events: ``chunk`` (a finished chunk; cached ones are sent immediately),
+    ``delta`` (tokens as they arrive), then ``done`` with the full text, or
+    ``error``. The final result is persisted and cached like a normal POST.
+    """
+    engine = TranslationEngine(max_wait=ASYNC_MAX_WAIT)
+    chunks = _split_into_chunks(text)
+    total = len(chunks)
+    TRANSLATION_CHUNKS.observe(total)
+
+    async def events():
+        client = get_async_client()
+        translations = []
+        fresh = []
+        cached_chunks = await sync_to_async(chunk_get_many)(
+            chunks, source_lang, target_lang, level
+        )
+        try:
+            for index, (chunk, cached_chunk) in enumerate(zip(chunks, cached_chunks)):
+                cache_lookup("chunk", cached_chunk)
+                if cached_chunk:
+                    translations.append(cached_chunk)
+                    yield _sse(
+                        "chunk",
+                        {
+                            "index": index,
+                            "total": total,
+                            "text": cached_chunk,
+                            "cached": True,
+                        },
+                    )
+                    continue
+                parts = []
+                async for delta in engine.astream_chunk(
+                    client, chunk, source_lang, target_lang, level
+                ):
+                    parts.append(delta)
+                    yield _sse("delta", {"index": index, "text": delta})
+                translated = "".join(parts).strip()
+                fresh.append((chunk, translated))
+                translations.append(translated)
+                yield _sse(
+                    "chunk",
+                    {"index": index, "total": total, "text": translated},
+                )
+        except UpstreamError as e:
+            yield _sse(
+                "error",
+                {
+                    "error": str(e),
+                    "status": e.status_code,
+                    "retry_after": retry_after_header(e.retry_after),
+                },
+            )
+            return
+        finally:
+            # Chunks that finished stay cached even if the stream was cut
+            if fresh:
+                await sync_to_async(chunk_set_many)(
+                    fresh, source_lang, target_lang, level
+                )
+
+        translation = "\n".join(translations)
+        await _apersist(
+            user, text, source_lang, target_lang, level, cache_key, translation
+        )
+        yield _sse("done", {"translation": translation})
+
+    return _sse_response(events())
 
 
 class TranslateView(APIView):
     """Translate input text to German at a given CEFR level.
 
     - GET: Public, returns a short help message so the browsable API doesn’t 401.
-    - POST: Requires authentication, performs the translation.
+    - POST: Requires authentication, performs the translation. With
+      ``?stream=1`` the result is streamed as server-sent events.
     """
 
     def get_permissions(self):
@@ -140,29 +330,20 @@ class TranslateView(APIView):
         off-load long-running work to Celery.
         """
         text = request.data.get("input_text", "").strip()
-        source_lang = request.data.get("source_lang", "en")
-        target_lang = request.data.get("target_lang", "de")
-        level = request.data.get("level", "")  # optional now
-
-        # Validate languages
-        allowed_langs = [code for code, _ in Translation.LANG_CHOICES]
-        if source_lang not in allowed_langs or target_lang not in allowed_langs:
-            return Response({"error": "Invalid language code"}, status=400)
-
-        # If translating INTO German, level must be provided and valid
-        if target_lang == "de":
-            if level not in ["A1", "A2", "B1", "B2"]:
-                return Response({"error": "Invalid or missing CEFR level"}, status=400)
-        else:
-            # For other target languages, ignore level
-            level = ""
+        source_lang, target_lang, level, error = _parse_languages(request.data)
+        if error:
+            return Response({"error": error}, status=400)
 
         # Build a cache key and try cache first (fast, avoids DB + LLM hit)
         cache_key = make_cache_key(text, source_lang, target_lang, level)
 
+        # ?stream=1 answers with server-sent events instead of JSON/Celery
+        stream = request.query_params.get("stream") == "1"
+
         # --- Optionally offload long or explicitly async requests to Celery ---
-        if request.query_params.get("async") == "1" or len(text) > int(
-            os.getenv("ASYNC_TRANSLATE_THRESHOLD", 3000)
+        if not stream and (
+            request.query_params.get("async") == "1"
+            or len(text) > int(os.getenv("ASYNC_TRANSLATE_THRESHOLD", 3000))
         ):
             from .tasks import translate_text_task
 
@@ -173,159 +354,269 @@ class TranslateView(APIView):
                 target_lang=target_lang,
                 level=level,
                 cache_key=cache_key,
+                source=_task_source(request),
             )
             return Response({"task_id": task.id, "status": "queued"}, status=202)
-        # ------------- Level-1 (in-process) cache check ------------
-        cached_translation = _l1_get(cache_key)
+        # L1, then L2, then a recent identical translation in the DB
+        cached_translation = _lookup(text, source_lang, target_lang, level, cache_key)
         if cached_translation:
-            return Response({"translation": cached_translation}, status=200)
+            return _cached_response(cached_translation, stream)
 
-        # ------------- Level-2 (Redis/django-redis) check ------------
-        redis_blob = cache.get(cache_key)
-        if isinstance(redis_blob, (bytes, bytearray)):
-            cached_translation = _decompress(redis_blob)
-        else:
-            cached_translation = redis_blob
-        if cached_translation:
-            # Populate L1 for faster subsequent access within process
-            _l1_set(cache_key, cached_translation)
-            return Response({"translation": cached_translation}, status=200)
+        if stream:
+            return _stream_translation(
+                request.user, text, source_lang, target_lang, level, cache_key
+            )
 
-        # Attempt to reuse recent identical translation in DB before calling LLM
-        existing = (
-            Translation.objects.filter(
-                input_text=text,
+        # Identical concurrent requests (across threads and workers) share a
+        # single upstream call; everyone still persists their own history row.
+        try:
+            with stage("llm"):
+                translation, _ = coalesce(
+                    cache_key,
+                    lambda: TranslationEngine(max_wait=WEB_MAX_WAIT).translate(
+                        text, source_lang, target_lang, level
+                    ),
+                )
+        except UpstreamError as e:
+            return _upstream_error_response(e)
+
+        _persist(
+            request.user, text, source_lang, target_lang, level, cache_key, translation
+        )
+        return Response({"translation": translation}, status=201)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class _AsyncAPIView(View):
+    """Base for native async views served by the ASGI app.
+
+    DRF views are sync-only, so these are plain Django views that apply the
+    same JWT bearer authentication and user throttling as the DRF endpoints.
+    CSRF does not apply to bearer auth.
+    """
+
+    authentication_classes = [JWTAuthentication]
+    throttle_classes = [UserRateThrottle]
+
+    async def _check_access(self, request):
+        """Authenticate and throttle; return an error response or None."""
+        user = await sync_to_async(self._authenticate)(request)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+        request.user = user
+        wait = await sync_to_async(self._throttle_wait)(request)
+        if wait is not None:
+            response = JsonResponse({"detail": "Request was throttled."}, status=429)
+            response["Retry-After"] = str(int(wait) + 1)
+            return response
+        return None
+
+    def _authenticate(self, request):
+        for auth_class in self.authentication_classes:
+            try:
+                result = auth_class().authenticate(request)
+            except AuthenticationFailed:
+                return None
+            if result is not None:
+                return result[0]
+        return None
+
+    def _throttle_wait(self, request):
+        """Return seconds to wait if any throttle rejects, else None."""
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                return throttle.wait() or 0
+        return None
+
+
+class AsyncTranslateView(_AsyncAPIView):
+    """Native async twin of ``TranslateView.post`` for the ASGI app.
+
+    Under an ASGI server (``backend/dumbo/asgi.py`` with uvicorn workers) it
+    awaits the pooled async httpx client, so one worker process can hold
+    hundreds of in-flight translations instead of blocking a sync worker per
+    request. Cache/DB lookup and persistence share the sync helpers
+    (``_lookup``/``_persist``), one thread hop each.
+    Authentication (JWT bearer) and throttling match the DRF endpoint.
+    """
+
+    async def post(self, request):
+        denied = await self._check_access(request)
+        if denied is not None:
+            return denied
+        user = request.user
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        text = str(data.get("input_text", "")).strip()
+        source_lang, target_lang, level, error = _parse_languages(data)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+
+        cache_key = make_cache_key(text, source_lang, target_lang, level)
+        stream = request.GET.get("stream") == "1"
+
+        if not stream and (
+            request.GET.get("async") == "1"
+            or len(text) > int(os.getenv("ASYNC_TRANSLATE_THRESHOLD", 3000))
+        ):
+            from .tasks import translate_text_task
+
+            task = await sync_to_async(translate_text_task.delay)(
+                user_id=user.id,
+                text=text,
                 source_lang=source_lang,
                 target_lang=target_lang,
                 level=level,
+                cache_key=cache_key,
+                source=_task_source(request),
             )
-            .order_by("-created_at")
-            .first()
+            return JsonResponse({"task_id": task.id, "status": "queued"}, status=202)
+
+        cached_translation = await _alookup(
+            text, source_lang, target_lang, level, cache_key
         )
-        if existing:
-            # backfill cache for next time
-            cache.set(
-                cache_key, existing.output_text, int(os.getenv("CACHE_TTL", 3600))
+        if cached_translation:
+            if stream:
+                return _cached_response(cached_translation, stream)
+            return JsonResponse({"translation": cached_translation}, status=200)
+
+        if stream:
+            return _stream_translation(
+                user, text, source_lang, target_lang, level, cache_key
             )
-            return Response({"translation": existing.output_text}, status=200)
 
-        headers = {
-            "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
-            "Content-Type": "application/json",
+        try:
+            with stage("llm"):
+                translation, _ = await acoalesce(
+                    cache_key,
+                    lambda: TranslationEngine(max_wait=ASYNC_MAX_WAIT).atranslate(
+                        text, source_lang, target_lang, level
+                    ),
+                )
+        except UpstreamError as e:
+            return _upstream_error_response(e, JsonResponse)
+
+        await _apersist(
+            user, text, source_lang, target_lang, level, cache_key, translation
+        )
+        return JsonResponse({"translation": translation}, status=201)
+
+
+class BatchTranslateView(APIView):
+    """Translate many short texts (UI strings, flashcards) in one request.
+
+    POST ``{"texts": [...], "source_lang", "target_lang", "level"}``. Cache
+    hits for the whole batch are resolved in one ``get_many`` round trip;
+    misses are packed into as few LLM prompts as fit under
+    ``MAX_CHARS_PER_REQUEST`` and persisted with a single ``bulk_create``.
+    Returns one result per input, in input order. If upstream gives up
+    part-way (e.g. the fail-fast rate limit), the items finished so far are
+    still saved and cached before the error is returned, so a retry only
+    pays for the rest.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        texts = request.data.get("texts")
+        max_items = int(os.getenv("BATCH_TRANSLATE_MAX_ITEMS", 500))
+        if not isinstance(texts, list) or not texts:
+            return Response({"error": "texts must be a non-empty list"}, status=400)
+        if len(texts) > max_items:
+            return Response(
+                {"error": f"At most {max_items} texts per batch"}, status=400
+            )
+        if not all(isinstance(t, str) and t.strip() for t in texts):
+            return Response(
+                {"error": "Every text must be a non-empty string"}, status=400
+            )
+        source_lang, target_lang, level, error = _parse_languages(request.data)
+        if error:
+            return Response({"error": error}, status=400)
+
+        texts = [t.strip() for t in texts]
+        keys = [make_cache_key(t, source_lang, target_lang, level) for t in texts]
+        found = {}
+        for key in keys:
+            cached_translation = _l1_get(key)
+            if cached_translation:
+                found[key] = cached_translation
+        missing = {
+            k: (t, source_lang, target_lang, level)
+            for k, t in zip(keys, texts)
+            if k not in found
         }
+        for key, cached_translation in translation_get_many(missing).items():
+            found[key] = cached_translation
+            _l1_set(key, cached_translation)
+
+        # Translate each distinct miss once
+        todo = {k: t for k, t in zip(keys, texts) if k not in found}
+        if todo:
+            try:
+                translated = TranslationEngine(
+                    max_wait=WEB_MAX_WAIT
+                ).translate_batch(list(todo.values()), source_lang, target_lang, level)
+            except UpstreamError as e:
+                # Keep the items already paid for: a retry finds them cached
+                self._persist(
+                    request.user, todo, e.partial, source_lang, target_lang, level
+                )
+                return _upstream_error_response(e)
+            found.update(
+                self._persist(
+                    request.user, todo, translated, source_lang, target_lang, level
+                )
+            )
+
+        results = [
+            {
+                "input_text": text,
+                "translation": found[key],
+                "cached": key not in todo,
+            }
+            for text, key in zip(texts, keys)
+        ]
+        return Response({"results": results}, status=201 if todo else 200)
 
-        # ---------------- Translation loop over chunks ----------------
-        src_lang_name = dict(Translation.LANG_CHOICES).get(source_lang)
-        tgt_lang_name = dict(Translation.LANG_CHOICES).get(target_lang)
-        chunks = _split_into_chunks(text)
-        translations_accum = []
+    @staticmethod
+    def _persist(user, todo, translated, source_lang, target_lang, level):
+        """Save and cache the finished translations of ``todo`` ({key: text}).
 
-        limits = httpx.Limits(
-            max_connections=int(os.getenv("HTTPX_MAX_CONNECTIONS", 20)),
-            max_keepalive_connections=int(os.getenv("HTTPX_MAX_KEEPALIVE", 10)),
-        )
-        with httpx.Client(timeout=30, limits=limits) as client:
-            for chunk in chunks:
-                cached_chunk = chunk_get(chunk, source_lang, target_lang, level)
-                if cached_chunk:
-                    translations_accum.append(cached_chunk)
-                    continue
-                prompt = _build_prompt(chunk, src_lang_name, tgt_lang_name, level)
-                if tgt_lang_name == "de" and level:
-                    config = LEVEL_CONFIGS.get(level) or {
-                        "temperature": 0.5,
-                        "top_p": 0.9,
-                    }
-                else:
-                    config = {"temperature": 0.5, "top_p": 0.9}
-                payload = {
-                    "model": MODEL,
-                    "max_tokens": max(60, int(len(chunk.split()) * 4)),
-                    "temperature": config["temperature"],
-                    "top_p": config["top_p"],
-                    "messages": [
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": prompt},
-                    ],
-                }
-
-                retries = 0
-                backoff = 2
-                while True:
-                    try:
-                        llm_resp = client.post(
-                            OPENROUTER_URL, json=payload, headers=headers
-                        )
-                        if llm_resp.status_code == 429 and retries < 3:
-                            retries += 1
-                            ra = llm_resp.headers.get("Retry-After")
-                            try:
-                                wait = int(ra) if ra else backoff
-                            except Exception:
-                                wait = backoff
-                            time.sleep(wait)
-                            backoff = min(backoff * 2, 30)
-                            continue
-                        llm_resp.raise_for_status()
-                        break
-                    except httpx.HTTPStatusError as e:
-                        if e.response.status_code == 429 and retries < 3:
-                            retries += 1
-                            ra = e.response.headers.get("Retry-After")
-                            try:
-                                wait = int(ra) if ra else backoff
-                            except Exception:
-                                wait = backoff
-                            time.sleep(wait)
-                            backoff = min(backoff * 2, 30)
-                            continue
-                        if e.response.status_code == 429:
-                            return Response(
-                                {
-                                    "error": (
-                                        "Upstream rate limit still exceeded. "
-                                        "Please try later."
-                                    )
-                                },
-                                status=429,
-                            )
-                        return Response(
-                            {"error": str(e)}, status=e.response.status_code
-                        )
-                    except httpx.RequestError:
-                        return Response(
-                            {
-                                "error": (
-                                    "Upstream translation service unavailable. "
-                                    "Please try later."
-                                )
-                            },
-                            status=503,
-                        )
-
-                translated_chunk = llm_resp.json()["choices"][0]["message"][
-                    "content"
-                ].strip()
-                chunk_set(chunk, source_lang, target_lang, level, translated_chunk)
-                translations_accum.append(translated_chunk)
-
-        translation = "\n".join(translations_accum)
-
-        # Persist and cache
-        Translation.objects.create(
-            user=request.user,
-            input_text=text,
-            output_text=translation,
-            level=level,
-            source_lang=source_lang,
-            target_lang=target_lang,
+        ``translated`` lines up with ``todo``; ``None`` marks unfinished
+        items, which are skipped. Returns ``{key: translation}``.
+        """
+        fresh = {key: t for key, t in zip(todo, translated) if t}
+        if not fresh:
+            return fresh
+        Translation.objects.bulk_create(
+            [
+                Translation(
+                    user=user,
+                    input_text=todo[key],
+                    output_text=translation,
+                    level=level,
+                    source_lang=source_lang,
+                    target_lang=target_lang,
+                    # bulk_create skips save(), so set the hash here
+                    content_hash=content_hash(
+                        todo[key], source_lang, target_lang, level
+                    ),
+                )
+                for key, translation in fresh.items()
+            ]
         )
-
-        # Cache stampede protection via add() (SETNX) so only first writer stores
-        compressed = _compress(translation)
-        cache.add(cache_key, compressed, int(os.getenv("CACHE_TTL", 3600)))
-        _l1_set(cache_key, translation)
-        return Response({"translation": translation}, status=201)
+        cache.set_many({key: encode(t) for key, t in fresh.items()}, _TRANSLATION_TTL)
+        for key, translation in fresh.items():
+            _l1_set(key, translation)
+        return fresh
 
 
 class UserProfileView(APIView):
@@ -359,6 +650,38 @@ class UserProfileView(APIView):
 
 
 class HistoryListView(generics.ListAPIView):
+    """Cursor-paginated history with truncated previews.
+
+    Only the preview prefix of each text is read from the database, so the
+    payload and query cost stay flat however long the stored texts are.
+    """
+
+    serializer_class = TranslationPreviewSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = HistoryCursorPagination
+
+    def get_queryset(self):
+        preview = int(os.getenv("HISTORY_PREVIEW_CHARS", 200))
+        return (
+            Translation.objects.filter(user=self.request.user)
+            .only("id", "level", "source_lang", "target_lang", "created_at")
+            .annotate(
+                input_preview=Substr("input_text", 1, preview),
+                output_preview=Substr("output_text", 1, preview),
+                # Measure one character past the preview, never the whole text
+                input_truncated=GreaterThan(
+                    Length(Substr("input_text", 1, preview + 1)), preview
+                ),
+                output_truncated=GreaterThan(
+                    Length(Substr("output_text", 1, preview + 1)), preview
+                ),
+            )
+        )
+
+
+class HistoryDetailView(generics.RetrieveAPIView):
+    """Full input/output text of one of the user's translations."""
+
     serializer_class = TranslationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -385,45 +708,79 @@ class LoginLogListView(generics.ListAPIView):
 
 
 class ExportHistoryView(APIView):
-    """Export the authenticated user's translation history as a CSV file."""
+    """Stream the authenticated user's translation history as a file.
+
+    ``?type=csv`` (default), ``ndjson`` or ``parquet``; ``?gzip=1`` compresses
+    the stream. Rows are read through a server-side cursor and encoded in
+    batches, so memory use is flat regardless of history size. Under ASGI
+    the body is produced by an async iterator so it is not buffered.
+
+    ``?async=1`` queues ``export_history_task`` instead and answers 202 with
+    the task id; poll ``tasks/<id>/`` for progress, then fetch the file from
+    ``exports/<id>/`` (resumable with HTTP Range).
+    """
 
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        translations = Translation.objects.filter(user=request.user).order_by(
-            "-created_at"
-        )
-        # Create the HttpResponse object with CSV headers
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = (
-            'attachment; filename="translation_history.csv"'
-        )
+        # ``format`` is reserved by DRF's URL format override
+        fmt = request.query_params.get("type", "csv").lower()
+        gzip = request.query_params.get("gzip") in ("1", "true")
+        try:
+            encoder = get_encoder(fmt)
+        except ExportFormatError as e:
+            return Response({"error": str(e)}, status=400)
 
-        writer = csv.writer(response)
-        writer.writerow(
-            [
-                "Date",
-                "Source Language",
-                "Target Language",
-                "Level",
-                "Input Text",
-                "Output Text",
-            ]
-        )
-        for t in translations:
-            writer.writerow(
-                [
-                    t.created_at.isoformat(sep=" ", timespec="seconds"),
-                    t.source_lang,
-                    t.target_lang,
-                    t.level or "-",
-                    t.input_text.replace("\n", " "),
-                    t.output_text.replace("\n", " "),
-                ]
+        if request.query_params.get("async") == "1":
+            from .tasks import export_history_task
+
+            task = export_history_task.delay(
+                user_id=request.user.id, fmt=fmt, gzip=gzip
             )
+            return Response({"task_id": task.id, "status": "queued"}, status=202)
+
+        queryset = history_queryset(request.user)
+        if _is_asgi(request):
+            content = aiter_export(queryset, encoder, gzip=gzip)
+        else:
+            content = iter_export(queryset, encoder, gzip=gzip)
+        filename = f"translation_history.{encoder.extension}"
+        content_type = encoder.content_type
+        if gzip:
+            # A .gz download rather than Content-Encoding, which clients
+            # would transparently undo
+            filename += ".gz"
+            content_type = "application/gzip"
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
         return response
 
 
+class ExportDownloadView(APIView):
+    """Download a finished background export, with HTTP Range support.
+
+    Files live under ``EXPORT_ROOT/<user_id>/``, so a user can only ever
+    reach their own exports; unknown or unfinished tasks are a 404.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, task_id):
+        path = find_export(request.user.id, str(task_id))
+        if path is None:
+            return Response({"error": "Export not found"}, status=404)
+        gzip = path.suffix == ".gz"
+        ext = path.suffixes[-2 if gzip else -1].lstrip(".")
+        content_type = "application/gzip" if gzip else ENCODERS[ext].content_type
+        return ranged_file_response(
+            request,
+            path,
+            content_type,
+            f"translation_history{''.join(path.suffixes)}",
+            asynchronous=_is_asgi(request),
+        )
+
+
 class GoogleAuthComplete(APIView):
     """Custom view that is called after Google OAuth completes.
 
@@ -490,7 +847,9 @@ class DeleteAccountView(APIView):
         # Keep a reference to the user before deleting for potential auditing
         user = request.user
         username = user.username
+        user_id = user.id
         user.delete()
+        shutil.rmtree(export_dir(user_id), ignore_errors=True)
         # If we reach here, deletion succeeded
         return Response(
             {"detail": f"User '{username}' and related data deleted."}, status=204
@@ -507,15 +866,17 @@ class OAuthErrorView(APIView):
         return Response({"error": message}, status=400)
 
 
-class TaskStatusView(APIView):
+class TaskStatusView(_AsyncAPIView):
     """Return Celery task status (and result/timing) for a given task_id.
 
     Example response while running:
         {
           "task_id": "c2e3...",
-          "state": "STARTED",
+          "state": "PROGRESS",
           "started_at": "2024-06-12T14:33:11.123Z",
-          "finished_at": null
+          "finished_at": null,
+          "seq": 1718202791123456789,
+          "progress": {"chunks_done": 2, "chunks_total": 5, "chunks": [...]}
         }
 
     Example response when finished:
@@ -524,46 +885,48 @@ class TaskStatusView(APIView):
           "state": "SUCCESS",
           "started_at": "2024-06-12T14:33:11.123Z",
           "finished_at": "2024-06-12T14:33:15.007Z",
+          "seq": 1718202795007000000,
           "result": "Hallo Welt!"
         }
-    """
 
-    permission_classes = [permissions.IsAuthenticated]
+    Long-poll: ``?wait=<seconds>&since=<seq>`` holds the request (up to 30 s)
+    until the task reports past ``seq`` or finishes. ``tasks/<id>/events/``
+    pushes the same payloads as server-sent events. The view is async so a
+    waiting client parks on the event loop instead of occupying the thread
+    that runs every sync view under ASGI.
+    """
 
-    def _to_iso(self, value):
-        """Return ISO-8601 string for datetime or epoch seconds, else None."""
-        if value is None:
-            return None
-        # Celery backends may return either datetime or float timestamps
-        from datetime import datetime
-
-        from django.utils import timezone
-
-        # If it's already a datetime, ensure it is aware & ISO-format it
-        if isinstance(value, datetime):
-            if timezone.is_naive(value):
-                value = timezone.make_aware(value, timezone.utc)
-            return value.isoformat()
-        # Fallback: treat as epoch seconds
+    async def get(self, request, task_id):
+        denied = await self._check_access(request)
+        if denied is not None:
+            return denied
+        task_id = str(task_id)
         try:
-            return (
-                datetime.utcfromtimestamp(float(value))
-                .replace(tzinfo=timezone.utc)
-                .isoformat()
+            wait = float(request.GET.get("wait", 0))
+            since = int(request.GET.get("since", 0))
+        except ValueError:
+            return JsonResponse(
+                {"error": "wait and since must be numbers"}, status=400
             )
-        except Exception:
-            return None
+        if wait > 0:
+            await await_change(task_id, since, wait)
+        return JsonResponse(await sync_to_async(task_status)(task_id))
 
-    def get(self, request, task_id):
-        res = AsyncResult(str(task_id))
-        data = {
-            "task_id": str(task_id),
-            "state": res.state,
-            "started_at": self._to_iso(getattr(res, "date_created", None)),
-            "finished_at": self._to_iso(getattr(res, "date_done", None)),
-        }
-        if res.state == "SUCCESS":
-            data["result"] = res.result
-        elif res.state == "FAILURE":
-            data["error"] = str(res.result)
-        return Response(data)
+
+class TaskEventsView(_AsyncAPIView):
+    """Push task status changes as server-sent events (ASGI app).
+
+    Sends a ``status`` event with the ``TaskStatusView`` payload on connect
+    and on every change, and closes after a terminal state.
+    """
+
+    async def get(self, request, task_id):
+        denied = await self._check_access(request)
+        if denied is not None:
+            return denied
+
+        async def events():
+            async for status in aevents(str(task_id)):
+                yield _sse("status", status)
+
+        return _sse_response(events())
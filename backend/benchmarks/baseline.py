@@ -0,0 +1,81 @@
+"""Stored benchmark baselines and regression checks.
+
+``baseline.json`` (next to this file) holds one section per suite, each a
+flat ``{name: number}`` map. Names ending in ``rps`` are throughputs
+(higher is better); everything else is a time (lower is better). A result
+regresses when it is worse than the baseline by more than ``tolerance``
+(a fraction, e.g. ``0.25``).
+
+Baselines are machine-specific. The committed ``baseline.json`` was
+recorded on one developer machine and is informational only: it shows
+the expected shape and relative costs, not targets. Re-record it with
+``--save-baseline`` on the machine that runs the comparison before
+treating a regression as real.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def higher_is_better(name: str) -> bool:
+    return name.endswith("rps")
+
+
+def load(suite: str, path: Path = BASELINE_PATH) -> Dict[str, float]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text()).get(suite, {})
+
+
+def save(suite: str, results: Dict[str, float], path: Path = BASELINE_PATH) -> None:
+    data = json.loads(path.read_text()) if path.exists() else {}
+    data[suite] = {name: round(value, 4) for name, value in sorted(results.items())}
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    """Return one message per result that regressed against ``baseline``."""
+    regressions = []
+    for name, value in sorted(results.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if higher_is_better(name):
+            change = (reference - value) / reference
+        else:
+            change = (value - reference) / reference
+        if change > tolerance:
+            regressions.append(
+                f"{name}: {value:.4g} vs baseline {reference:.4g} "
+                f"({change:+.0%} worse)"
+            )
+    return regressions
+
+
+def check(
+    suite: str,
+    results: Dict[str, float],
+    tolerance: float,
+    save_baseline: bool = False,
+    path: Path = BASELINE_PATH,
+) -> int:
+    """Save or compare ``results``; print regressions and return an exit code."""
+    if save_baseline:
+        save(suite, results, path)
+        print(f"Saved {len(results)} results to {path} [{suite}]")
+        return 0
+    baseline = load(suite, path)
+    if not baseline:
+        print(f"No baseline for {suite!r} in {path}; run with --save-baseline")
+        return 0
+    regressions = compare(results, baseline, tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not regressions:
+        print(f"No regressions against {path.name} [{suite}] (±{tolerance:.0%})")
+    return 1 if regressions else 0
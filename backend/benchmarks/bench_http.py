@@ -0,0 +1,304 @@
+"""Load test the API end to end against a local OpenRouter stub.
+
+Usage (from the repository root)::
+
+    python -m backend.benchmarks.bench_http [--concurrency 1 8 32]
+        [--requests 400] [--unique 50] [--latency 0.05] [--fail-rate 0.02]
+        [--server asgi|wsgi] [--scenarios translate aio stream batch history]
+        [--tolerance 0.3] [--save-baseline]
+
+Starts :class:`~backend.benchmarks.stub.OpenRouterStub` (configurable
+latency and 429 injection; streaming is answered as SSE) and serves the
+project in-process, under uvicorn (``asgi``, as deployed) or a threaded
+WSGI server, on a throwaway SQLite database with the local-memory cache
+(pass ``--database-url``/``--cache-url`` to use Postgres/Redis). Each
+scenario then runs ``--requests`` requests per concurrency level:
+
+- ``translate``: ``POST /api/translate/``
+- ``aio``: ``POST /api/translate/aio/`` (native async view)
+- ``stream``: ``POST /api/translate/aio/?stream=1`` (SSE, read to the end)
+- ``batch``: ``POST /api/translate/batch/`` with 20 texts each
+- ``history``: ``GET /api/history/`` (after seeding ``--history-rows``)
+
+Texts are drawn from ``--unique`` distinct sentences and caches are
+cleared before every run, so the hit rate shows how repeats are served.
+Reports RPS, p50/p99 latency, errors, cache hit rate (responses served
+without a fresh completion) and upstream calls, then compares RPS and
+latency with the ``http`` section of ``baseline.json``.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from backend.benchmarks import baseline
+from backend.benchmarks.stub import OpenRouterStub
+
+SUITE = "http"
+SCENARIOS = ("translate", "aio", "stream", "batch", "history")
+BATCH_SIZE = 20
+
+
+def configure(args, stub_url: str, db_path: str) -> None:
+    """Point the project at the stub and a scratch database, then set up."""
+    os.environ.update(
+        {
+            "DJANGO_SETTINGS_MODULE": "backend.dumbo.settings",
+            "DEBUG": "True",  # no HTTPS redirect on the loopback server
+            "SECRET_KEY": os.getenv("SECRET_KEY", "bench-" + "0" * 58),
+            "ALLOWED_ORIGINS": os.getenv("ALLOWED_ORIGINS", "http://localhost"),
+            "DATABASE_URL": args.database_url or f"sqlite:///{db_path}",
+            "LLM_ENDPOINTS": json.dumps([{"name": "stub", "url": stub_url}]),
+            "OPENROUTER_API_KEY": "bench",
+            "LLM_RATE_PER_MINUTE": "0",
+            "THROTTLE_RATE_USER": "1000000/min",
+            "LLM_WEB_MAX_WAIT": os.getenv("LLM_WEB_MAX_WAIT", "30"),
+        }
+    )
+    if args.cache_url:
+        os.environ["CACHE_URL"] = args.cache_url
+    else:
+        os.environ.pop("CACHE_URL", None)
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+
+
+def reset_caches() -> None:
+    from django.core.cache import cache
+
+    from backend.api import cache_utils
+    from backend.api.models import Translation
+
+    cache.clear()
+    cache_utils._L1_CACHE.clear()
+    cache_utils._CHUNK_CACHE.clear()
+    Translation.objects.all().delete()  # the DB reuse query is a cache too
+
+
+def seed_history(user, rows: int) -> None:
+    from backend.api.models import Translation
+
+    Translation.objects.bulk_create(
+        Translation(
+            user=user,
+            input_text=f"history row {i} " * 20,
+            output_text=f"HISTORY ROW {i} " * 20,
+            source_lang="en",
+            target_lang="de",
+            level="B1",
+        )
+        for i in range(rows)
+    )
+
+
+# ---------------- In-process servers ----------------
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Server:
+    """Serve the project on 127.0.0.1 in a background thread."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._thread = None
+        self._server = None
+
+    def start(self) -> str:
+        if self.kind == "wsgi":
+            from backend.dumbo.wsgi import application
+
+            self._server = make_server(
+                "127.0.0.1",
+                0,
+                application,
+                server_class=_ThreadingWSGIServer,
+                handler_class=_QuietHandler,
+            )
+            port = self._server.server_address[1]
+            target, kwargs = self._server.serve_forever, {}
+        else:
+            import uvicorn
+
+            from backend.dumbo.asgi import application
+
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+            config = uvicorn.Config(application, log_level="warning", lifespan="off")
+            self._server = uvicorn.Server(config)
+            target, kwargs = self._server.run, {"sockets": [sock]}
+        self._thread = threading.Thread(target=target, kwargs=kwargs, daemon=True)
+        self._thread.start()
+        if self.kind == "asgi":
+            while not self._server.started:
+                time.sleep(0.01)
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self) -> None:
+        if self.kind == "wsgi":
+            self._server.shutdown()
+            self._server.server_close()
+        else:
+            self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+# ---------------- Load generation ----------------
+def make_texts(unique: int):
+    return [f"Sentence number {i} for the load test." for i in range(unique)]
+
+
+def build_request(scenario: str, texts, rng: random.Random):
+    """Return ``(method, path, json_body)`` for one request."""
+    if scenario == "history":
+        return "GET", "/api/history/", None
+    if scenario == "batch":
+        return (
+            "POST",
+            "/api/translate/batch/",
+            {"texts": rng.sample(texts, min(BATCH_SIZE, len(texts))), "level": "B1"},
+        )
+    path = {
+        "translate": "/api/translate/",
+        "aio": "/api/translate/aio/",
+        "stream": "/api/translate/aio/?stream=1",
+    }[scenario]
+    return "POST", path, {"input_text": rng.choice(texts), "level": "B1"}
+
+
+def was_cached(scenario: str, response) -> bool:
+    if scenario == "stream":
+        return b"event: delta" not in response.content
+    if scenario in ("translate", "aio"):
+        return response.status_code == 200
+    return False
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(q / 100 * len(ordered))) - 1]
+
+
+def run_scenario(client, stub, scenario, texts, requests, concurrency, seed=0):
+    rng = random.Random(seed)
+    plan = [build_request(scenario, texts, rng) for _ in range(requests)]
+    upstream_before = stub.hits
+
+    def one(request):
+        method, path, body = request
+        started = time.perf_counter()
+        try:
+            response = client.request(method, path, json=body)
+        except Exception:
+            return time.perf_counter() - started, False, False
+        ok = response.status_code < 400
+        return time.perf_counter() - started, ok, ok and was_cached(scenario, response)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, plan))
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds for seconds, _, _ in outcomes]
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "errors": sum(not ok for _, ok, _ in outcomes),
+        "hit_rate": sum(hit for _, _, hit in outcomes) / requests,
+        "upstream": stub.hits - upstream_before,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--unique", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--history-rows", type=int, default=500)
+    parser.add_argument("--server", choices=("asgi", "wsgi"), default="asgi")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS)
+    parser.add_argument("--database-url")
+    parser.add_argument("--cache-url")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    import httpx
+
+    stub = OpenRouterStub(
+        latency=args.latency,
+        fail_status=args.fail_status,
+        fail_rate=args.fail_rate,
+        retry_after=0 if args.fail_rate else None,
+    ).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(args, stub.url, os.path.join(tmp, "bench.sqlite3"))
+        from django.contrib.auth import get_user_model
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        user = get_user_model().objects.create_user("bench", password="bench-pw-1")
+        token = str(RefreshToken.for_user(user).access_token)
+        server = Server(args.server)
+        base_url = server.start()
+        client = httpx.Client(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=120,
+            limits=httpx.Limits(max_connections=max(args.concurrency)),
+        )
+        texts = make_texts(args.unique)
+        results = {}
+        print(
+            f"{'scenario':<11}{'conc':>5}{'rps':>9}{'p50 ms':>9}{'p99 ms':>9}"
+            f"{'errors':>8}{'hit %':>7}{'upstream':>10}"
+        )
+        try:
+            for scenario in args.scenarios or SCENARIOS:
+                for concurrency in args.concurrency:
+                    reset_caches()
+                    if scenario == "history":
+                        seed_history(user, args.history_rows)
+                    stats = run_scenario(
+                        client, stub, scenario, texts, args.requests, concurrency
+                    )
+                    print(
+                        f"{scenario:<11}{concurrency:>5}{stats['rps']:>9.1f}"
+                        f"{stats['p50_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+                        f"{stats['errors']:>8}{stats['hit_rate']:>7.0%}"
+                        f"{stats['upstream']:>10}"
+                    )
+                    for key in ("rps", "p50_ms", "p99_ms"):
+                        results[f"{scenario}.c{concurrency}.{key}"] = stats[key]
+        finally:
+            client.close()
+            server.stop()
+            stub.stop()
+    return baseline.check(SUITE, results, args.tolerance, args.save_baseline)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
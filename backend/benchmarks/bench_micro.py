@@ -0,0 +1,89 @@
+"""Microbenchmarks for the hot helpers of the translate path.
+
+Usage (from the repository root)::
+
+    python -m backend.benchmarks.bench_micro [--repeat 5] [--tolerance 0.25]
+                                             [--save-baseline]
+
+Times ``make_cache_key`` (and the pre-v2 ``legacy_cache_key``),
+``split_into_chunks`` and the L2 value codec (``codec.encode``/``decode``,
+also per installed codec) on short and long inputs, prints microseconds
+per call and compares them with the ``micro`` section of ``baseline.json``;
+exits non-zero on a regression.
+"""
+
+import argparse
+import sys
+import timeit
+
+from backend.api.cache_utils import legacy_cache_key, make_cache_key
+from backend.api.codec import CODEC_NAMES, decode, encode, registry
+from backend.api.segmenter import split_into_chunks
+from backend.benchmarks import baseline
+from backend.benchmarks.bench_segmenter import make_text
+
+SUITE = "micro"
+
+
+def cases():
+    """Return ``{name: zero-argument callable}``."""
+    short = make_text(200)
+    page = make_text(10 * 1024)
+    long = make_text(1024 * 1024)
+    page_blob = encode(page)
+    long_blob = encode(long)
+    translation = make_text(600, seed=1)  # a typical cached chunk
+    by_codec = {}
+    for name, codec in CODEC_NAMES.items():
+        if codec and registry.get(codec) is not None:
+            blob = encode(translation, codec)
+            by_codec[f"encode.{name}.600b"] = lambda c=codec: encode(translation, c)
+            by_codec[f"decode.{name}.600b"] = lambda b=blob: decode(b)
+    return {
+        "make_cache_key.short": lambda: make_cache_key(short, "en", "de", "B1"),
+        "make_cache_key.1mb": lambda: make_cache_key(long, "en", "de", "B1"),
+        "legacy_cache_key.1mb": lambda: legacy_cache_key(long, "en", "de", "B1"),
+        "split_into_chunks.10kb": lambda: split_into_chunks(page),
+        "split_into_chunks.1mb": lambda: split_into_chunks(long),
+        "encode.10kb": lambda: encode(page),
+        "encode.1mb": lambda: encode(long),
+        "decode.10kb": lambda: decode(page_blob),
+        "decode.1mb": lambda: decode(long_blob),
+        **by_codec,
+    }
+
+
+def measure(fn, repeat: int) -> float:
+    """Best-of-``repeat`` microseconds per call (each run lasts >= 0.2 s)."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def run(repeat: int = 5, only=None):
+    return {
+        name: measure(fn, repeat)
+        for name, fn in cases().items()
+        if not only or any(pattern in name for pattern in only)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", help="substrings of case names")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.only)
+    reference = baseline.load(SUITE)
+    print(f"{'case':<26}{'us/call':>12}{'baseline':>12}")
+    for name, value in results.items():
+        base = reference.get(name)
+        print(f"{name:<26}{value:>12.2f}{base if base else '-':>12}")
+    return baseline.check(SUITE, results, args.tolerance, args.save_baseline)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
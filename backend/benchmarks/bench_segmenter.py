@@ -0,0 +1,91 @@
+"""Microbenchmark for the sentence-aware segmenter on multi-MB inputs.
+
+Usage (from the repository root)::
+
+    python -m backend.benchmarks.bench_segmenter [--mb 1 4 16] [--repeat 3]
+
+Reports throughput and chunk-size balance for ``split_into_chunks`` next to
+the legacy ``re.split`` implementation it replaced.
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from backend.api.segmenter import MAX_CHARS_PER_REQUEST, split_into_chunks
+
+_WORDS = (
+    "the translation service handles long documents with many sentences and "
+    "paragraphs e.g. manuals Dr. Smith wrote in 2024 while travelling through "
+    "Berlin Madrid and Paris"
+).split()
+
+
+def make_text(size_bytes: int, seed: int = 0) -> str:
+    """Build pseudo-prose of about ``size_bytes`` with mixed punctuation."""
+    rng = random.Random(seed)
+    parts, total = [], 0
+    while total < size_bytes:
+        sentence = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 30)))
+        sentence = sentence.capitalize() + rng.choice(".....!?")
+        if rng.random() < 0.08:
+            sentence += "\n\n"
+        elif rng.random() < 0.05:
+            sentence += "\n"
+        else:
+            sentence += " "
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)
+
+
+def legacy_split(text: str, max_chars: int = MAX_CHARS_PER_REQUEST):
+    """The pre-segmenter implementation (kept only for comparison)."""
+    sentences = re.split(r"(?<=[.!?])\\s+", text)
+    chunks, current = [], ""
+    for s in sentences:
+        if len(current) + len(s) + 1 > max_chars:
+            if current:
+                chunks.append(current.strip())
+                current = ""
+        current += s + " "
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+def bench(fn, text: str, repeat: int):
+    best, chunks = float("inf"), []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best, chunks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(
+        f"{'impl':<10}{'MB':>6}{'best s':>10}{'MB/s':>9}"
+        f"{'chunks':>8}{'max':>10}{'mean':>10}{'stdev':>8}"
+    )
+    for mb in args.mb:
+        text = make_text(int(mb * 1024 * 1024))
+        for name, fn in (("segmenter", split_into_chunks), ("legacy", legacy_split)):
+            seconds, chunks = bench(fn, text, args.repeat)
+            sizes = [len(c) for c in chunks] or [0]
+            print(
+                f"{name:<10}{mb:>6g}{seconds:>10.4f}{mb / seconds:>9.1f}"
+                f"{len(chunks):>8}{max(sizes):>10}{statistics.mean(sizes):>10.0f}"
+                f"{statistics.pstdev(sizes):>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Local stand-in for the OpenRouter chat-completions API.
+
+Runs a threaded HTTP server on 127.0.0.1 that answers
+``POST /api/v1/chat/completions`` by upper-casing the text of the user
+prompt (batch marker lines starting with ``<<`` are kept verbatim), either
+as one JSON completion or, for ``"stream": true``, as server-sent events
+with one delta per word. Knobs, adjustable while running:
+
+- ``latency``: seconds to sleep before answering;
+- ``fail_status``/``fail_times``: answer the next N requests with that
+  status (plus ``Retry-After: retry_after`` when set);
+- ``fail_rate``: answer that fraction of requests with ``fail_status``
+  (seeded, so runs are repeatable);
+
+Used by the endpoint/failover tests and the HTTP benchmarks::
+
+    with OpenRouterStub(latency=0.05) as stub:
+        engine = TranslationEngine(url=stub.url)
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+def _translate(prompt: str) -> str:
+    body = prompt.split("\n\n", 1)[-1]
+    return "\n".join(
+        line if line.startswith("<<") else line.upper() for line in body.split("\n")
+    )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_POST(self):
+        stub: "OpenRouterStub" = self.server.stub
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status = stub._next_status()
+        if stub.latency:
+            time.sleep(stub.latency)
+        if status != 200:
+            body = json.dumps({"error": {"code": status}}).encode()
+            self.send_response(status)
+            if stub.retry_after is not None:
+                self.send_header("Retry-After", str(stub.retry_after))
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        content = _translate(payload["messages"][-1]["content"])
+        if payload.get("stream"):
+            events = [": OPENROUTER PROCESSING\n\n"]
+            for word in content.split(" "):
+                delta = {"choices": [{"delta": {"content": word + " "}}]}
+                events.append(f"data: {json.dumps(delta)}\n\n")
+            events.append("data: [DONE]\n\n")
+            body = "".join(events).encode()
+            content_type = "text/event-stream"
+        else:
+            completion = {
+                "model": payload.get("model"),
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+            }
+            body = json.dumps(completion).encode()
+            content_type = "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OpenRouterStub:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        fail_status: int = 503,
+        fail_times: int = 0,
+        retry_after: Optional[float] = None,
+        fail_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.fail_status = fail_status
+        self.fail_times = fail_times
+        self.retry_after = retry_after
+        self.fail_rate = fail_rate
+        self.hits = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        port = self._server.server_address[1]
+        return f"http://127.0.0.1:{port}/api/v1/chat/completions"
+
+    def _next_status(self) -> int:
+        with self._lock:
+            self.hits += 1
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                return self.fail_status
+            if self.fail_rate and self._random.random() < self.fail_rate:
+                return self.fail_status
+            return 200
+
+    def start(self) -> "OpenRouterStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OpenRouterStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
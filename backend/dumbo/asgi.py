@@ -1,6 +1,23 @@
+"""ASGI entry point.
+
+Serve with uvicorn workers so async endpoints (``/api/translate/aio/``) and
+SSE streams (``?stream=1``) run natively, e.g.::
+
+    gunicorn backend.dumbo.asgi:application -k uvicorn_worker.UvicornWorker
+"""
+
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.dumbo.settings")
 application = get_asgi_application()
+
+from backend.api.invalidation import listen  # noqa: E402
+from backend.api.metrics import start_process_stats  # noqa: E402
+
+# Serving processes drop L1 entries other workers invalidate and publish
+# their metrics state. Started here, not in AppConfig.ready(), so
+# management commands don't subscribe.
+listen()
+start_process_stats()
@@ -2,6 +2,9 @@ import os
 import platform
 
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from kombu import Queue
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.dumbo.settings")
 
@@ -9,6 +12,73 @@ app = Celery("dumbo")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
+# --- Queues & routing -------------------------------------------------------
+# interactive: short translations a user is waiting on in the SPA
+# bulk:        long documents and history exports
+# maintenance: housekeeping (purging old export files)
+# Each queue gets its own worker (see render.yaml) so a multi-thousand
+# character job can never sit in front of an interactive request.
+INTERACTIVE_MAX_CHARS = int(os.getenv("CELERY_INTERACTIVE_MAX_CHARS", 3000))
+PRIORITY_STEPS = 10  # Redis emulates priorities with one list per step
+
+app.conf.update(
+    task_queues=(
+        Queue("interactive"),
+        Queue("bulk"),
+        Queue("maintenance"),
+    ),
+    task_default_queue="interactive",
+    # Redis: 0 is the highest priority
+    broker_transport_options={
+        "priority_steps": list(range(PRIORITY_STEPS)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+    task_default_priority=5,
+    # LLM calls are long and I/O-bound: take one message at a time so queued
+    # work stays visible to idle workers, and only ack once it is done (tasks
+    # are idempotent, see translate_text_task) so a crash redelivers it.
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    beat_schedule={
+        "purge-expired-exports": {
+            "task": "backend.api.tasks.purge_expired_exports",
+            "schedule": crontab(minute=17),
+        },
+    },
+)
+
+
+def translation_priority(text_length: int, source: str = "web") -> int:
+    """Broker priority (0 = first) from text size and who is waiting.
+
+    Requests from the web app (a user watching a spinner) outrank other
+    sources (scripts, re-drives); shorter texts outrank longer ones.
+    """
+    priority = min(text_length // 1000, 6)
+    if source != "web":
+        priority += 3
+    return min(priority, PRIORITY_STEPS - 1)
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Pick queue and priority per task; explicit apply_async options win."""
+    if name == "backend.api.tasks.translate_text_task":
+        length = len(kwargs.get("text") or "")
+        return {
+            "queue": "interactive" if length <= INTERACTIVE_MAX_CHARS else "bulk",
+            "priority": translation_priority(length, kwargs.get("source", "web")),
+        }
+    if name == "backend.api.tasks.export_history_task":
+        return {"queue": "bulk", "priority": 7}
+    if name == "backend.api.tasks.purge_expired_exports":
+        return {"queue": "maintenance"}
+    return None
+
+
+app.conf.task_routes = (route_task,)
+
 
 # On Windows, the default 'prefork' pool is not supported and can raise
 # `PermissionError: [WinError 5] Access is denied` due to missing semaphore
@@ -24,3 +94,48 @@ if platform.system() == "Windows":
         worker_pool="solo",
         worker_concurrency=1,
     )
+
+
+@worker_process_shutdown.connect
+def close_http_clients(**kwargs):
+    """Close the pooled upstream HTTP clients when a worker child exits."""
+    from backend.api.http_client import close_clients
+
+    close_clients()
+
+
+@worker_init.connect
+@worker_process_init.connect
+def listen_for_cache_invalidations(**kwargs):
+    """Drop L1 entries other workers invalidate.
+
+    ``worker_init`` covers the threads/solo pools, which run tasks in the
+    worker process itself; forked prefork children (``worker_process_init``)
+    start their own listener, since threads do not survive ``fork``.
+    """
+    from backend.api.invalidation import listen
+
+    listen()
+
+
+@worker_init.connect
+@worker_process_init.connect
+def publish_process_metrics(**kwargs):
+    """Publish this process's pool, L1 and breaker state (multiprocess mode)."""
+    from backend.api.metrics import start_process_stats
+
+    start_process_stats()
+
+
+@worker_init.connect
+def serve_metrics(**kwargs):
+    """Expose metrics on ``METRICS_PORT`` when no web process shares the host.
+
+    With the prefork pool, also set ``PROMETHEUS_MULTIPROC_DIR`` so the
+    children's samples are aggregated.
+    """
+    port = os.getenv("METRICS_PORT")
+    if port:
+        from backend.api.metrics import serve
+
+        serve(int(port))
@@ -32,6 +32,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its "total" covers the whole middleware stack
+    "backend.api.metrics.ServerTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -155,6 +157,9 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "static"
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Background history exports (api.tasks.export_history_task)
+EXPORT_ROOT = Path(os.getenv("EXPORT_ROOT", BASE_DIR / "exports"))
+
 # Caching: prefer Redis if CACHE_URL present, else fall back to local memory (dev)
 CACHE_URL = os.getenv("CACHE_URL")  # e.g. redis://localhost:6379/1
 if CACHE_URL:
@@ -164,8 +169,9 @@ if CACHE_URL:
             "LOCATION": CACHE_URL,
             "OPTIONS": {
                 "CLIENT_CLASS": "django_redis.client.DefaultClient",
-                # Avoid hammering Redis with serialization by using JSON serializer
-                "SERIALIZER": "django_redis.serializers.json.JSONSerializer",
+                # Translation blobs (backend.api.codec) are stored raw, all
+                # other values as JSON
+                "SERIALIZER": "backend.api.codec.BinarySerializer",
             },
             "TIMEOUT": int(os.getenv("CACHE_TTL", 3600)),  # 1 h default
         }
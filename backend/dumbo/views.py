@@ -1,6 +1,11 @@
-from django.http import JsonResponse
+import hmac
+import os
+
+from django.http import HttpResponse, JsonResponse
 from django.urls import reverse
 
+from backend.api.metrics import render_metrics
+
 
 def root(request):
     """
@@ -16,3 +21,20 @@ def root(request):
             },
         }
     )
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint at “/metrics”.
+    Requires ``Authorization: Bearer $METRICS_TOKEN`` when that is set.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    try:
+        body, content_type = render_metrics()
+    except RuntimeError as e:
+        return HttpResponse(str(e), status=503, content_type="text/plain")
+    return HttpResponse(body, content_type=content_type)
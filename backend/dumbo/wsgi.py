@@ -4,3 +4,10 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.dumbo.settings")
 application = get_wsgi_application()
+
+from backend.api.invalidation import listen  # noqa: E402
+from backend.api.metrics import start_process_stats  # noqa: E402
+
+# See asgi.py
+listen()
+start_process_stats()
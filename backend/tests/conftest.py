@@ -0,0 +1,32 @@
+import pytest
+from django.core.cache import cache
+
+from backend.api import cache_utils, endpoints, ratelimit
+
+
+def _clear():
+    cache.clear()
+    cache_utils._L1_CACHE.clear()
+    cache_utils._CHUNK_CACHE.clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    """Shared, L1 and chunk caches start (and are left) empty for every test."""
+    _clear()
+    yield
+    _clear()
+
+
+@pytest.fixture(autouse=True)
+def _unlimited_upstream(monkeypatch):
+    """Tests exercise the limiter explicitly; elsewhere it must not throttle."""
+    monkeypatch.setattr(ratelimit, "_limiter", ratelimit._Unlimited())
+
+
+@pytest.fixture(autouse=True)
+def _fresh_endpoints(monkeypatch):
+    """Breaker and latency state must not leak between tests."""
+    monkeypatch.setattr(
+        endpoints, "_pool", endpoints.EndpointPool(endpoints.load_endpoints(""))
+    )
@@ -0,0 +1,22 @@
+from backend.benchmarks import baseline, bench_micro
+
+
+def test_compare_flags_slower_times_and_lower_throughput():
+    reference = {"a.us": 10.0, "b.rps": 100.0, "c.us": 10.0, "new.us": 0}
+    results = {"a.us": 13.0, "b.rps": 70.0, "c.us": 11.0, "new.us": 5.0}
+    regressions = baseline.compare(results, reference, tolerance=0.25)
+    assert [r.split(":")[0] for r in regressions] == ["a.us", "b.rps"]
+
+
+def test_check_saves_then_compares(tmp_path):
+    path = tmp_path / "baseline.json"
+    assert baseline.check("micro", {"x": 1.0}, 0.25, True, path) == 0
+    assert baseline.load("micro", path) == {"x": 1.0}
+    assert baseline.check("micro", {"x": 1.1}, 0.25, path=path) == 0
+    assert baseline.check("micro", {"x": 2.0}, 0.25, path=path) == 1
+
+
+def test_micro_cases_run():
+    results = bench_micro.run(repeat=1, only=["make_cache_key.short"])
+    assert list(results) == ["make_cache_key.short"]
+    assert results["make_cache_key.short"] > 0
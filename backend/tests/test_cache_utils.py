@@ -0,0 +1,143 @@
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+
+from backend.api import cache_utils
+from backend.api.cache_utils import BoundedTTLCache
+from backend.api.codec import decode, encode
+from backend.api.models import Translation
+
+
+def test_lru_eviction_by_entry_count():
+    cache = BoundedTTLCache(max_entries=2, max_bytes=10_000, default_ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # "b" becomes least recently used
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_bound_and_oversized_values():
+    cache = BoundedTTLCache(max_entries=100, max_bytes=300, default_ttl=60)
+    for i in range(10):
+        cache.set(f"k{i}", "x" * 50)
+    assert cache.stats()["bytes"] <= 300
+    cache.set("huge", "x" * 1000)
+    assert cache.get("huge") is None
+    cache.set("k9", "y" * 1000)  # oversized update replaces the old value
+    assert cache.get("k9") is None
+    assert cache.stats()["bytes"] == sum(
+        cache._sizeof(k, "x" * 50) for k in cache._data
+    )
+
+
+def test_ttl_expiry_and_periodic_sweep():
+    cache = BoundedTTLCache(
+        max_entries=100, max_bytes=10_000, default_ttl=60, sweep_interval=0
+    )
+    cache.set("old", "v", ttl=0)
+    time.sleep(0.001)
+    cache.set("new", "v")  # write triggers the sweep
+    assert len(cache) == 1
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert cache.get("new") == "v"
+    assert cache.get("old") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_chunk_many_uses_one_round_trip_each_way(monkeypatch):
+    django_cache.clear()
+    cache_utils._CHUNK_CACHE.clear()
+    calls = []
+    for name in ("get_many", "set_many"):
+        original = getattr(django_cache, name)
+
+        def spy(*args, _name=name, _original=original, **kwargs):
+            calls.append(_name)
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(django_cache, name, spy)
+
+    chunks = [f"Chunk {i}." for i in range(20)]
+    assert cache_utils.chunk_get_many(chunks, "en", "fr", "") == [None] * 20
+    cache_utils.chunk_set_many([(c, c.upper()) for c in chunks[:10]], "en", "fr", "")
+    assert calls == ["get_many", "set_many"]
+
+    cache_utils._CHUNK_CACHE.clear()  # as seen from another process
+    cache_utils.chunk_set_many([(chunks[0], "FROM L1")], "en", "fr", "")
+    found = cache_utils.chunk_get_many(chunks, "en", "fr", "")
+    assert found[0] == "FROM L1"
+    assert found[1:10] == [c.upper() for c in chunks[1:10]]
+    assert found[10:] == [None] * 10
+    assert calls == ["get_many", "set_many", "set_many", "get_many"]
+
+
+def test_key_framing_is_unambiguous_and_namespaced():
+    key = cache_utils.make_cache_key("ab", "c", "de", "B1")
+    assert key.startswith(f"translation:{cache_utils.KEY_NAMESPACE}:")
+    assert key != cache_utils.make_cache_key("a", "bc", "de", "B1")
+    assert key != cache_utils.legacy_cache_key("ab", "c", "de", "B1")
+    # Lone surrogates hashed fine under the JSON scheme and still do
+    assert cache_utils.make_cache_key("\ud800", "en", "de", "B1")
+
+
+def test_legacy_keys_stay_readable_during_rollout(monkeypatch):
+    monkeypatch.setattr(cache_utils, "LEGACY_KEY_READS", True)
+    django_cache.clear()
+    cache_utils._CHUNK_CACHE.clear()
+    request = ("Hello", "en", "de", "B1")
+    key = cache_utils.make_cache_key(*request)
+    django_cache.set(cache_utils.legacy_cache_key(*request), encode("Hallo"))
+    assert cache_utils.translation_get(key, *request) == "Hallo"
+    assert decode(django_cache.get(key)) == "Hallo"  # copied forward
+    django_cache.delete(key)
+    assert cache_utils.translation_get_many({key: request}) == {key: "Hallo"}
+
+    chunk = ("Chunk.", "en", "de", "B1")
+    django_cache.set(cache_utils._legacy_chunk_key(*chunk), encode("Stück."))
+    assert cache_utils.chunk_get_many([chunk[0]], *chunk[1:]) == ["Stück."]
+
+    monkeypatch.setattr(cache_utils, "LEGACY_KEY_READS", False)
+    django_cache.delete(key)
+    cache_utils._CHUNK_CACHE.clear()
+
+    def unused(*args):
+        raise AssertionError("legacy key hashed with legacy reads off")
+
+    monkeypatch.setattr(cache_utils, "legacy_cache_key", unused)
+    monkeypatch.setattr(cache_utils, "_legacy_chunk_key", unused)
+    assert cache_utils.translation_get(key, *request) is None
+    assert cache_utils.translation_get_many({key: request}) == {}
+    assert cache_utils.chunk_get_many(["Other."], *chunk[1:]) == [None]
+    assert cache_utils.cache_keys_for(*request) == [key]
+    assert cache_utils.chunk_cache_keys_for(*request) == cache_utils.chunk_keys(
+        ["Hello"], *request[1:]
+    )
+
+
+@pytest.mark.django_db
+def test_saving_a_translation_invalidates_both_keys(monkeypatch):
+    monkeypatch.setattr(cache_utils, "LEGACY_KEY_READS", True)
+    request = ("Hello", "en", "de", "B1")
+    keys = cache_utils.cache_keys_for(*request)
+    assert len(keys) == 2
+    user = get_user_model().objects.create_user("inv", password="pw12345678")
+    row = Translation.objects.create(
+        user=user,
+        input_text="Hello",
+        output_text="Hallo",
+        source_lang="en",
+        target_lang="de",
+        level="B1",
+    )
+    django_cache.set_many({k: encode("stale") for k in keys})
+    cache_utils._l1_set(keys[0], "stale")
+    row.output_text = "Servus"
+    row.save()
+    assert django_cache.get_many(keys) == {}
+    assert cache_utils._l1_get(keys[0]) is None
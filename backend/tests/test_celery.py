@@ -0,0 +1,54 @@
+import os
+import time
+
+from backend.api.tasks import purge_expired_exports
+from backend.dumbo.celery import app, route_task
+
+
+def _route(name, **kwargs):
+    return app.amqp.router.route({}, name, kwargs=kwargs)
+
+
+def test_translations_route_by_length_and_source():
+    short = _route("backend.api.tasks.translate_text_task", text="hi")
+    long = _route("backend.api.tasks.translate_text_task", text="x" * 20000)
+    script = route_task(
+        "backend.api.tasks.translate_text_task",
+        (),
+        {"text": "hi", "source": "script"},
+        {},
+    )
+    assert short["queue"].name == "interactive" and short["priority"] == 0
+    assert long["queue"].name == "bulk" and long["priority"] == 6
+    assert script["priority"] > short["priority"]
+
+
+def test_explicit_options_override_the_router():
+    route = app.amqp.router.route(
+        {"queue": "maintenance", "priority": 9},
+        "backend.api.tasks.translate_text_task",
+        kwargs={"text": "hi"},
+    )
+    assert route["queue"].name == "maintenance" and route["priority"] == 9
+
+
+def test_export_and_purge_routes():
+    assert _route("backend.api.tasks.export_history_task")["queue"].name == "bulk"
+    purge = _route("backend.api.tasks.purge_expired_exports")
+    assert purge["queue"].name == "maintenance"
+
+
+def test_purge_expired_exports(settings, tmp_path):
+    settings.EXPORT_ROOT = tmp_path
+    (tmp_path / "1").mkdir()
+    (tmp_path / "2").mkdir()
+    old = tmp_path / "1" / "a.csv"
+    old.write_text("x")
+    stale = time.time() - 7200
+    os.utime(old, (stale, stale))
+    fresh = tmp_path / "2" / "b.csv"
+    fresh.write_text("y")
+
+    assert purge_expired_exports(max_age=3600) == 1
+    assert not (tmp_path / "1").exists()
+    assert fresh.exists()
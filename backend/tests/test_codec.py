@@ -0,0 +1,113 @@
+import io
+import random
+import zlib
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from backend.api import codec
+from backend.api.models import Translation
+
+_WORDS = "der die das Haus ist schön und wir gehen heute nach Hause".split()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_registry():
+    codec.registry.reset()
+    yield
+    codec.registry.reset()
+
+
+def _prose(rng, words=40):
+    return " ".join(rng.choice(_WORDS) for _ in range(words)) + "."
+
+
+def test_roundtrip_and_header():
+    for kind in (codec.IDENTITY, codec.ZLIB):
+        blob = codec.encode("Grüß Gott", kind)
+        assert blob[0] == 0x80 | codec.VERSION << 4 | kind
+        assert codec.decode(blob) == "Grüß Gott"
+
+
+def test_short_values_are_not_compressed():
+    assert codec.encode("Hallo")[0] == codec.header(codec.IDENTITY)
+    long = _prose(random.Random(0))
+    blob = codec.encode(long)
+    assert blob[0] == codec.header(codec.ZLIB)
+    assert len(blob) < len(long) and codec.decode(blob) == long
+
+
+@pytest.mark.parametrize("name,package", [("lz4", "lz4"), ("zstd", "zstandard")])
+def test_configured_codec(monkeypatch, name, package):
+    pytest.importorskip(package)
+    monkeypatch.setenv("CACHE_CODEC", name)
+    text = _prose(random.Random(1))
+    blob = codec.encode(text)
+    assert blob[0] == codec.header(codec.CODEC_NAMES[name])
+    # Readers decode whatever codec wrote the value
+    monkeypatch.setenv("CACHE_CODEC", "zlib")
+    codec.registry.reset()
+    assert codec.decode(blob) == text
+
+
+def _unavailable(level=None):
+    raise codec.CodecUnavailable("not installed")
+
+
+def test_unavailable_codec_falls_back_to_zlib(monkeypatch):
+    monkeypatch.setenv("CACHE_CODEC", "lz4")
+    monkeypatch.setitem(codec._FACTORIES, codec.LZ4, _unavailable)
+    blob = codec.encode(_prose(random.Random(2)))
+    assert blob[0] == codec.header(codec.ZLIB)
+    lz4_blob = bytes((codec.header(codec.LZ4),)) + b"\x04\x22\x4d\x18"
+    assert codec.decode(lz4_blob) is None
+
+
+def test_foreign_values_read_as_misses():
+    assert codec.decode(None) is None
+    assert codec.decode("plain legacy string") is None
+    assert codec.decode(zlib.compress(b"legacy blob")) is None
+    other_version = bytes((0x80 | 2 << 4 | codec.IDENTITY,)) + b"hi"
+    assert codec.decode(other_version) is None
+    assert codec.decode(bytes((codec.header(codec.ZLIB),)) + b"corrupt") is None
+
+
+@pytest.mark.django_db
+def test_trained_dictionary(tmp_path, monkeypatch):
+    pytest.importorskip("zstandard")
+    rng = random.Random(3)
+    user = get_user_model().objects.create_user("dict", password="pw12345678")
+    Translation.objects.bulk_create(
+        Translation(user=user, input_text="x", output_text=_prose(rng, 60))
+        for _ in range(500)
+    )
+    path = tmp_path / "cache.zdict"
+    out = io.StringIO()
+    call_command("train_cache_dict", output=str(path), size=4096, stdout=out)
+    assert "zstd+dict" in out.getvalue()
+
+    text = _prose(rng)
+    monkeypatch.setenv("CACHE_CODEC", "zstd")
+    plain = codec.encode(text)
+    monkeypatch.setenv("CACHE_ZSTD_DICT", str(path))
+    codec.registry.reset()
+    trained = codec.encode(text)
+    assert len(trained) < len(plain)
+    assert codec.decode(trained) == text
+
+    # A process without that dictionary treats the entry as a miss
+    monkeypatch.delenv("CACHE_ZSTD_DICT")
+    codec.registry.reset()
+    assert codec.decode(trained) is None
+    assert codec.decode(plain) == text
+
+
+def test_serializer_keeps_blobs_raw_and_json_for_the_rest():
+    serializer = codec.BinarySerializer({})
+    blob = codec.encode("Hallo")
+    assert serializer.dumps(blob) == blob
+    assert serializer.loads(serializer.dumps(blob)) == blob
+    value = {"seq": 1, "state": "PROGRESS"}
+    assert serializer.dumps(value) == b'{"seq": 1, "state": "PROGRESS"}'
+    assert serializer.loads(serializer.dumps(value)) == value
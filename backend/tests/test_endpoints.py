@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend.api.endpoints import (
+    CircuitBreaker,
+    Endpoint,
+    EndpointPool,
+    LatencyTracker,
+    load_endpoints,
+)
+from backend.api.engine import TranslationEngine, UpstreamUnavailable
+from backend.benchmarks.stub import OpenRouterStub
+
+
+@pytest.fixture
+def stubs():
+    servers = [OpenRouterStub().start(), OpenRouterStub().start()]
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def _pool(*stubs):
+    return EndpointPool(
+        [Endpoint(f"e{i}", url=s.url, model=f"m{i}") for i, s in enumerate(stubs)]
+    )
+
+
+def test_breaker_opens_then_half_opens():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.retry_after() == 10
+    now[0] = 10
+    assert breaker.state == "half-open"
+    breaker.record_failure()  # failed probe re-opens immediately
+    assert breaker.state == "open"
+    now[0] = 20
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_half_open_breaker_admits_one_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow() and not breaker.available()
+    breaker.release()  # probe cancelled without a verdict
+    assert breaker.allow()
+    now[0] = 20  # a probe that never reports back is given up
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_latency_percentiles_and_ranking():
+    tracker = LatencyTracker(window=100)
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.p50() == 0.05 and tracker.p95() == 0.095
+
+    slow, fast, fresh = Endpoint("slow"), Endpoint("fast"), Endpoint("fresh")
+    for _ in range(20):
+        slow.latency.record(2.0)
+        fast.latency.record(0.5)
+    assert EndpointPool([fresh, slow, fast]).ranked() == [fast, slow, fresh]
+
+
+def test_load_endpoints_from_json(monkeypatch):
+    monkeypatch.setenv("OTHER_KEY", "secret")
+    endpoints = load_endpoints(
+        '[{"name": "a", "model": "x"}, {"url": "http://b", "api_key_env": "OTHER_KEY"}]'
+    )
+    assert [e.name for e in endpoints] == ["a", "endpoint-1"]
+    assert endpoints[1].api_key == "secret" and endpoints[1].url == "http://b"
+
+
+def test_sync_fails_over_and_trips_breaker(stubs):
+    primary, backup = stubs
+    primary.fail_times = 100
+    pool = _pool(primary, backup)
+    engine = TranslationEngine(
+        client=httpx.Client(), endpoints=pool, sleep=lambda s: None
+    )
+    for i in range(6):
+        assert engine.translate(f"text {i}", "en", "fr", "") == f"TEXT {i}"
+    # five failures opened the primary's breaker; the sixth call skipped it
+    assert primary.hits == 5
+    assert pool.endpoints[0].breaker.state == "open"
+
+
+def test_all_breakers_open_fails_fast(stubs):
+    pool = _pool(stubs[0])
+    for _ in range(5):
+        pool.endpoints[0].record(False, 0)
+    engine = TranslationEngine(client=httpx.Client(), endpoints=pool)
+    with pytest.raises(UpstreamUnavailable) as info:
+        engine.translate("hello", "en", "fr", "")
+    assert 0 < info.value.retry_after <= 30
+    assert stubs[0].hits == 0
+
+
+def test_async_hedges_slow_primary(stubs):
+    primary, backup = stubs
+    primary.latency = 1.0
+    pool = _pool(primary, backup)
+    for _ in range(20):  # history says the primary answers within 50 ms
+        pool.endpoints[0].latency.record(0.05)
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            engine = TranslationEngine(async_client=client, endpoints=pool)
+            return await engine.atranslate("hello", "en", "fr", "")
+
+    started = time.monotonic()
+    assert asyncio.run(run()) == "HELLO"
+    assert time.monotonic() - started < 0.8
+    assert backup.hits == 1
+
+
+def test_failover_skips_the_endpoint_a_failed_hedge_tried(stubs):
+    primary, hedge = stubs
+    primary.latency, primary.fail_times = 0.3, 1
+    hedge.fail_times = 1
+    with OpenRouterStub() as third:
+        pool = _pool(primary, hedge, third)
+        for _ in range(20):
+            pool.endpoints[0].latency.record(0.05)
+
+        async def run():
+            async with httpx.AsyncClient() as client:
+                engine = TranslationEngine(async_client=client, endpoints=pool)
+                return await engine.atranslate("hello", "en", "fr", "")
+
+        assert asyncio.run(run()) == "HELLO"
+        assert (primary.hits, hedge.hits, third.hits) == (1, 1, 1)
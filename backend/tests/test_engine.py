@@ -0,0 +1,226 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from backend.api import cache_utils
+from backend.api import engine as engine_module
+from backend.api.engine import TranslationEngine, UpstreamError, UpstreamRateLimited
+
+
+def _completion(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def _prompt_text(request):
+    body = json.loads(request.content)
+    return body["messages"][-1]["content"].split("\n\n", 1)[1]
+
+
+def test_payload_uses_level_sampling_for_german():
+    payload = TranslationEngine(api_key="k").build_payload("Hi there", "en", "de", "A1")
+    assert payload["temperature"] == 0.2
+    assert payload["top_p"] == 0.7
+    assert payload["max_tokens"] == 60
+    assert "A1" in payload["messages"][-1]["content"]
+
+
+def test_sync_retries_429_then_succeeds():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "1"})
+        return httpx.Response(200, json=_completion("Hallo"))
+
+    sleeps = []
+    engine = TranslationEngine(
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        sleep=sleeps.append,
+    )
+    assert engine.translate("Hello", "en", "de", "A1") == "Hallo"
+    assert len(calls) == 2
+    assert sleeps == [1.0]
+
+
+def test_sync_gives_up_after_max_retries():
+    engine = TranslationEngine(
+        client=httpx.Client(
+            transport=httpx.MockTransport(lambda r: httpx.Response(429))
+        ),
+        max_retries=2,
+        sleep=lambda s: None,
+    )
+    with pytest.raises(UpstreamRateLimited):
+        engine.translate("Hello", "en", "fr", "")
+
+
+def test_upstream_429_and_retries_are_counted():
+    prometheus_client = pytest.importorskip("prometheus_client")
+    sample = prometheus_client.REGISTRY.get_sample_value
+
+    def counts():
+        return (
+            sample("dumbo_upstream_rate_limited_total", {"endpoint": "openrouter"})
+            or 0,
+            sample("dumbo_upstream_retries_total", {"reason": "429"}) or 0,
+            sample(
+                "dumbo_upstream_request_seconds_count",
+                {"endpoint": "openrouter", "status": "200"},
+            )
+            or 0,
+        )
+
+    before = counts()
+    statuses = iter([429, 200])
+    engine = TranslationEngine(
+        client=httpx.Client(
+            transport=httpx.MockTransport(
+                lambda r: httpx.Response(next(statuses), json=_completion("Hallo"))
+            )
+        ),
+        sleep=lambda s: None,
+    )
+    engine.translate("Hello", "en", "de", "A1")
+    assert [a - b for a, b in zip(counts(), before)] == [1, 1, 1]
+
+
+def test_async_keeps_order_and_caches_finished_chunks(monkeypatch):
+    chunks = [f"Sentence number {i} is here." for i in range(6)]
+    text = " ".join(chunks)
+    monkeypatch.setattr(engine_module, "_split_into_chunks", lambda t: chunks)
+
+    async def handler(request):
+        chunk = _prompt_text(request)
+        index = chunks.index(chunk)
+        if index == 1:
+            return httpx.Response(400)
+        # Later chunks finish first
+        await asyncio.sleep(0.001 * (len(chunks) - index))
+        return httpx.Response(200, json=_completion(f"T{index}"))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as c:
+            engine = TranslationEngine(async_client=c, max_retries=0)
+            return await engine.atranslate(text, "en", "fr", "")
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(run())
+    # Every chunk except the failed one is already cached for the retry
+    cached = [cache_utils.chunk_get(c, "en", "fr", "") for c in chunks]
+    assert cached[1] is None
+    assert cached[0] == "T0" and cached[-1] == "T5"
+
+    # The retry only sends the failed chunk and reassembles in input order
+    chunks_sent = []
+
+    def ok(request):
+        chunks_sent.append(_prompt_text(request))
+        return httpx.Response(200, json=_completion("T1"))
+
+    engine = TranslationEngine(
+        client=httpx.Client(transport=httpx.MockTransport(ok)), max_retries=0
+    )
+    assert engine.translate(text, "en", "fr", "") == "\n".join(
+        f"T{i}" for i in range(6)
+    )
+    assert chunks_sent == [chunks[1]]
+
+
+def _batch_handler(calls, drop=None):
+    """Echo each marker segment back upper-cased, optionally dropping one."""
+    import re
+
+    def handler(request):
+        calls.append(request)
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        body = prompt.split("\n\n", 1)[1]
+        segments = re.split(r"^(<<\w+:\d+>>)$", body, flags=re.M)
+        out = []
+        for marker, text in zip(segments[1::2], segments[2::2]):
+            if drop and drop in text:
+                continue
+            out.append(f"{marker}\n{text.strip().upper()}")
+        content = "\n\n".join(out) if out else body.upper()
+        return httpx.Response(200, json=_completion(content))
+
+    return handler
+
+
+def test_batch_packs_items_into_one_completion():
+    calls = []
+    engine = TranslationEngine(
+        client=httpx.Client(transport=httpx.MockTransport(_batch_handler(calls)))
+    )
+    texts = ["one", "two", "three <<not:1>> tricky"]
+    assert engine.translate_batch(texts, "en", "fr", "") == [
+        "ONE",
+        "TWO",
+        "THREE <<NOT:1>> TRICKY",
+    ]
+    assert len(calls) == 1
+
+
+def test_batch_falls_back_per_item_when_marker_missing():
+    calls = []
+    engine = TranslationEngine(
+        client=httpx.Client(
+            transport=httpx.MockTransport(_batch_handler(calls, drop="two"))
+        )
+    )
+    assert engine.translate_batch(["one", "two"], "en", "fr", "") == ["ONE", "TWO"]
+    assert len(calls) == 2
+
+
+def test_async_reports_partial_progress(monkeypatch):
+    chunks = ["One.", "Two.", "Three."]
+    monkeypatch.setattr(engine_module, "_split_into_chunks", lambda t: chunks)
+    cache_utils.chunk_set("Two.", "en", "fr", "", "Deux.")
+    snapshots = []
+
+    def handler(request):
+        return httpx.Response(200, json=_completion(_prompt_text(request).upper()))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as c:
+            engine = TranslationEngine(async_client=c, concurrency=1)
+            return await engine.atranslate(
+                "x", "en", "fr", "", on_progress=lambda t: snapshots.append(list(t))
+            )
+
+    assert asyncio.run(run()) == "ONE.\nDeux.\nTHREE."
+    assert snapshots[0] == [None, "Deux.", None]
+    assert snapshots[-1] == ["ONE.", "Deux.", "THREE."]
+    assert len(snapshots) == 3
+
+
+def test_async_blocking_calls_run_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(engine_module, "_split_into_chunks", lambda t: ["One."])
+    threads = {}
+
+    class Limiter:
+        def acquire(self, tokens=1):
+            threads["limiter"] = threading.get_ident()
+            return 0.0
+
+        def pause(self, seconds):
+            pass
+
+    def on_progress(translations):
+        threads["progress"] = threading.get_ident()
+
+    def handler(request):
+        return httpx.Response(200, json=_completion("Un."))
+
+    async def run():
+        threads["loop"] = threading.get_ident()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as c:
+            engine = TranslationEngine(async_client=c, limiter=Limiter())
+            return await engine.atranslate("x", "en", "fr", "", on_progress=on_progress)
+
+    assert asyncio.run(run()) == "Un."
+    assert threads["limiter"] != threads["loop"]
+    assert threads["progress"] != threads["loop"]
@@ -0,0 +1,68 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.api import http_client
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_clients():
+    http_client.close_clients()
+    http_client._stats.reset()
+    yield
+    http_client.close_clients()
+
+
+def test_sync_client_is_shared_and_reuses_connections(server_url):
+    client = http_client.get_client()
+    assert http_client.get_client() is client
+    for _ in range(3):
+        assert client.get(server_url).text == "ok"
+    stats = http_client.pool_stats()
+    assert stats["requests"] == 3
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 2
+
+
+def test_run_async_reuses_loop_client_between_calls(server_url):
+    async def fetch():
+        client = http_client.get_async_client()
+        await client.get(server_url)
+        return client
+
+    first = http_client.run_async(fetch())
+    second = http_client.run_async(fetch())
+    assert first is second
+    assert http_client.pool_stats()["new_connections"] == 1
+
+
+def test_fork_reset_drops_clients_without_closing():
+    client = http_client.get_client()
+    http_client._reset_after_fork()
+    assert http_client.get_client() is not client
+    assert not client.is_closed
+    client.close()
@@ -0,0 +1,119 @@
+import json
+import queue
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from backend.api import cache_utils, invalidation
+from backend.api.models import Translation
+
+
+class _FakePubSub:
+    def __init__(self, server):
+        self.server = server
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.server.subscribers.setdefault(channel, []).append(self)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        for subscribers in self.server.subscribers.values():
+            if self in subscribers:
+                subscribers.remove(self)
+
+
+class _FakeRedis:
+    """Just enough of redis.Redis pub/sub for one process."""
+
+    def __init__(self, failures=0):
+        self.subscribers = {}
+        self.failures = failures
+
+    def publish(self, channel, data):
+        for pubsub in self.subscribers.get(channel, []):
+            pubsub.messages.put({"type": "message", "data": data.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("redis down")
+        return _FakePubSub(self)
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = invalidation.LocalBus()
+    monkeypatch.setattr(invalidation, "_bus", bus)
+    cache_utils._L1_CACHE.clear()
+    cache_utils._CHUNK_CACHE.clear()
+    return bus
+
+
+@pytest.mark.django_db
+def test_updates_broadcast_translation_and_chunk_keys(bus):
+    received = []
+    bus.subscribe(received.append)
+    request = ("Hello. World.", "en", "de", "B1")
+    key = cache_utils.make_cache_key(*request)
+    chunk_keys = cache_utils.chunk_keys(["Hello. World."], *request[1:])
+    user = get_user_model().objects.create_user("bus", password="pw12345678")
+    row = Translation.objects.create(
+        user=user,
+        input_text=request[0],
+        output_text="Hallo. Welt.",
+        source_lang="en",
+        target_lang="de",
+        level="B1",
+    )
+    # Nothing was cached for a row that did not exist yet
+    assert received == []
+
+    cache_utils._l1_set(key, "Hallo. Welt.")
+    cache_utils._CHUNK_CACHE.set(chunk_keys[0], "Hallo. Welt.")
+    row.output_text = "Hallo, Welt."
+    row.save()
+    assert received == [
+        cache_utils.cache_keys_for(*request)
+        + cache_utils.chunk_cache_keys_for(*request)
+    ]
+    assert set(chunk_keys) <= set(received[-1])
+    assert cache_utils._l1_get(key) is None
+    assert cache_utils._CHUNK_CACHE.get(chunk_keys[0]) is None
+
+
+def test_redis_bus_drops_keys_published_by_other_processes(monkeypatch):
+    monkeypatch.setattr(invalidation, "RECONNECT_DELAY", 0.01)
+    redis = _FakeRedis(failures=1)
+    bus = invalidation.RedisBus(lambda: redis, channel="test")
+    cache_utils._L1_CACHE.clear()
+    cache_utils._L1_CACHE.set("stale-before-subscribe", "x")
+    bus.listen()
+    bus.listen()  # idempotent within a process
+    try:
+        # Messages may have been missed while disconnected
+        _wait_for(lambda: not cache_utils._L1_CACHE.get("stale-before-subscribe"))
+        assert redis.subscribers["test"]
+
+        cache_utils._l1_set("translation:v2:a", "A")
+        cache_utils._CHUNK_CACHE.set("chunk:v2:b", "B")
+        redis.publish("test", "not json")
+        redis.publish("test", json.dumps(["translation:v2:a", "chunk:v2:b"]))
+        _wait_for(lambda: cache_utils._CHUNK_CACHE.get("chunk:v2:b") is None)
+        assert cache_utils._l1_get("translation:v2:a") is None
+        assert len(redis.subscribers["test"]) == 1
+    finally:
+        bus.close()
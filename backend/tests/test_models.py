@@ -0,0 +1,32 @@
+import importlib
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from backend.api.cache_utils import content_hash
+from backend.api.models import Translation
+
+pytestmark = pytest.mark.django_db
+
+
+def test_save_keeps_content_hash_in_sync_and_matching_uses_it():
+    user = get_user_model().objects.create_user("bob")
+    row = Translation.objects.create(
+        user=user, input_text="hi", output_text="salut", target_lang="fr"
+    )
+    assert row.content_hash == content_hash("hi", "en", "fr", "")
+    assert Translation.objects.matching("hi", "en", "fr", "").get() == row
+    assert not Translation.objects.matching("hi", "en", "es", "").exists()
+
+    row.input_text = "hello"
+    row.save(update_fields=["input_text"])
+    row.refresh_from_db()
+    assert row.content_hash == content_hash("hello", "en", "fr", "")
+
+
+def test_backfill_migration_hash_matches_runtime_hash():
+    migration = importlib.import_module(
+        "backend.api.migrations.0006_translation_content_hash"
+    )
+    args = ("Grüß dich\n", "de", "en", "")
+    assert migration._content_hash(*args) == content_hash(*args)
@@ -0,0 +1,72 @@
+import httpx
+import pytest
+
+from backend.api.engine import TranslationEngine, UpstreamRateLimited
+from backend.api.ratelimit import TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_at_rate_up_to_capacity():
+    clock = _Clock()
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=clock)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.acquire() == 0
+    clock.now += 60
+    assert [bucket.acquire() for _ in range(4)][-1] == pytest.approx(0.5)
+
+
+def test_pause_blocks_until_upstream_window_passes():
+    clock = _Clock()
+    bucket = TokenBucket(rate=10.0, capacity=5, clock=clock)
+    bucket.pause(7)
+    assert bucket.acquire() == pytest.approx(7)
+    clock.now += 7
+    assert bucket.acquire() == pytest.approx(0.1)  # drained, refills from zero
+
+
+def test_engine_fails_fast_instead_of_sleeping():
+    clock = _Clock()
+    bucket = TokenBucket(rate=0.5, capacity=1, clock=clock)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "x"}}]})
+
+    engine = TranslationEngine(
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        limiter=bucket,
+        max_wait=0,
+        sleep=lambda s: pytest.fail("must not sleep"),
+    )
+    engine.translate("Good morning", "en", "fr", "")
+    with pytest.raises(UpstreamRateLimited) as info:
+        engine.translate("Good evening", "en", "fr", "")
+    assert info.value.retry_after == pytest.approx(2)
+    assert len(calls) == 1
+
+
+def test_upstream_429_pauses_shared_bucket():
+    bucket = TokenBucket(rate=100.0, capacity=10)
+    engine = TranslationEngine(
+        client=httpx.Client(
+            transport=httpx.MockTransport(
+                lambda r: httpx.Response(429, headers={"Retry-After": "20"})
+            )
+        ),
+        limiter=bucket,
+        max_wait=5,
+    )
+    with pytest.raises(UpstreamRateLimited) as info:
+        engine.translate("Good night", "en", "fr", "")
+    assert info.value.retry_after == 20
+    assert bucket.acquire() > 19
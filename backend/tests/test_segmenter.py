@@ -0,0 +1,44 @@
+from backend.api.segmenter import split_into_chunks
+
+
+def test_short_text_is_single_chunk():
+    assert split_into_chunks("  Hello world.  ") == ["Hello world."]
+    assert split_into_chunks("   ") == []
+
+
+def test_splits_on_sentence_boundaries_within_budget():
+    text = " ".join(f"This is sentence number {i}." for i in range(100))
+    chunks = split_into_chunks(text, 200)
+    assert len(chunks) > 1
+    assert all(len(c) <= 200 for c in chunks)
+    assert all(c.endswith(".") for c in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_chunks_are_balanced():
+    text = " ".join("Sentence %03d is about this long." % i for i in range(76))
+    sizes = [len(c) for c in split_into_chunks(text, 1000)]
+    assert len(sizes) == 3
+    assert max(sizes) - min(sizes) < 100
+
+
+def test_abbreviations_and_ordinals_do_not_split():
+    sentence = "Dr. Smith met e.g. Mr. Jones, i.e. the boss, etc. in Berlin."
+    text = (sentence + " ") * 10
+    chunks = split_into_chunks(text, len(sentence) + 5)
+    assert chunks == [sentence] * 10
+
+
+def test_newlines_are_boundaries_and_preserved_inside_chunks():
+    text = "Title\nFirst line\n\nSecond paragraph"
+    assert split_into_chunks(text, 20) == ["Title\nFirst line", "Second paragraph"]
+
+
+def test_overlong_sentence_is_hard_split():
+    text = ", ".join(["clause with several words"] * 40) + "."
+    chunks = split_into_chunks(text, 200)
+    assert all(len(c) <= 200 for c in chunks)
+    assert "".join(chunks).replace(",", "").replace(" ", "") == text.replace(
+        ",", ""
+    ).replace(" ", "")
+    assert split_into_chunks("x" * 450, 200) == ["x" * 200, "x" * 200, "x" * 50]
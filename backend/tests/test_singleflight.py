@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from backend.api import singleflight
+from backend.api.codec import encode
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "Hallo"
+
+    results = []
+
+    def worker():
+        results.append(singleflight.coalesce("translation:k1", slow))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    threads[0].start()
+    started.wait(1)
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [("Hallo", False)] + [("Hallo", True)] * 7
+
+
+def test_follower_sees_leader_exception():
+    def boom():
+        time.sleep(0.05)
+        raise ValueError("upstream down")
+
+    errors = []
+
+    def worker():
+        try:
+            singleflight.coalesce("translation:k2", boom)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == ["upstream down"] * 3
+
+
+def test_waits_for_result_published_by_another_process():
+    key = "translation:k3"
+    cache.add(singleflight._lock_key(key), "other-worker", 30)
+
+    def publish():
+        time.sleep(0.1)
+        cache.set(singleflight._result_key(key), encode("Bonjour"), 30)
+        cache.delete(singleflight._lock_key(key))
+
+    threading.Thread(target=publish).start()
+    result = singleflight.coalesce(key, lambda: pytest.fail("must not recompute"))
+    assert result == ("Bonjour", True)
+
+
+def test_leader_never_releases_a_lock_it_no_longer_holds():
+    key = "translation:k4"
+
+    def slow():
+        # Our lock expired and another worker took it meanwhile
+        cache.set(singleflight._lock_key(key), "other-worker", 30)
+        return "Hallo"
+
+    assert singleflight.coalesce(key, slow) == ("Hallo", False)
+    assert cache.get(singleflight._lock_key(key)) == "other-worker"
+
+
+def test_followers_stop_waiting_for_a_stuck_leader(monkeypatch):
+    monkeypatch.setattr(singleflight, "LOCK_TTL", 0.1)
+    release = threading.Event()
+    leader = threading.Thread(
+        target=singleflight.coalesce,
+        args=("translation:k5", lambda: release.wait(5) and "late"),
+    )
+    leader.start()
+    time.sleep(0.05)
+    try:
+        result = singleflight.coalesce("translation:k5", lambda: "own")
+        assert result == ("own", False)
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_async_followers_survive_a_cancelled_leader():
+    async def scenario():
+        started = asyncio.Event()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.05)
+            return "Hallo"
+
+        leader = asyncio.create_task(singleflight.acoalesce("translation:k6", work))
+        await started.wait()
+        follower = asyncio.create_task(singleflight.acoalesce("translation:k6", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        assert leader.cancelled()
+        return result, len(calls)
+
+    assert asyncio.run(scenario()) == (("Hallo", False), 2)
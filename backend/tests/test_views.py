@@ -0,0 +1,544 @@
+import csv
+import gzip
+import io
+import json
+
+import httpx
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from backend.api import engine as engine_module
+from backend.api.models import Translation
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake OpenRouter: upper-cases the prompt body (batch markers kept)."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        body = prompt.split("\n\n", 1)[1]
+        content = "\n".join(
+            line if line.startswith("<<") else line.upper()
+            for line in body.split("\n")
+        )
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": content}}]}
+        )
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(engine_module, "get_client", lambda: client)
+    return calls
+
+
+@pytest.fixture
+def api():
+    user = get_user_model().objects.create_user("alice", password="pw12345678")
+    client = APIClient()
+    client.force_authenticate(user)
+    client.user = user
+    return client
+
+
+def test_translate_then_cached(api, upstream):
+    payload = {"input_text": "hello", "target_lang": "fr"}
+    first = api.post("/api/translate/", payload, format="json", secure=True)
+    assert first.status_code == 201
+    assert first.json() == {"translation": "HELLO"}
+    second = api.post("/api/translate/", payload, format="json", secure=True)
+    assert second.status_code == 200
+    assert second.json() == {"translation": "HELLO"}
+    assert len(upstream) == 1
+
+
+def test_batch_translate_uses_cache_and_one_completion(api, upstream):
+    api.post(
+        "/api/translate/",
+        {"input_text": "cached", "target_lang": "fr"},
+        format="json",
+        secure=True,
+    )
+    upstream.clear()
+    resp = api.post(
+        "/api/translate/batch/",
+        {"texts": ["cached", "a", "b", "a"], "target_lang": "fr"},
+        format="json",
+        secure=True,
+    )
+    assert resp.status_code == 201
+    results = resp.json()["results"]
+    assert [r["input_text"] for r in results] == ["cached", "a", "b", "a"]
+    assert results[0] == {
+        "input_text": "cached",
+        "translation": "CACHED",
+        "cached": True,
+    }
+    assert results[1]["cached"] is False
+    assert len(upstream) == 1
+    assert Translation.objects.filter(user=api.user).count() == 3
+
+
+def test_batch_keeps_finished_items_when_rate_limited(api, monkeypatch):
+    calls, refuse = [], [True]
+
+    def handler(request):
+        calls.append(request)
+        if refuse[0] and len(calls) > 1:
+            return httpx.Response(429, headers={"Retry-After": "30"})
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        content = prompt.split("\n\n", 1)[1].upper()
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": content}}]}
+        )
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(engine_module, "get_client", lambda: client)
+    # One item per prompt: the second completion is refused
+    monkeypatch.setattr(engine_module, "MAX_CHARS_PER_REQUEST", 20)
+    payload = {"texts": ["first item", "second item"], "target_lang": "fr"}
+
+    resp = api.post("/api/translate/batch/", payload, format="json", secure=True)
+    assert resp.status_code == 429
+    assert resp["Retry-After"] == "30"
+    rows = Translation.objects.filter(user=api.user)
+    assert [r.output_text for r in rows] == ["FIRST ITEM"]
+
+    refuse[0] = False
+    calls.clear()
+    resp = api.post("/api/translate/batch/", payload, format="json", secure=True)
+    assert resp.status_code == 201
+    assert [r["cached"] for r in resp.json()["results"]] == [True, False]
+    assert len(calls) == 1
+
+
+def test_batch_rejects_bad_input(api, upstream):
+    resp = api.post(
+        "/api/translate/batch/", {"texts": []}, format="json", secure=True
+    )
+    assert resp.status_code == 400
+    assert upstream == []
+
+
+def test_stream_translation_sends_deltas_and_persists(api, monkeypatch):
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from backend.api import views
+
+    def handler(request):
+        events = [
+            {"choices": [{"delta": {"content": "Bon"}}]},
+            {"choices": [{"delta": {"content": "jour"}}]},
+        ]
+        body = ": OPENROUTER PROCESSING\n\n" + "".join(
+            f"data: {json.dumps(e)}\n\n" for e in events
+        )
+        return httpx.Response(200, text=body + "data: [DONE]\n\n")
+
+    monkeypatch.setattr(
+        views,
+        "get_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    token = str(RefreshToken.for_user(api.user).access_token)
+
+    async def run():
+        resp = await AsyncClient().post(
+            "/api/translate/?stream=1",
+            {"input_text": "hello", "target_lang": "fr"},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {token}"},
+            secure=True,
+        )
+        assert resp["Content-Type"] == "text/event-stream"
+        return b"".join([part async for part in resp.streaming_content]).decode()
+
+    body = async_to_sync(run)()
+    events = [e for e in body.split("\n\n") if e]
+    assert events[0] == 'event: delta\ndata: {"index": 0, "text": "Bon"}'
+    assert events[-1] == 'event: done\ndata: {"translation": "Bonjour"}'
+    assert Translation.objects.get(user=api.user).output_text == "Bonjour"
+
+
+def test_async_view_translates_and_caches(api, monkeypatch):
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": "Bonjour"}}]}
+        )
+
+    monkeypatch.setattr(
+        engine_module,
+        "get_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    headers = {
+        "Authorization": f"Bearer {RefreshToken.for_user(api.user).access_token}"
+    }
+
+    async def post(data):
+        resp = await AsyncClient().post(
+            "/api/translate/aio/",
+            data,
+            content_type="application/json",
+            headers=headers,
+            secure=True,
+        )
+        return resp.status_code, json.loads(resp.content)
+
+    payload = {"input_text": "hello", "target_lang": "fr"}
+    assert async_to_sync(post)(payload) == (201, {"translation": "Bonjour"})
+    assert async_to_sync(post)(payload) == (200, {"translation": "Bonjour"})
+    assert len(calls) == 1
+    assert Translation.objects.filter(user=api.user).count() == 1
+
+    status, body = async_to_sync(post)({"input_text": "x", "target_lang": "xx"})
+    assert status == 400
+
+    async def anonymous():
+        resp = await AsyncClient().post(
+            "/api/translate/aio/", payload, content_type="application/json", secure=True
+        )
+        return resp.status_code
+
+    assert async_to_sync(anonymous)() == 401
+
+
+def test_history_is_cursor_paginated_with_previews(api, monkeypatch):
+    monkeypatch.setenv("HISTORY_PREVIEW_CHARS", "10")
+    other = get_user_model().objects.create_user("mallory")
+    Translation.objects.create(user=other, input_text="x", output_text="y")
+    for i in range(5):
+        Translation.objects.create(
+            user=api.user, input_text=f"input {i} " * 5, output_text=f"output {i}!!"
+        )
+
+    page = api.get("/api/history/?page_size=2", secure=True).json()
+    assert len(page["results"]) == 2
+    first = page["results"][0]
+    assert first["input_preview"] == "input 4 in"
+    assert first["input_truncated"] is True
+    # Exactly the preview length is not truncated
+    assert first["output_preview"] == "output 4!!"
+    assert first["output_truncated"] is False
+    assert "input_text" not in first
+
+    seen = [r["id"] for r in page["results"]]
+    while page["next"]:
+        page = api.get(page["next"], secure=True).json()
+        seen += [r["id"] for r in page["results"]]
+    assert len(seen) == len(set(seen)) == 5
+
+    detail = api.get(f"/api/history/{first['id']}/", secure=True).json()
+    assert detail["input_text"] == "input 4 " * 5
+    other_row = Translation.objects.get(user=other)
+    assert api.get(f"/api/history/{other_row.id}/", secure=True).status_code == 404
+
+
+def test_export_streams_csv_ndjson_and_gzip(api):
+    for i in range(5):
+        Translation.objects.create(
+            user=api.user, input_text=f"line {i}\nmore", output_text=f"out {i}"
+        )
+
+    resp = api.get("/api/export-history/", secure=True)
+    assert resp.streaming
+    rows = list(csv.reader(io.StringIO(b"".join(resp.streaming_content).decode())))
+    assert rows[0][0] == "Date"
+    assert len(rows) == 6
+    assert rows[1][3:] == ["-", "line 4 more", "out 4"]
+
+    resp = api.get("/api/export-history/?type=ndjson&gzip=1", secure=True)
+    assert resp["Content-Disposition"].endswith('.ndjson.gz"')
+    lines = gzip.decompress(b"".join(resp.streaming_content)).splitlines()
+    assert [json.loads(line)["input_text"] for line in lines][-1] == "line 0\nmore"
+
+    assert api.get("/api/export-history/?type=xml", secure=True).status_code == 400
+
+
+def test_export_parquet(api):
+    pq = pytest.importorskip("pyarrow.parquet")
+    Translation.objects.create(user=api.user, input_text="a", output_text="b")
+    resp = api.get("/api/export-history/?type=parquet", secure=True)
+    table = pq.read_table(io.BytesIO(b"".join(resp.streaming_content)))
+    assert table.column("output_text").to_pylist() == ["b"]
+
+
+def test_background_export_and_ranged_download(api, settings, tmp_path, monkeypatch):
+    from backend.api.tasks import export_history_task
+
+    settings.EXPORT_ROOT = tmp_path
+    for i in range(3):
+        Translation.objects.create(user=api.user, input_text=f"t{i}", output_text="o")
+    states = []
+    monkeypatch.setattr(
+        export_history_task, "update_state", lambda **kw: states.append(kw)
+    )
+    result = export_history_task.apply(
+        kwargs={"user_id": api.user.id, "fmt": "ndjson"}
+    ).get()
+    task_id = result["filename"].split(".")[0]
+    assert result["rows"] == 3
+    assert states[-1] == {
+        "task_id": task_id,
+        "state": "PROGRESS",
+        "meta": {"rows": 3, "total": 3},
+    }
+    assert not list(tmp_path.rglob("*.part"))
+
+    url = result["download_url"]
+    full = api.get(url, secure=True)
+    body = b"".join(full.streaming_content)
+    assert full.status_code == 200 and len(body) == result["bytes"]
+    assert full["Accept-Ranges"] == "bytes"
+
+    part = api.get(url, secure=True, HTTP_RANGE="bytes=10-", HTTP_IF_RANGE=full["ETag"])
+    assert part.status_code == 206
+    assert b"".join(part.streaming_content) == body[10:]
+    assert part["Content-Range"] == f"bytes 10-{len(body) - 1}/{len(body)}"
+
+    stale = api.get(url, secure=True, HTTP_RANGE="bytes=10-", HTTP_IF_RANGE='"x"')
+    assert stale.status_code == 200
+    assert api.get(url, secure=True, HTTP_RANGE="bytes=999999-").status_code == 416
+
+    other = APIClient()
+    other.force_authenticate(get_user_model().objects.create_user("mallory"))
+    assert other.get(url, secure=True).status_code == 404
+    assert task_id in url
+
+
+class _FakeResult:
+    states = {}
+
+    def __init__(self, task_id):
+        self.state, self.info = self.states.get(task_id, ("PENDING", None))
+        self.result = self.info
+
+
+def test_task_status_long_poll_and_events(api, monkeypatch):
+    import threading
+    import uuid
+
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from backend.api import progress
+
+    monkeypatch.setattr(progress, "AsyncResult", _FakeResult)
+    monkeypatch.setattr(progress, "POLL_INTERVAL", 0.01)
+    task_id = str(uuid.uuid4())
+    _FakeResult.states = {task_id: ("PROGRESS", {"chunks_done": 1})}
+    progress.publish(task_id, "PROGRESS")
+    token = str(RefreshToken.for_user(api.user).access_token)
+
+    async def get(path, stream=False):
+        resp = await AsyncClient().get(
+            path, headers={"Authorization": f"Bearer {token}"}, secure=True
+        )
+        if stream:
+            return b"".join([part async for part in resp.streaming_content])
+        return resp
+
+    status = async_to_sync(get)(f"/api/tasks/{task_id}/").json()
+    assert status["progress"] == {"chunks_done": 1}
+    assert api.get(f"/api/tasks/{task_id}/", secure=True).status_code == 401
+
+    def finish():
+        _FakeResult.states = {task_id: ("SUCCESS", "Hallo")}
+        progress.publish(task_id, "SUCCESS")
+
+    threading.Timer(0.05, finish).start()
+    url = f"/api/tasks/{task_id}/?wait=5&since={status['seq']}"
+    assert async_to_sync(get)(url).json()["result"] == "Hallo"
+
+    body = async_to_sync(get)(f"/api/tasks/{task_id}/events/", stream=True)
+    events = [e for e in body.decode().split("\n\n") if e]
+    assert len(events) == 1 and '"state": "SUCCESS"' in events[0]
+
+
+def test_translate_task_resumes_from_checkpoint_and_persists_once(api, monkeypatch):
+    from backend.api import tasks
+
+    chunks = ["One.", "Two.", "Three."]
+    monkeypatch.setattr(engine_module, "_split_into_chunks", lambda t: chunks)
+    monkeypatch.setattr(tasks, "report", lambda task, task_id, **meta: None)
+    # Shared chunk cache evicted: only the task checkpoint can save re-sends
+    monkeypatch.setattr(
+        engine_module, "chunk_get_many", lambda chunks, *a: [None] * len(chunks)
+    )
+    sent = []
+
+    def handler(request):
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        chunk = prompt.split("\n\n", 1)[1]
+        sent.append(chunk)
+        if chunk == "Two." and sent.count(chunk) == 1:
+            return httpx.Response(400)
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": chunk.upper()}}]}
+        )
+
+    monkeypatch.setattr(
+        engine_module,
+        "get_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    kwargs = {
+        "user_id": api.user.id,
+        "text": "One. Two. Three.",
+        "source_lang": "en",
+        "target_lang": "fr",
+        "level": "",
+        "cache_key": "k",
+    }
+    result = tasks.translate_text_task.apply(kwargs=kwargs, task_id="t-1")
+    assert result.get() == "ONE.\nTWO.\nTHREE."
+    # The retry re-sent only the failed chunk
+    assert sorted(sent) == ["One.", "Three.", "Two.", "Two."]
+
+    tasks.translate_text_task.apply(kwargs=kwargs, task_id="t-1").get()
+    assert Translation.objects.filter(task_id="t-1").count() == 1
+    assert len(sent) == 4
+
+
+def test_translate_task_publishes_progress_under_its_own_id(api, monkeypatch):
+    from backend.api import progress, tasks
+
+    monkeypatch.setattr(
+        engine_module, "_split_into_chunks", lambda t: ["One.", "Two."]
+    )
+
+    def handler(request):
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        content = prompt.split("\n\n", 1)[1].upper()
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": content}}]}
+        )
+
+    monkeypatch.setattr(
+        engine_module,
+        "get_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    states = []
+    monkeypatch.setattr(
+        tasks.translate_text_task, "update_state", lambda **kw: states.append(kw)
+    )
+    kwargs = {
+        "user_id": api.user.id,
+        "text": "One. Two.",
+        "source_lang": "en",
+        "target_lang": "fr",
+        "level": "",
+        "cache_key": "k",
+    }
+    tasks.translate_text_task.apply(kwargs=kwargs, task_id="t-2").get()
+    assert states and {s["task_id"] for s in states} == {"t-2"}
+    assert states[-1]["meta"]["chunks"] == ["ONE.", "TWO."]
+    assert progress.current_seq("t-2") and not progress.current_seq("None")
+
+
+def test_queued_translations_carry_their_source(api, settings, monkeypatch):
+    from backend.api import tasks
+
+    settings.CORS_ALLOWED_ORIGINS = ["https://app.example"]
+    queued = []
+
+    class _Queued:
+        id = "t-3"
+
+    def delay(**kwargs):
+        queued.append(kwargs["source"])
+        return _Queued()
+
+    monkeypatch.setattr(tasks.translate_text_task, "delay", delay)
+    payload = {"input_text": "hello", "target_lang": "fr"}
+    for origin in ("https://app.example", None):
+        headers = {"HTTP_ORIGIN": origin} if origin else {}
+        resp = api.post(
+            "/api/translate/?async=1", payload, format="json", secure=True, **headers
+        )
+        assert resp.status_code == 202
+    assert queued == ["web", "script"]
+
+
+def test_rate_limited_translate_answers_429_with_retry_after(api, monkeypatch):
+    from backend.api import ratelimit
+
+    bucket = ratelimit.TokenBucket(rate=0.1, capacity=1)
+    bucket.acquire()
+    monkeypatch.setattr(ratelimit, "_limiter", bucket)
+    resp = api.post(
+        "/api/translate/",
+        {"input_text": "hello", "target_lang": "fr"},
+        format="json",
+        secure=True,
+    )
+    assert resp.status_code == 429
+    assert 9 <= int(resp["Retry-After"]) <= 10
+
+
+def test_translate_reports_server_timing(api, upstream):
+    payload = {"input_text": "hello", "target_lang": "fr"}
+    first = api.post("/api/translate/", payload, format="json", secure=True)
+    stages = [e.split(";")[0] for e in first["Server-Timing"].split(", ")]
+    assert stages == ["l1", "l2", "db", "llm", "insert", "cache_write", "total"]
+
+    second = api.post("/api/translate/", payload, format="json", secure=True)
+    assert second["Server-Timing"].startswith("l1;dur=")
+    assert "l2;" not in second["Server-Timing"]
+
+
+def test_metrics_endpoint(api, upstream, client, monkeypatch):
+    pytest.importorskip("prometheus_client")
+    api.post(
+        "/api/translate/",
+        {"input_text": "hello", "target_lang": "fr"},
+        format="json",
+        secure=True,
+    )
+    resp = client.get("/metrics", secure=True)
+    assert resp.status_code == 200
+    body = resp.content.decode()
+    assert 'dumbo_cache_requests_total{layer="l1",result="miss"}' in body
+    assert 'dumbo_translate_stage_seconds_count{stage="llm"}' in body
+    assert 'dumbo_l1_cache{cache="l1",stat="entries"}' in body
+
+    monkeypatch.setenv("METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics", secure=True).status_code == 401
+    resp = client.get("/metrics", secure=True, HTTP_AUTHORIZATION="Bearer s3cret")
+    assert resp.status_code == 200
+
+
+def test_process_stats_are_published_for_multiprocess_mode(monkeypatch):
+    prometheus_client = pytest.importorskip("prometheus_client")
+    from backend.api import cache_utils, metrics
+
+    registry = prometheus_client.CollectorRegistry()
+    monkeypatch.setattr(metrics, "_gauges", metrics._build_process_gauges(registry))
+    misses = cache_utils._L1_CACHE.misses
+    cache_utils._l1_get("missing")
+    metrics.publish_process_stats()
+
+    def sample(name, **labels):
+        return registry.get_sample_value(name, labels)
+
+    assert sample("dumbo_l1_cache", cache="l1", stat="misses") == misses + 1
+    assert sample("dumbo_endpoint_available", endpoint="openrouter") == 1
+    assert sample("dumbo_http_pool", stat="requests") is not None
+    # Ratios do not add up across processes; the worst wait does
+    assert sample("dumbo_http_pool", stat="reuse_ratio") is None
+    assert sample("dumbo_http_pool_wait_max_seconds") is not None
@@ -1,33 +1,71 @@
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useState } from "react";
 import { api } from "../api";
 
 interface HistoryItem {
   id: number;
-  input_text: string;
-  output_text: string;
+  input_preview: string;
+  output_preview: string;
+  input_truncated: boolean;
+  output_truncated: boolean;
   level: string;
   created_at: string;
 }
 
+interface HistoryPage {
+  next: string | null;
+  previous: string | null;
+  results: HistoryItem[];
+}
+
+interface HistoryDetail {
+  id: number;
+  input_text: string;
+  output_text: string;
+}
+
 export default function History() {
   const [items, setItems] = useState<HistoryItem[]>([]);
+  const [next, setNext] = useState<string | null>(null);
+  const [full, setFull] = useState<Record<number, HistoryDetail>>({});
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
 
-  useEffect(() => {
-    const fetchHistory = async () => {
-      try {
-        const res = await api.get<HistoryItem[]>("history/");
-        setItems(res.data);
-      } catch (err) {
-        setError("Failed to load history.");
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchHistory();
+  // `url` is either the first page (replaces the list, so a repeated
+  // StrictMode effect cannot duplicate it) or the absolute `next` cursor link
+  const fetchPage = useCallback(async (url: string, append: boolean) => {
+    const res = await api.get<HistoryPage>(url);
+    setItems((prev) => (append ? [...prev, ...res.data.results] : res.data.results));
+    setNext(res.data.next);
   }, []);
 
+  useEffect(() => {
+    fetchPage("history/", false)
+      .catch(() => setError("Failed to load history."))
+      .finally(() => setLoading(false));
+  }, [fetchPage]);
+
+  const loadMore = async () => {
+    if (!next) return;
+    setLoadingMore(true);
+    try {
+      await fetchPage(next, true);
+    } catch (err) {
+      setError("Failed to load history.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const showFull = async (id: number) => {
+    try {
+      const res = await api.get<HistoryDetail>(`history/${id}/`);
+      setFull((prev) => ({ ...prev, [id]: res.data }));
+    } catch (err) {
+      setError("Failed to load translation.");
+    }
+  };
+
   if (loading) {
     return (
       <div className="flex items-center justify-center h-64">
@@ -48,19 +86,52 @@ export default function History() {
 
   return (
     <section className="space-y-4">
-      {items.map((h) => (
-        <div
-          key={h.id}
-          className="border border-gray-200 rounded-lg p-4 shadow-sm bg-white"
-        >
-          <div className="flex justify-between mb-2 text-sm text-gray-500">
-            <span>Level: {h.level}</span>
-            <span>{new Date(h.created_at).toLocaleString()}</span>
+      {items.map((h) => {
+        const detail = full[h.id];
+        const truncated = h.input_truncated || h.output_truncated;
+        return (
+          <div
+            key={h.id}
+            className="border border-gray-200 rounded-lg p-4 shadow-sm bg-white"
+          >
+            <div className="flex justify-between mb-2 text-sm text-gray-500">
+              <span>Level: {h.level}</span>
+              <span>{new Date(h.created_at).toLocaleString()}</span>
+            </div>
+            <p className="font-medium text-gray-800">
+              {detail
+                ? detail.input_text
+                : h.input_preview + (h.input_truncated ? "…" : "")}
+            </p>
+            <p className="mt-2 text-indigo-700">
+              {detail
+                ? detail.output_text
+                : h.output_preview + (h.output_truncated ? "…" : "")}
+            </p>
+            {truncated && !detail && (
+              <button
+                type="button"
+                onClick={() => showFull(h.id)}
+                className="mt-2 text-sm text-indigo-600 hover:underline"
+              >
+                Show full text
+              </button>
+            )}
           </div>
-          <p className="font-medium text-gray-800">{h.input_text}</p>
-          <p className="mt-2 text-indigo-700">{h.output_text}</p>
+        );
+      })}
+      {next && (
+        <div className="flex justify-center">
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 rounded-lg border border-gray-300 text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+          >
+            {loadingMore ? "Loading…" : "Load more"}
+          </button>
         </div>
-      ))}
+      )}
     </section>
   );
 }